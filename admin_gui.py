@@ -4,15 +4,20 @@ Handles all administrative functions for the system
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import database
+import race_import
+from data_access import NotFound, Repositories
+from data_access.validation import parse_position, parse_prize
+from task_runner import TaskRunner, Spinner
 
 class AdminGUI:
-    def __init__(self, root, db_manager, back_callback):
+    def __init__(self, root, db_manager, back_callback, runner=None):
         self.root = root
         self.db_manager = db_manager
+        self.repos = Repositories(db_manager)
         self.back_callback = back_callback
+        self.runner = runner or TaskRunner(root)
         self.root.title("Admin Panel - Horse Racing Database")
         self.root.geometry("800x600")
         self.root.configure(bg="#34495E")
@@ -48,6 +53,9 @@ class AdminGUI:
         )
         back_button.pack(side=tk.RIGHT, padx=20, pady=10)
         
+        self.spinner = Spinner(header_frame, text="Working", font=("Arial", 10), bg="#2C3E50", fg="white")
+        self.spinner.pack(side=tk.RIGHT, pady=10)
+        
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -121,7 +129,10 @@ class AdminGUI:
         
         tk.Button(button_frame, text="Add Result", command=self.add_result, bg="#27AE60", fg="white").pack(side=tk.LEFT, padx=10)
         tk.Button(button_frame, text="Remove Result", command=self.remove_result, bg="#E67E22", fg="white").pack(side=tk.LEFT, padx=10)
-        tk.Button(button_frame, text="Save Race", command=self.save_race, bg="#3498DB", fg="white").pack(side=tk.LEFT, padx=10)
+        self.save_race_button = tk.Button(button_frame, text="Save Race", command=self.save_race, bg="#3498DB", fg="white")
+        self.save_race_button.pack(side=tk.LEFT, padx=10)
+        self.import_button = tk.Button(button_frame, text="Import Race Cards...", command=self.import_race_cards, bg="#8E44AD", fg="white")
+        self.import_button.pack(side=tk.LEFT, padx=10)
         
         # Results data
         self.results_data = []
@@ -162,8 +173,9 @@ class AdminGUI:
         self.load_owners()
         
         # Button
-        tk.Button(selection_frame, text="Delete Selected Owner", command=self.delete_owner, 
-                 bg="#E74C3C", fg="white", font=("Arial", 12, "bold")).pack(pady=20)
+        self.delete_owner_button = tk.Button(selection_frame, text="Delete Selected Owner", command=self.delete_owner, 
+                 bg="#E74C3C", fg="white", font=("Arial", 12, "bold"))
+        self.delete_owner_button.pack(pady=20)
         
     def create_move_horse_tab(self):
         """Create tab for moving horses between stables"""
@@ -198,20 +210,15 @@ class AdminGUI:
         self.move_stable_combo.grid(row=2, column=1, padx=10, pady=5)
         
         # Load stables for this combobox
-        try:
-            stables = self.db_manager.execute_query("SELECT stableId, stableName FROM Stable ORDER BY stableName")
-            if stables:
-                stable_names = [f"{stable['stableId']}: {stable['stableName']}" for stable in stables]
-                self.move_stable_combo['values'] = stable_names
-        except Exception as e:
-            print(f"Error loading stables for move horse tab: {e}")
+        self.load_stables(self.move_stable_combo)
         
         # Buttons
         button_frame = tk.Frame(move_frame, bg="#34495E")
         button_frame.pack(pady=20)
         
         tk.Button(button_frame, text="Check Horse Info", command=self.check_horse_info, bg="#F39C12", fg="white").pack(side=tk.LEFT, padx=10)
-        tk.Button(button_frame, text="Move Horse", command=self.move_horse, bg="#27AE60", fg="white").pack(side=tk.LEFT, padx=10)
+        self.move_horse_button = tk.Button(button_frame, text="Move Horse", command=self.move_horse, bg="#27AE60", fg="white")
+        self.move_horse_button.pack(side=tk.LEFT, padx=10)
         
         # Info frame
         info_frame = tk.Frame(move_frame, bg="#34495E")
@@ -254,66 +261,58 @@ class AdminGUI:
             self.trainer_stable_combo.grid(row=2, column=1, padx=10, pady=5)
             
             # Load stables for this combobox
-            try:
-                stables = self.db_manager.execute_query("SELECT stableId, stableName FROM Stable ORDER BY stableName")
-                if stables:
-                    stable_names = [f"{stable['stableId']}: {stable['stableName']}" for stable in stables]
-                    self.trainer_stable_combo['values'] = stable_names
-            except Exception as e:
-                print(f"Error loading stables for trainer tab: {e}")
+            self.load_stables(self.trainer_stable_combo)
             
             # Button
-            tk.Button(trainer_frame, text="Approve Trainer", command=self.approve_trainer, 
-                     bg="#27AE60", fg="white", font=("Arial", 12, "bold")).pack(pady=20)
+            self.approve_button = tk.Button(trainer_frame, text="Approve Trainer", command=self.approve_trainer, 
+                     bg="#27AE60", fg="white", font=("Arial", 12, "bold"))
+            self.approve_button.pack(pady=20)
         except Exception as e:
             print(f"Error creating approve trainer tab: {e}")
             messagebox.showerror("Error", f"Failed to create Approve Trainer tab: {e}")
         
     def load_tracks(self):
         """Load available tracks"""
-        try:
-            tracks = self.db_manager.execute_query("SELECT trackName FROM Track ORDER BY trackName")
-            if tracks:
-                track_names = [track['trackName'] for track in tracks]
+        def show_tracks(track_names):
+            if track_names:
                 self.track_combo['values'] = track_names
-                if track_names:
-                    self.track_combo.current(0)  # Select first track by default
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load tracks: {e}")
-    
-    def convert_position_to_text(self, position):
-        """Convert numeric position to text format for database consistency"""
-        position_map = {
-            1: 'first',
-            2: 'second',
-            3: 'third',
-            4: 'fourth',
-            5: 'fifth',
-            6: 'sixth',
-            7: 'seventh',
-            8: 'eighth',
-            9: 'ninth',
-            10: 'tenth'
-        }
-        return position_map.get(position, str(position))
+                self.track_combo.current(0)  # Select first track by default
+        
+        self.runner.submit(
+            self.repos.tracks.names,
+            on_success=show_tracks,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load tracks: {e}"),
+            spinner=self.spinner
+        )
     
     def load_owners(self):
         """Load owners for deletion"""
-        try:
-            owners = self.db_manager.execute_query("""
-                SELECT ownerId, CONCAT(fname, ' ', lname) as full_name 
-                FROM Owner ORDER BY lname, fname
-            """)
+        def show_owners(owners):
             if owners:
                 self.owner_listbox.delete(0, tk.END)
                 for owner in owners:
                     self.owner_listbox.insert(tk.END, f"{owner['ownerId']}: {owner['full_name']}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load owners: {e}")
+        
+        self.runner.submit(
+            self.repos.owners.list,
+            on_success=show_owners,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load owners: {e}"),
+            key='owners',
+            spinner=self.spinner
+        )
     
-    def load_stables(self):
-        """Load stables for selection - kept for compatibility but not actively used"""
-        pass
+    def load_stables(self, combo):
+        """Load stables into a combobox as "stableId: stableName" choices"""
+        def show_stables(stables):
+            if stables:
+                combo['values'] = [f"{stable['stableId']}: {stable['stableName']}" for stable in stables]
+        
+        self.runner.submit(
+            self.repos.stables.list,
+            on_success=show_stables,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to load stables: {e}"),
+            spinner=self.spinner
+        )
     
     def add_result(self):
         """Add a race result"""
@@ -345,35 +344,46 @@ class AdminGUI:
         def save_result():
             try:
                 horse_id = horse_id_var.get().strip()
-                position = int(position_var.get())
-                prize = float(prize_var.get())
+                position = parse_position(position_var.get())
+                prize = parse_prize(prize_var.get().strip())
                 
                 if not horse_id:
                     messagebox.showerror("Error", "Please enter a horse ID")
                     return
-                
-                # Verify the horse exists
-                horse_info = self.db_manager.execute_query("SELECT horseName FROM Horse WHERE horseId = %s", (horse_id,))
-                if not horse_info:
+            except ValueError as ve:
+                messagebox.showerror("Error", f"Invalid position or prize: {ve}")
+                return
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to add result: {e}")
+                return
+            
+            def add_horse(horse_name):
+                if not result_window.winfo_exists():
+                    return
+                if not horse_name:
                     messagebox.showerror("Error", f"Horse with ID '{horse_id}' not found")
                     return
                 
-                # Convert numeric position to text format for database consistency
-                position_text = self.convert_position_to_text(position)
-                
                 self.results_data.append({
                     'horseId': horse_id,
-                    'position': position_text,
+                    'position': position,
                     'prize': prize
                 })
                 
                 # Add to listbox
-                horse_name = horse_info[0]['horseName']
                 self.results_listbox.insert(tk.END, f"Position {position}: {horse_name} (Horse ID: {horse_id}) - ${prize:,.2f}")
                 
                 result_window.destroy()
-            except ValueError as ve:
-                messagebox.showerror("Error", "Please enter valid numbers for position and prize")
+            
+            try:
+                # Verify the horse exists
+                self.runner.submit(
+                    self.repos.horses.name, horse_id,
+                    on_success=add_horse,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to add result: {e}"),
+                    key='result_horse',
+                    spinner=self.spinner
+                )
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add result: {e}")
         
@@ -408,31 +418,18 @@ class AdminGUI:
                 messagebox.showerror("Error", "Please add at least one race result")
                 return
             
-            # Generate a unique race ID
-            import time
-            race_id = f"race{int(time.time()) % 100000}"
-            
-            # Insert race
-            query = """
-                INSERT INTO Race (raceId, raceName, trackName, raceDate, raceTime) 
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            result = self.db_manager.execute_query(query, (race_id, race_name, track_name, race_date, race_time))
+            race = {
+                'raceName': race_name,
+                'trackName': track_name,
+                'raceDate': race_date,
+                'raceTime': race_time,
+            }
+            results = [
+                (result_data['horseId'], result_data['position'], result_data['prize'])
+                for result_data in self.results_data
+            ]
             
-            if result is not None:
-                # Insert results
-                for result_data in self.results_data:
-                    query = """
-                        INSERT INTO RaceResults (raceId, horseId, results, prize) 
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    self.db_manager.execute_query(query, (
-                        race_id, 
-                        result_data['horseId'], 
-                        result_data['position'], 
-                        result_data['prize']
-                    ))
-                
+            def race_saved(race_id):
                 messagebox.showinfo("Success", f"Race added successfully! Race ID: {race_id}")
                 
                 # Clear form
@@ -442,12 +439,44 @@ class AdminGUI:
                 self.race_time_var.set("")
                 self.results_listbox.delete(0, tk.END)
                 self.results_data = []
-            else:
-                messagebox.showerror("Error", "Failed to add race")
+            
+            # The race and all of its results go in one transaction; Save stays
+            # disabled until it commits, so a double click can't add the race twice
+            self.runner.submit(
+                self.repos.races.add, race, results,
+                on_success=race_saved,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to save race: {e}"),
+                spinner=self.spinner,
+                busy=self.save_race_button
+            )
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save race: {e}")
     
+    def import_race_cards(self):
+        """Bulk import whole races with results from CSV or JSON files"""
+        paths = filedialog.askopenfilenames(
+            parent=self.root,
+            title="Select race card files",
+            filetypes=[("Race cards", "*.csv *.json"), ("CSV files", "*.csv"), ("JSON files", "*.json")]
+        )
+        if not paths:
+            return
+        
+        def imported(report):
+            if report.errors:
+                messagebox.showwarning("Import Finished With Errors", report.summary())
+            else:
+                messagebox.showinfo("Import Complete", report.summary())
+        
+        self.runner.submit(
+            race_import.import_race_cards, self.db_manager, paths,
+            on_success=imported,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to import race cards: {e}"),
+            spinner=self.spinner,
+            busy=self.import_button
+        )
+    
     def delete_owner(self):
         """Delete selected owner using stored procedure"""
         try:
@@ -461,11 +490,18 @@ class AdminGUI:
             
             # Confirm deletion
             if messagebox.askyesno("Confirm", f"Are you sure you want to delete owner {owner_id}? This will also remove all ownership relationships. This action cannot be undone."):
-                # Call stored procedure
-                result = self.db_manager.execute_procedure("DeleteOwner", [owner_id])
+                def owner_deleted(result):
+                    messagebox.showinfo("Success", f"Owner {owner_id} deleted successfully!")
+                    self.load_owners()  # Refresh the list
                 
-                messagebox.showinfo("Success", f"Owner {owner_id} deleted successfully!")
-                self.load_owners()  # Refresh the list
+                # Runs the DeleteOwner stored procedure
+                self.runner.submit(
+                    self.repos.owners.delete, owner_id,
+                    on_success=owner_deleted,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to delete owner: {e}"),
+                    spinner=self.spinner,
+                    busy=self.delete_owner_button
+                )
                     
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete owner: {e}")
@@ -479,21 +515,22 @@ class AdminGUI:
                 messagebox.showerror("Error", "Please enter a horse ID")
                 return
             
-            horse_info = self.db_manager.execute_query("""
-                SELECT h.horseName, h.age, h.gender, s.stableName
-                FROM Horse h
-                LEFT JOIN Stable s ON h.stableId = s.stableId
-                WHERE h.horseId = %s
-            """, (horse_id,))
+            def show_horse(horse):
+                if horse:
+                    self.current_stable_var.set(horse['stableName'] or 'No Stable')
+                    self.horse_info_label.config(text=f"Name: {horse['horseName']}, Age: {horse['age']}, Gender: {horse['gender']}")
+                else:
+                    messagebox.showerror("Error", "Horse not found")
+                    self.current_stable_var.set("")
+                    self.horse_info_label.config(text="")
             
-            if horse_info:
-                horse = horse_info[0]
-                self.current_stable_var.set(horse['stableName'] or 'No Stable')
-                self.horse_info_label.config(text=f"Name: {horse['horseName']}, Age: {horse['age']}, Gender: {horse['gender']}")
-            else:
-                messagebox.showerror("Error", "Horse not found")
-                self.current_stable_var.set("")
-                self.horse_info_label.config(text="")
+            self.runner.submit(
+                self.repos.horses.info, horse_id,
+                on_success=show_horse,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to get horse info: {e}"),
+                key='horse_info',
+                spinner=self.spinner
+            )
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to get horse info: {e}")
@@ -515,21 +552,27 @@ class AdminGUI:
             # Extract stable ID from the combobox text (format: "stableId: stableName")
             new_stable_id = new_stable_text.split(':')[0].strip()
             
-            # Verify the horse exists first
-            horse_check = self.db_manager.execute_query("SELECT horseId FROM Horse WHERE horseId = %s", (horse_id,))
-            if not horse_check:
-                messagebox.showerror("Error", f"Horse with ID '{horse_id}' not found")
-                return
+            def horse_moved(result):
+                if result > 0:
+                    messagebox.showinfo("Success", f"Horse {horse_id} moved to stable {new_stable_id} successfully!")
+                    self.check_horse_info()  # Refresh info
+                else:
+                    messagebox.showerror("Error", "Failed to move horse")
             
-            # Update horse stable
-            query = "UPDATE Horse SET stableId = %s WHERE horseId = %s"
-            result = self.db_manager.execute_query(query, (new_stable_id, horse_id))
+            def move_failed(e):
+                if isinstance(e, NotFound):
+                    messagebox.showerror("Error", str(e))
+                else:
+                    messagebox.showerror("Error", f"Failed to move horse: {e}")
             
-            if result is not None and result > 0:
-                messagebox.showinfo("Success", f"Horse {horse_id} moved to stable {new_stable_id} successfully!")
-                self.check_horse_info()  # Refresh info
-            else:
-                messagebox.showerror("Error", "Failed to move horse")
+            # Checks that the horse and stable exist first
+            self.runner.submit(
+                self.repos.horses.move, horse_id, new_stable_id,
+                on_success=horse_moved,
+                on_error=move_failed,
+                spinner=self.spinner,
+                busy=self.move_horse_button
+            )
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to move horse: {e}")
@@ -552,27 +595,27 @@ class AdminGUI:
             # Extract stable ID from the combobox text (format: "stableId: stableName")
             stable_id = stable_text.split(':')[0].strip()
             
-            # Generate a unique trainer ID using timestamp
-            import time
-            trainer_id = f"T{int(time.time()) % 100000}"
-            
-            # Insert new trainer
-            query = "INSERT INTO Trainer (trainerId, fname, lname, stableId) VALUES (%s, %s, %s, %s)"
-            result = self.db_manager.execute_query(query, (trainer_id, fname, lname, stable_id))
-            
-            if result is not None and result > 0:
+            def trainer_added(trainer_id):
                 messagebox.showinfo("Success", f"Trainer {fname} {lname} approved successfully!\nTrainer ID: {trainer_id}\nAssigned to Stable: {stable_id}")
                 # Clear form
                 self.trainer_fname_var.set("")
                 self.trainer_lname_var.set("")
                 self.trainer_stable_var.set("")
-            else:
-                messagebox.showerror("Error", "Failed to approve trainer")
+            
+            self.runner.submit(
+                self.repos.trainers.add, fname, lname, stable_id,
+                on_success=trainer_added,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to approve trainer: {e}"),
+                spinner=self.spinner,
+                busy=self.approve_button
+            )
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to approve trainer: {e}")
     
     def back_to_main(self):
         """Return to main menu"""
+        # Drop work still running so its results never reach destroyed widgets
+        self.runner.cancel_all()
         self.root.destroy()
         self.back_callback()
\ No newline at end of file
@@ -0,0 +1,422 @@
+"""
+Columnar analytics snapshot for Horse Racing Database System
+Copies Race, RaceResults, Horse, Trainer, Stable and Track into NumPy
+arrays, with every string id dictionary-encoded as a dense int32 code, and
+answers the guest reports (plus win rate by track and age) with vectorized
+group-bys instead of row-oriented joins in MySQL.
+
+The snapshot is saved as a compressed .npz file. A refresh only pulls races
+dated on or after the newest race date already loaded (and their results),
+plus the small Horse, Trainer, Stable and Track tables; edits to older races
+need a full rebuild.
+
+Usage:
+    python analytics_snapshot.py build [--path race_history.npz]
+    python analytics_snapshot.py refresh [--path race_history.npz]
+    python analytics_snapshot.py report win_rate_by_track_and_age [--limit 20]
+    python analytics_snapshot.py report track_stats --from 2024-01-01 --to 2024-06-30
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+import mysql.connector
+from mysql.connector import Error
+
+DEFAULT_PATH = 'race_history.npz'
+
+# Stand-ins for NULL in the integer columns
+NO_CODE = -1
+NO_DATE = np.iinfo(np.int32).min
+NO_POSITION = 0
+
+EPOCH = date(1970, 1, 1)
+
+# Largest tracks x horses table track_stats marks in memory (one byte each)
+# before it counts distinct horses by sorting instead
+MAX_PAIR_TABLE = 64 * 1024 * 1024
+
+RACES_QUERY = "SELECT raceId, raceName, trackName, raceDate FROM Race"
+RACES_SINCE_QUERY = RACES_QUERY + " WHERE raceDate >= %s"
+RESULTS_QUERY = "SELECT rr.raceId, rr.horseId, rr.position, rr.prize FROM RaceResults rr"
+RESULTS_SINCE_QUERY = RESULTS_QUERY + " JOIN Race r ON r.raceId = rr.raceId WHERE r.raceDate >= %s"
+HORSES_QUERY = "SELECT horseId, horseName, age, gender, stableId FROM Horse"
+TRAINERS_QUERY = "SELECT trainerId, CONCAT(fname, ' ', lname), stableId FROM Trainer"
+STABLES_QUERY = "SELECT stableId, stableName FROM Stable"
+TRACKS_QUERY = "SELECT trackName, location, length FROM Track"
+
+def to_day(value):
+    """date -> days since 1970-01-01, NO_DATE for NULL"""
+    return NO_DATE if value is None else (value - EPOCH).days
+
+def from_day(day):
+    return None if day == NO_DATE else EPOCH + timedelta(days=int(day))
+
+def text_array(values):
+    """Fixed-width unicode array, so the .npz loads without pickle"""
+    return np.array(["" if value is None else str(value) for value in values], dtype=str)
+
+class Dictionary:
+    """Dictionary encoding of string ids: each distinct value gets a dense int32 code"""
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        """Code for value, adding it if new; NO_CODE for NULL"""
+        if value is None:
+            return NO_CODE
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values):
+        return np.fromiter((self.code(value) for value in values), dtype=np.int32)
+
+    def decode(self, code):
+        return None if code == NO_CODE else self.values[code]
+
+def fit(column, size, fill):
+    """column grown to size entries, new ones set to fill"""
+    if len(column) >= size:
+        return column
+    return np.concatenate([column, np.full(size - len(column), fill, dtype=column.dtype)])
+
+class Snapshot:
+    """Race history as NumPy columns
+
+    Race columns are indexed by race code, horse columns by horse code and so
+    on; result columns are parallel arrays with one entry per RaceResults row.
+    """
+    def __init__(self):
+        self.races = Dictionary()
+        self.horses = Dictionary()
+        self.trainers = Dictionary()
+        self.stables = Dictionary()
+        self.tracks = Dictionary()
+
+        self.race_track = np.empty(0, dtype=np.int32)
+        self.race_day = np.empty(0, dtype=np.int32)
+        self.race_name = text_array([])
+
+        self.result_race = np.empty(0, dtype=np.int32)
+        self.result_horse = np.empty(0, dtype=np.int32)
+        self.result_position = np.empty(0, dtype=np.uint8)
+        self.result_prize = np.empty(0, dtype=np.int64)  # cents
+
+        self.horse_stable = np.empty(0, dtype=np.int32)
+        self.horse_age = np.empty(0, dtype=np.int16)
+        self.horse_gender = text_array([])
+        self.horse_name = text_array([])
+        self.trainer_stable = np.empty(0, dtype=np.int32)
+        self.trainer_name = text_array([])
+        self.stable_name = text_array([])
+        self.track_location = text_array([])
+        self.track_length = np.empty(0, dtype=np.int32)
+
+        # Newest race date loaded; the next refresh starts from it
+        self.high_water = NO_DATE
+
+    # -- loading -------------------------------------------------------------
+
+    def refresh(self, connection):
+        """Pull what changed since the last load; a new snapshot loads everything
+
+        Returns (races added, results added).
+        """
+        cursor = connection.cursor()
+        try:
+            self._load_dimensions(cursor)
+            if self.high_water == NO_DATE:
+                cursor.execute(RACES_QUERY)
+                races = cursor.fetchall()
+                cursor.execute(RESULTS_QUERY)
+                results = cursor.fetchall()
+            else:
+                since = from_day(self.high_water)
+                cursor.execute(RACES_SINCE_QUERY, (since,))
+                races = cursor.fetchall()
+                cursor.execute(RESULTS_SINCE_QUERY, (since,))
+                results = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        # Races from the high-water day itself may already be loaded
+        known = len(self.races)
+        races = [row for row in races if row[0] not in self.races.codes]
+        self._add_races(races)
+        results = [row for row in results if self.races.codes.get(row[0], NO_CODE) >= known]
+        self._add_results(results)
+        return len(races), len(results)
+
+    def _load_dimensions(self, cursor):
+        cursor.execute(STABLES_QUERY)
+        rows = cursor.fetchall()
+        codes = self.stables.encode(row[0] for row in rows)
+        self.stable_name = self._set_text(self.stable_name, len(self.stables), codes, (row[1] for row in rows))
+
+        cursor.execute(TRACKS_QUERY)
+        rows = cursor.fetchall()
+        codes = self.tracks.encode(row[0] for row in rows)
+        self.track_location = self._set_text(self.track_location, len(self.tracks), codes,
+                                             (row[1] for row in rows))
+        self.track_length = fit(self.track_length, len(self.tracks), 0)
+        self.track_length[codes] = [row[2] or 0 for row in rows]
+
+        cursor.execute(TRAINERS_QUERY)
+        rows = cursor.fetchall()
+        codes = self.trainers.encode(row[0] for row in rows)
+        self.trainer_name = self._set_text(self.trainer_name, len(self.trainers), codes, (row[1] for row in rows))
+        self.trainer_stable = fit(self.trainer_stable, len(self.trainers), NO_CODE)
+        self.trainer_stable[codes] = self.stables.encode(row[2] for row in rows)
+
+        cursor.execute(HORSES_QUERY)
+        rows = cursor.fetchall()
+        codes = self.horses.encode(row[0] for row in rows)
+        self.horse_name = self._set_text(self.horse_name, len(self.horses), codes, (row[1] for row in rows))
+        self.horse_gender = self._set_text(self.horse_gender, len(self.horses), codes, (row[3] for row in rows))
+        self.horse_age = fit(self.horse_age, len(self.horses), -1)
+        self.horse_age[codes] = [-1 if row[2] is None else row[2] for row in rows]
+        self.horse_stable = fit(self.horse_stable, len(self.horses), NO_CODE)
+        self.horse_stable[codes] = self.stables.encode(row[4] for row in rows)
+
+    @staticmethod
+    def _set_text(column, size, codes, values):
+        values = list(values)
+        width = max([column.dtype.itemsize // 4, 1] + [len(str(value)) for value in values if value is not None])
+        grown = np.full(size, "", dtype=f"<U{width}")
+        grown[:len(column)] = column
+        grown[codes] = text_array(values) if values else grown[codes]
+        return grown
+
+    def _add_races(self, rows):
+        if not rows:
+            return
+        self.races.encode(row[0] for row in rows)
+        self.race_name = np.concatenate([self.race_name, text_array(row[1] for row in rows)])
+        self.race_track = np.concatenate([self.race_track, self.tracks.encode(row[2] for row in rows)])
+        days = np.fromiter((to_day(row[3]) for row in rows), dtype=np.int32)
+        self.race_day = np.concatenate([self.race_day, days])
+        dated = days[days != NO_DATE]
+        if len(dated):
+            self.high_water = max(self.high_water, int(dated.max()))
+
+    def _add_results(self, rows):
+        if not rows:
+            return
+        self.result_race = np.concatenate([self.result_race, self.races.encode(row[0] for row in rows)])
+        self.result_horse = np.concatenate([self.result_horse, self.horses.encode(row[1] for row in rows)])
+        self.result_position = np.concatenate([self.result_position, np.fromiter(
+            (NO_POSITION if row[2] is None else row[2] for row in rows), dtype=np.uint8)])
+        self.result_prize = np.concatenate([self.result_prize, np.fromiter(
+            (0 if row[3] is None else int(round(row[3] * 100)) for row in rows), dtype=np.int64)])
+        # Results can name horses that arrived after the dimension load
+        self.horse_stable = fit(self.horse_stable, len(self.horses), NO_CODE)
+        self.horse_age = fit(self.horse_age, len(self.horses), -1)
+        self.horse_name = self._set_text(self.horse_name, len(self.horses), [], [])
+        self.horse_gender = self._set_text(self.horse_gender, len(self.horses), [], [])
+
+    # -- persistence ---------------------------------------------------------
+
+    DICTIONARIES = ('races', 'horses', 'trainers', 'stables', 'tracks')
+    COLUMNS = ('race_track', 'race_day', 'race_name',
+               'result_race', 'result_horse', 'result_position', 'result_prize',
+               'horse_stable', 'horse_age', 'horse_gender', 'horse_name',
+               'trainer_stable', 'trainer_name', 'stable_name', 'track_location', 'track_length')
+
+    def save(self, path=DEFAULT_PATH):
+        arrays = {name: getattr(self, name) for name in self.COLUMNS}
+        arrays.update({f"ids_{name}": text_array(getattr(self, name).values) for name in self.DICTIONARIES})
+        arrays['high_water'] = np.array([self.high_water], dtype=np.int32)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        snapshot = cls()
+        with np.load(path, allow_pickle=False) as data:
+            for name in cls.COLUMNS:
+                setattr(snapshot, name, data[name])
+            for name in cls.DICTIONARIES:
+                setattr(snapshot, name, Dictionary(data[f"ids_{name}"].tolist()))
+            snapshot.high_water = int(data['high_water'][0])
+        return snapshot
+
+    def __len__(self):
+        return len(self.result_race)
+
+# -- reports -----------------------------------------------------------------
+
+def cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+def trainer_winnings(snapshot, limit=None):
+    """Total prize money and wins per trainer, richest first (TRAINER_WINNINGS)"""
+    s = snapshot
+    stables = len(s.stables)
+    result_stable = s.horse_stable[s.result_horse]
+    counted = result_stable != NO_CODE
+    stable_prize = np.bincount(result_stable[counted], weights=s.result_prize[counted], minlength=stables)
+    stable_wins = np.bincount(result_stable[counted & (s.result_position == 1)], minlength=stables)
+
+    has_stable = s.trainer_stable != NO_CODE
+    prize = np.where(has_stable, stable_prize[np.maximum(s.trainer_stable, 0)], 0).round().astype(np.int64)
+    wins = np.where(has_stable, stable_wins[np.maximum(s.trainer_stable, 0)], 0)
+    order = np.argsort(-prize, kind='stable')[:limit]
+    return [{
+        'trainer_name': s.trainer_name[i],
+        'total_winnings': cents(prize[i]),
+        'num_wins': int(wins[i]),
+        'stableName': s.stable_name[s.trainer_stable[i]] if has_stable[i] else None,
+    } for i in order]
+
+def winning_trainers(snapshot, limit=200):
+    """Every (trainer, winning horse, race), newest race first (WINNING_TRAINERS)"""
+    s = snapshot
+    winners = np.flatnonzero((s.result_position == 1) & (s.race_track[s.result_race] != NO_CODE))
+    winner_stable = s.horse_stable[s.result_horse[winners]]
+
+    # Each winner is credited to every trainer of the horse's stable
+    by_stable = np.argsort(s.trainer_stable, kind='stable')
+    sorted_stables = s.trainer_stable[by_stable]
+    first = np.searchsorted(sorted_stables, winner_stable, 'left')
+    counts = np.searchsorted(sorted_stables, winner_stable, 'right') - first
+    counts[winner_stable == NO_CODE] = 0
+    row_result = np.repeat(winners, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    row_trainer = by_stable[np.repeat(first, counts) + offsets]
+
+    race = s.result_race[row_result]
+    order = np.lexsort((row_trainer, race, s.race_day[race]))[::-1][:limit]
+    return [{
+        'trainer_name': s.trainer_name[row_trainer[i]],
+        'horse_name': s.horse_name[s.result_horse[row_result[i]]],
+        'raceName': s.race_name[race[i]],
+        'trackName': s.tracks.decode(s.race_track[race[i]]),
+        'raceDate': from_day(s.race_day[race[i]]),
+        'prize': cents(s.result_prize[row_result[i]]),
+    } for i in order]
+
+def track_stats(snapshot, first_day=None, last_day=None):
+    """Races and distinct horses per track, optionally for races between two dates (TRACK_STATS)"""
+    s = snapshot
+    tracks = len(s.tracks)
+    in_range = s.race_track != NO_CODE
+    if first_day is not None:
+        in_range &= (s.race_day != NO_DATE) & (s.race_day >= to_day(first_day))
+    if last_day is not None:
+        in_range &= (s.race_day != NO_DATE) & (s.race_day <= to_day(last_day))
+    races = np.bincount(s.race_track[in_range], minlength=tracks)
+
+    counted = in_range[s.result_race]
+    pairs = (s.race_track[s.result_race[counted]].astype(np.int64) * len(s.horses)
+             + s.result_horse[counted])
+    if tracks * len(s.horses) <= MAX_PAIR_TABLE:
+        # Mark each (track, horse) seen; cheaper than sorting the pairs
+        seen = np.zeros(tracks * len(s.horses), dtype=bool)
+        seen[pairs] = True
+        horses = seen.reshape(tracks, len(s.horses)).sum(axis=1)
+    else:
+        horses = np.bincount(np.unique(pairs) // len(s.horses), minlength=tracks)
+    order = np.argsort(text_array(s.tracks.values), kind='stable')
+    return [{
+        'trackName': s.tracks.values[i],
+        'location': s.track_location[i],
+        'length': int(s.track_length[i]) or None,
+        'num_races': int(races[i]),
+        'total_horses': int(horses[i]),
+    } for i in order]
+
+def win_rate_by_track_and_age(snapshot, limit=None, min_starts=1):
+    """Starts, wins and win rate per (track, horse age), highest win rate first"""
+    s = snapshot
+    track = s.race_track[s.result_race]
+    age = s.horse_age[s.result_horse].astype(np.int64)
+    known = (track != NO_CODE) & (age >= 0)
+    ages = int(age[known].max()) + 1 if known.any() else 1
+    group = track[known].astype(np.int64) * ages + age[known]
+    size = len(s.tracks) * ages
+    starts = np.bincount(group, minlength=size)
+    wins = np.bincount(group[s.result_position[known] == 1], minlength=size)
+
+    present = np.flatnonzero(starts >= min_starts)
+    rate = wins[present] / starts[present]
+    order = present[np.lexsort((-starts[present], -rate))][:limit]
+    return [{
+        'trackName': s.tracks.values[g // ages],
+        'age': int(g % ages),
+        'starts': int(starts[g]),
+        'wins': int(wins[g]),
+        'win_rate': float(wins[g] / starts[g]),
+    } for g in order]
+
+# name -> function(snapshot, ...) returning report rows as dicts
+REPORTS = {
+    'trainer_winnings': trainer_winnings,
+    'winning_trainers': winning_trainers,
+    'track_stats': track_stats,
+    'win_rate_by_track_and_age': win_rate_by_track_and_age,
+}
+
+def connect():
+    return mysql.connector.connect(
+        host="127.0.0.1",
+        user="root",
+        password="Asd11011",
+        database="Horses"
+    )
+
+def main(argv=None):
+    """Build, refresh or query the snapshot"""
+    parser = argparse.ArgumentParser(description="Columnar snapshot of race history for fast analytics")
+    parser.add_argument('command', choices=('build', 'refresh', 'report'))
+    parser.add_argument('report', nargs='?', choices=sorted(REPORTS), help="report to run")
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f"snapshot file (default {DEFAULT_PATH})")
+    parser.add_argument('--limit', type=int, default=20, help="rows to print (default 20)")
+    parser.add_argument('--from', dest='first_day', type=date.fromisoformat, help="track_stats: first race date")
+    parser.add_argument('--to', dest='last_day', type=date.fromisoformat, help="track_stats: last race date")
+    args = parser.parse_args(argv)
+
+    if args.command in ('build', 'refresh'):
+        try:
+            snapshot = Snapshot() if args.command == 'build' else Snapshot.load(args.path)
+            start = time.perf_counter()
+            connection = connect()
+            races, results = snapshot.refresh(connection)
+            connection.close()
+        except (Error, OSError) as e:
+            print(f"Error: {e}")
+            return 1
+        snapshot.save(args.path)
+        print(f"Added {races} races and {results} results in {time.perf_counter() - start:.1f}s; "
+              f"{len(snapshot)} results in {args.path}")
+        return 0
+
+    if not args.report:
+        parser.error("report needs a report name")
+    try:
+        snapshot = Snapshot.load(args.path)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    start = time.perf_counter()
+    if args.report == 'track_stats':
+        rows = track_stats(snapshot, args.first_day, args.last_day)[:args.limit]
+    else:
+        rows = REPORTS[args.report](snapshot, limit=args.limit)
+    elapsed = time.perf_counter() - start
+    for row in rows:
+        print("  ".join(f"{value}" for value in row.values()))
+    print(f"{args.report}: {elapsed * 1000:.1f} ms over {len(snapshot)} results")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
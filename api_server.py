@@ -0,0 +1,608 @@
+"""
+HTTP/JSON API for Horse Racing Database System
+Serves the four guest reports and the admin write operations without a
+display, for dashboards that need the same data as the GUI.
+
+Built on asyncio streams. mysql.connector is blocking, so database calls
+run on worker threads, one per pooled DatabaseManager connection, and the
+event loop stays free to serve other clients meanwhile. Reports are
+streamed as a chunked JSON array, one keyset page at a time (to HTTP/1.0
+clients unchunked, ending when the connection closes), and each endpoint
+has its own limit on requests served at once.
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8080] [--pool-size 10]
+    python api_server.py --admin-token SECRET    also enable the admin endpoints
+
+Endpoints:
+    GET    /health
+    GET    /metrics                              statement timings as Prometheus text (?format=json)
+    GET    /reports/horses?owner=smi             (or ?name=thun)
+    GET    /reports/winning-trainers?limit=50      (optionally &from=2024-01&to=2024-06, &archived=1)
+    GET    /reports/trainer-winnings?from=2024-01  (or every race without from/to; &archived=1)
+    GET    /reports/track-stats?from=2024-01&to=2024-06  (optionally &archived=1)
+    POST   /admin/races                          {"raceName", "trackName", "raceDate", "raceTime",
+                                                  "results": [{"horseId", "position", "prize"}]}
+    DELETE /admin/owners/<ownerId>
+    POST   /admin/horses/<horseId>/stable        {"stableId"}
+    POST   /admin/trainers                       {"fname", "lname", "stableId"}
+
+Reports cover the live tables; races moved out by archiver.py are only
+counted with ?archived=1, which reads the slower history views.
+
+Admin requests must send "Authorization: Bearer <token>". Prize amounts
+are returned as strings so no cents are lost to floating point.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import hmac
+import json
+import logging
+import os
+import re
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+import report_queries
+from data_access import (ConnectionFailed, ConstraintViolation, DatabaseManager, InvalidData, NotFound,
+                         Repositories)
+from data_access.instrumentation import call_site
+from name_search import NameSearch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+DEFAULT_POOL_SIZE = 10
+
+# Requests served at once per endpoint; the rest wait up to QUEUE_SECONDS
+# and then get 503, so one slow report can't take every pooled connection
+LIMITS = {
+    'horses': 8,
+    'winning_trainers': 4,
+    'trainer_winnings': 8,
+    'track_stats': 8,
+    'admin': 2,
+}
+QUEUE_SECONDS = 5.0
+
+# Idle time allowed between requests on a kept-alive connection
+KEEP_ALIVE_SECONDS = 15.0
+MAX_HEADERS = 100
+MAX_BODY = 1024 * 1024
+
+TOKEN_VARIABLE = 'HORSES_API_TOKEN'
+
+# (method, path pattern, handler, LIMITS entry)
+ROUTES = [
+    ('GET', r'/health', 'health', None),
+    ('GET', r'/metrics', 'metrics', None),
+    ('GET', r'/reports/horses', 'horses', 'horses'),
+    ('GET', r'/reports/winning-trainers', 'winning_trainers', 'winning_trainers'),
+    ('GET', r'/reports/trainer-winnings', 'trainer_winnings', 'trainer_winnings'),
+    ('GET', r'/reports/track-stats', 'track_stats', 'track_stats'),
+    ('POST', r'/admin/races', 'add_race', 'admin'),
+    ('DELETE', r'/admin/owners/([^/]+)', 'delete_owner', 'admin'),
+    ('POST', r'/admin/horses/([^/]+)/stable', 'move_horse', 'admin'),
+    ('POST', r'/admin/trainers', 'approve_trainer', 'admin'),
+]
+
+# Columns each report returns; the rest of a row is only there for paging
+REPORT_FIELDS = {
+    'horses': ('horseId', 'horseName', 'age', 'gender', 'trainer_name'),
+    'winning_trainers': ('trainer_name', 'horse_name', 'raceName', 'trackName', 'raceDate', 'prize'),
+    'trainer_winnings': ('trainer_name', 'total_winnings', 'num_wins', 'stableName'),
+    'track_stats': ('trackName', 'location', 'length', 'num_races', 'total_horses'),
+}
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def error_status(error):
+    """HTTP status for a data access or unexpected error"""
+    if isinstance(error, InvalidData):
+        return 400
+    if isinstance(error, NotFound):
+        return 404
+    if isinstance(error, ConstraintViolation):
+        return 409
+    if isinstance(error, ConnectionFailed):
+        return 503
+    return 500
+
+def to_json(value):
+    """json.dumps default for the types MySQL rows contain"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        # TIME columns come back as timedelta
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'replace')
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(payload):
+    return json.dumps(payload, default=to_json, separators=(',', ':')).encode('utf-8')
+
+class Request:
+    """One parsed HTTP/1.x request"""
+    def __init__(self, method, path, query, headers, body, version):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.version = version
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+        """The body as a JSON object"""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise ApiError(400, "request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise ApiError(400, "request body must be a JSON object")
+        return data
+
+    def limit(self):
+        """The ?limit= row cap, or None for every row"""
+        value = self.query.get('limit')
+        if value is None:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ApiError(400, "limit must be a positive integer")
+        return limit
+
+async def read_request(reader, writer):
+    """Parse the next request on a connection, or return None once the client is done"""
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            raise ApiError(400, "malformed request line")
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise ApiError(431, "too many headers")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+    except ValueError:
+        # The stream reader refuses lines over its 64 KiB buffer
+        raise ApiError(400, "request line or header too long")
+
+    if 'transfer-encoding' in headers:
+        raise ApiError(411, "send the body with a Content-Length")
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise ApiError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise ApiError(413, f"request body over {MAX_BODY} bytes")
+    if length > 0 and headers.get('expect', '').lower() == '100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        await writer.drain()
+    body = await reader.readexactly(length) if length > 0 else b''
+
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return Request(method.upper(), unquote(url.path), query, headers, body, version)
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+class Response:
+    """A JSON body, a plain text body, or a stream of row pages sent as one JSON array"""
+    def __init__(self, status=200, payload=None, pages=None, headers=(), text=None):
+        self.status = status
+        self.payload = payload
+        self.pages = pages
+        self.headers = list(headers)
+        self.text = text
+
+    async def write(self, writer, keep_alive, chunked=True):
+        """Send the response; returns whether the connection can carry another request
+
+        HTTP/1.0 clients can't decode chunked bodies, so with chunked false a
+        stream of pages is sent as is and closing the connection ends it.
+        """
+        if self.pages is None:
+            if self.text is None:
+                body, content_type = dumps(self.payload), 'application/json'
+            else:
+                body, content_type = self.text.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+            writer.write(response_head(self.status, self.headers + [
+                ('Content-Type', content_type),
+                ('Content-Length', len(body)),
+                ('Connection', 'keep-alive' if keep_alive else 'close'),
+            ]) + body)
+            await writer.drain()
+            return keep_alive
+
+        # Fetch the first page before the status line, so a failing query still gets a proper error
+        try:
+            first = await self.pages.__anext__()
+        except StopAsyncIteration:
+            first = []
+        if chunked:
+            framing = [('Transfer-Encoding', 'chunked'), ('Connection', 'keep-alive' if keep_alive else 'close')]
+        else:
+            keep_alive = False
+            framing = [('Connection', 'close')]
+        writer.write(response_head(self.status, self.headers + [('Content-Type', 'application/json')] + framing))
+        separator = b'['
+        page = first
+        try:
+            while True:
+                if page:
+                    data = separator + b','.join(dumps(row) for row in page)
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data) if chunked else data)
+                    separator = b','
+                    # Wait for slow clients rather than buffering the whole report
+                    await writer.drain()
+                try:
+                    page = await self.pages.__anext__()
+                except StopAsyncIteration:
+                    break
+        except Exception as e:
+            # Too late for an error status; ending without the last chunk (or
+            # the closing bracket) tells the client it's incomplete
+            logger.warning("Report stream failed: %s", e)
+            return False
+        tail = b'[]' if separator == b'[' else b']'
+        writer.write(b'%x\r\n%s\r\n0\r\n\r\n' % (len(tail), tail) if chunked else tail)
+        await writer.drain()
+        return keep_alive
+
+def error_response(status, message, headers=()):
+    return Response(status, {'error': message}, headers=headers)
+
+class AsyncDatabase:
+    """Awaitable front for a DatabaseManager
+
+    Calls run on worker threads, one per pooled connection; more workers
+    would only wait inside the pool. Errors are raised, never shown.
+    """
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._executor = ThreadPoolExecutor(max_workers=db_manager.pool_size, thread_name_prefix='api-db')
+
+    async def run(self, func, *args):
+        """Run a blocking call on a worker thread, in the caller's context so its call site carries over"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, partial(func, *args))
+
+    async def query(self, query, params=None, use_cache=False):
+        return await self.run(partial(self.db_manager.execute_query, use_cache=use_cache), query, params)
+
+    async def pages(self, paged_query, params=(), limit=None, fields=None):
+        """Yield the rows of a PagedQuery a keyset page at a time, up to limit rows
+
+        Pages go through the result cache, so dashboards polling the same
+        report share one query per page until a write invalidates it.
+        """
+        sent = 0
+        last_key = None
+        while limit is None or sent < limit:
+            size = report_queries.PAGE_SIZE if limit is None else min(report_queries.PAGE_SIZE, limit - sent)
+            sql, args = paged_query.page(params, last_key, size)
+            rows = await self.query(sql, args, use_cache=True)
+            if not rows:
+                return
+            yield [{field: row[field] for field in fields} if fields else row for row in rows]
+            sent += len(rows)
+            if len(rows) < size:
+                return
+            last_key = paged_query.key_of(rows[-1])
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+def parse_month(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise ApiError(400, f"{name} must be a month as YYYY-MM")
+
+def month_range(request):
+    """(first, last) month of ?from= and ?to=, None if neither is given"""
+    month_from = request.query.get('from', '').strip()
+    month_to = request.query.get('to', '').strip()
+    if not (month_from or month_to):
+        return None
+    first = parse_month(month_from or "1900-01", 'from')
+    last = parse_month(month_to or "9999-12", 'to')
+    if first > last:
+        raise ApiError(400, "from must not be after to")
+    return first, last
+
+def include_archived(request):
+    """True if ?archived= asks for races moved out by archiver.py as well"""
+    return request.query.get('archived', '').strip().lower() in ('1', 'true', 'yes')
+
+class ApiServer:
+    """Routes requests to the reports and admin operations"""
+    def __init__(self, db_manager, name_search=None, admin_token=None):
+        self.db_manager = db_manager
+        self.db = AsyncDatabase(db_manager)
+        self.repos = Repositories(db_manager)
+        self._owns_name_search = name_search is None
+        self.name_search = name_search or NameSearch(db_manager)
+        self.admin_token = admin_token
+        self.routes = [(method, re.compile(pattern), getattr(self, handler), limit)
+                       for method, pattern, handler, limit in ROUTES]
+        self.limits = {name: asyncio.Semaphore(size) for name, size in LIMITS.items()}
+        self.active = {name: 0 for name in LIMITS}
+        self.rejected = {name: 0 for name in LIMITS}
+
+    def close(self):
+        if self._owns_name_search:
+            self.name_search.close()
+        self.db.close()
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one client connection until it closes or goes idle"""
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, writer), KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                except ApiError as e:
+                    await error_response(e.status, str(e)).write(writer, False)
+                    break
+                if request is None:
+                    break
+                keep_alive = await self.respond(request, writer, request.keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, request, writer, keep_alive):
+        """Route one request, holding its endpoint's slot until the response is written"""
+        allowed = []
+        for method, pattern, handler, limit in self.routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            break
+        else:
+            if allowed:
+                return await error_response(405, "method not allowed",
+                                            [('Allow', ", ".join(allowed))]).write(writer, keep_alive)
+            return await error_response(404, "not found").write(writer, keep_alive)
+
+        chunked = request.version != 'HTTP/1.0'
+        # Statements run for this request, streamed pages included, are timed under its handler
+        with call_site(f"ApiServer.{handler.__name__}"):
+            if limit is None:
+                return await (await self.call(handler, request, match)).write(writer, keep_alive, chunked)
+
+            try:
+                await asyncio.wait_for(self.limits[limit].acquire(), QUEUE_SECONDS)
+            except asyncio.TimeoutError:
+                self.rejected[limit] += 1
+                return await error_response(503, "server busy, try again shortly",
+                                            [('Retry-After', '1')]).write(writer, keep_alive)
+            self.active[limit] += 1
+            try:
+                response = await self.call(handler, request, match)
+                try:
+                    return await response.write(writer, keep_alive, chunked)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # The first page failed, before anything was sent
+                    logger.error("Error handling %s %s: %s", request.method, request.path, e)
+                    return await error_response(error_status(e), str(e)).write(writer, keep_alive)
+            finally:
+                self.active[limit] -= 1
+                self.limits[limit].release()
+
+    async def call(self, handler, request, match):
+        """Run a handler and turn its failures into error responses"""
+        try:
+            return await handler(request, *(unquote(group) for group in match.groups()))
+        except ApiError as e:
+            return error_response(e.status, str(e))
+        except Exception as e:
+            status = error_status(e)
+            if status >= 500:
+                logger.error("Error handling %s %s: %s", request.method, request.path, e)
+            return error_response(status, str(e))
+
+    def check_admin(self, request):
+        if not self.admin_token:
+            raise ApiError(403, f"admin endpoints are disabled; start the server with --admin-token or {TOKEN_VARIABLE}")
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), self.admin_token.encode()):
+            raise ApiError(401, "missing or wrong admin token")
+
+    def report(self, name, query, params, request):
+        return Response(pages=self.db.pages(query, params, request.limit(), REPORT_FIELDS[name]))
+
+    async def health(self, request):
+        await self.db.query("SELECT 1")
+        return Response(payload={
+            'status': 'ok',
+            'pool': self.db_manager.get_pool_stats(),
+            'result_cache': self.db_manager.get_result_cache_stats(),
+            'endpoints': {name: {'limit': LIMITS[name], 'active': self.active[name],
+                                 'rejected': self.rejected[name]} for name in LIMITS},
+        })
+
+    async def metrics(self, request):
+        """Statement counts and per-call-site latency histograms of the database manager"""
+        if request.query.get('format') == 'json':
+            return Response(payload=self.db_manager.get_query_stats())
+        return Response(text=self.db_manager.query_stats.to_prometheus())
+
+    async def horses(self, request):
+        """Horses by owner last name (?owner=) or horse name (?name=), substring match"""
+        kind = 'owner' if 'owner' in request.query else 'horse'
+        text = request.query.get('owner' if kind == 'owner' else 'name', '').strip()
+        if not text:
+            raise ApiError(400, "give ?owner= or ?name=")
+        # May load the name index from the database, so it runs on a worker thread
+        found = await self.db.run(self.name_search.horses_query, kind, text)
+        if found is None:
+            return Response(payload=[])
+        query, params = found
+        return self.report('horses', query, params, request)
+
+    async def winning_trainers(self, request):
+        """Trainers of winners, newest first, for every race or ?from= to ?to= months
+
+        ?archived=1 includes races moved out by archiver.py.
+        """
+        months = month_range(request)
+        archived = include_archived(request)
+        if months is None:
+            query = report_queries.WINNING_TRAINERS_HISTORY if archived else report_queries.WINNING_TRAINERS
+            return self.report('winning_trainers', query, (), request)
+        query = report_queries.WINNING_TRAINERS_HISTORY_RANGE if archived else report_queries.WINNING_TRAINERS_RANGE
+        return self.report('winning_trainers', query, report_queries.date_range_params(*months), request)
+
+    async def trainer_winnings(self, request):
+        """Prize money and wins per trainer over live races, every race or ?from= to ?to= months
+
+        ?archived=1 includes races moved out by archiver.py.
+        """
+        months = month_range(request)
+        archived = include_archived(request)
+        if months is None:
+            query = report_queries.TRAINER_WINNINGS_HISTORY if archived else report_queries.TRAINER_WINNINGS
+            return self.report('trainer_winnings', query, (), request)
+        query = report_queries.TRAINER_WINNINGS_HISTORY_RANGE if archived else report_queries.TRAINER_WINNINGS_RANGE
+        return self.report('trainer_winnings', query, report_queries.month_days(*months), request)
+
+    async def track_stats(self, request):
+        """Track statistics over live races, every race or ?from= to ?to= months
+
+        ?archived=1 includes races moved out by archiver.py.
+        """
+        months = month_range(request)
+        archived = include_archived(request)
+        if months is None:
+            query = report_queries.TRACK_STATS_HISTORY if archived else report_queries.TRACK_STATS
+            return self.report('track_stats', query, (), request)
+        if archived:
+            return self.report('track_stats', report_queries.TRACK_STATS_HISTORY_RANGE,
+                               report_queries.month_days(*months), request)
+        return self.report('track_stats', report_queries.TRACK_STATS_RANGE,
+                           report_queries.track_stats_range_params(*months), request)
+
+    async def add_race(self, request):
+        self.check_admin(request)
+        data = request.json()
+        results = data.get('results')
+        if not isinstance(results, list) or not all(isinstance(result, dict) for result in results):
+            raise ApiError(400, "results must be a list of {horseId, position, prize} objects")
+        race_id = await self.db.run(self.repos.races.add, data, [
+            (result.get('horseId'), result.get('position'), result.get('prize')) for result in results
+        ])
+        return Response(201, {'raceId': race_id})
+
+    async def delete_owner(self, request, owner_id):
+        self.check_admin(request)
+        await self.db.run(self.repos.owners.delete, owner_id)
+        return Response(payload={'deleted': owner_id})
+
+    async def move_horse(self, request, horse_id):
+        self.check_admin(request)
+        stable_id = request.json().get('stableId')
+        await self.db.run(self.repos.horses.move, horse_id, stable_id)
+        return Response(payload={'horseId': horse_id, 'stableId': stable_id})
+
+    async def approve_trainer(self, request):
+        self.check_admin(request)
+        data = request.json()
+        trainer_id = await self.db.run(self.repos.trainers.add, data.get('fname'), data.get('lname'),
+                                       data.get('stableId'))
+        return Response(201, {'trainerId': trainer_id})
+
+async def serve(host, port, pool_size, admin_token=None):
+    """Run the API until interrupted"""
+    db_manager = DatabaseManager(pool_size=pool_size)
+    api = ApiServer(db_manager, admin_token=admin_token)
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    print(f"Serving on http://{host}:{port} with {pool_size} database connections"
+          + ("" if admin_token else " (admin endpoints disabled)"))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        server.close()
+        api.close()
+        db_manager.close_connection()
+
+def main(argv=None):
+    """Start the API server"""
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the guest reports and admin operations")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE,
+                        help=f"database connections, and worker threads (default {DEFAULT_POOL_SIZE})")
+    parser.add_argument('--admin-token', default=os.environ.get(TOKEN_VARIABLE),
+                        help=f"bearer token for the admin endpoints (default ${TOKEN_VARIABLE}); "
+                             "without one they are disabled")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size, args.admin_token))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
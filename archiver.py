@@ -0,0 +1,298 @@
+"""
+Cold history archiver for Horse Racing Database System
+Moves races dated before a cutoff, with their results, out of Race and
+RaceResults into the compressed race_archive and race_results_archive
+tables, and old_info rows of horses deleted before the cutoff into
+old_info_archive, so the live tables and the reports reading them stay
+the same size however many seasons pass. The race_history,
+race_results_history and old_info_history views still show everything
+(migrations/008_history_archive.py).
+
+Whole raceDate partitions before the cutoff are swapped out at once (see
+partitions.py); the remaining races move a chunk at a time, each chunk in
+its own short transaction, with a pause between chunks so writers to the
+live tables never wait long. The delete triggers keep trainer_stats and
+the track rollups in step, so the reports count only live races unless
+asked to include archived ones (report_queries.py *_HISTORY). Archived
+races keep their raceId reserved in race_ids, so a card can't bring an
+archived race back as a second race under the same id.
+
+Archived races can also be exported to a compressed .npz file and purged
+from the archive tables, to keep them off the database server entirely.
+
+Usage:
+    python archiver.py status
+    python archiver.py move --before 2019-01-01 [--chunk-races 500] [--pause 0.05]
+    python archiver.py export --before 2016-01-01 --path races_before_2016.npz [--purge]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import mysql.connector
+from mysql.connector import Error
+import partitions
+from partitions import ARCHIVE_TABLES, ARCHIVING_FLAG
+from analytics_snapshot import text_array, to_day
+from report_queries import in_list
+
+# Races (with their results) moved per transaction
+DEFAULT_CHUNK_RACES = 500
+# old_info rows moved per transaction
+DEFAULT_CHUNK_ROWS = 2000
+# Seconds between chunks, letting queued writers through
+DEFAULT_PAUSE = 0.05
+
+
+TABLE_SIZES = """
+    SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH, ROW_FORMAT
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({names})
+"""
+
+# Next chunk of races before the cutoff, in raceId order; raceDate prunes the partitions
+RACE_CHUNK = """
+    SELECT raceId, raceDate FROM {races}
+    WHERE raceDate < %s AND raceId > %s
+    ORDER BY raceId
+    LIMIT %s
+"""
+
+class ArchiveReport:
+    """What one archiver run moved"""
+    def __init__(self):
+        self.partitions = []
+        self.races = 0
+        self.results = 0
+        self.old_info = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        lines = [f"{name}: whole partition archived" for name, moved in self.partitions]
+        lines.append(f"{self.races:,} races and {self.results:,} results moved in {self.chunks:,} chunk(s), "
+                     f"{self.old_info:,} old_info rows archived in {self.elapsed:.1f}s")
+        return "\n".join(lines)
+
+def race_chunks(cursor, races, before, chunk_races):
+    """Yield lists of (raceId, raceDate) dated before before, chunk_races at a time"""
+    last = ''
+    while True:
+        cursor.execute(RACE_CHUNK.format(races=races), (before, last, chunk_races))
+        chunk = cursor.fetchall()
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1][0]
+
+def chunk_filter(chunk):
+    """WHERE clause and parameters selecting a chunk's rows, with a raceDate range so only its partitions are read"""
+    ids = [race_id for race_id, race_date in chunk]
+    dates = [race_date for race_id, race_date in chunk]
+    return f"raceDate BETWEEN %s AND %s AND raceId {in_list(len(ids))}", (min(dates), max(dates), *ids)
+
+def move_races(connection, before, chunk_races=DEFAULT_CHUNK_RACES, pause=DEFAULT_PAUSE, report=None):
+    """Move races dated before before and their results to the archive tables, chunk by chunk"""
+    report = report or ArchiveReport()
+    cursor = connection.cursor()
+    try:
+        # race_check_delete keeps the ids of the races deleted here reserved in race_ids
+        cursor.execute(f"SET {ARCHIVING_FLAG} = 1")
+        for chunk in race_chunks(cursor, 'Race', before, chunk_races):
+            where, params = chunk_filter(chunk)
+            # INSERT ... SELECT locks the rows (and gaps) it reads, so no result
+            # can be added to these races between the copy and the delete
+            cursor.execute(f"INSERT INTO {ARCHIVE_TABLES['RaceResults']} "
+                           f"SELECT * FROM RaceResults WHERE {where}", params)
+            report.results += cursor.rowcount
+            cursor.execute(f"INSERT INTO {ARCHIVE_TABLES['Race']} SELECT * FROM Race WHERE {where}",
+                           params)
+            report.races += cursor.rowcount
+            cursor.execute(f"DELETE FROM RaceResults WHERE {where}", params)
+            cursor.execute(f"DELETE FROM Race WHERE {where}", params)
+            connection.commit()
+            report.chunks += 1
+            time.sleep(pause)
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        try:
+            cursor.execute(f"SET {ARCHIVING_FLAG} = NULL")
+        finally:
+            cursor.close()
+    return report
+
+def move_old_info(connection, before, chunk_rows=DEFAULT_CHUNK_ROWS, pause=DEFAULT_PAUSE, report=None):
+    """Move old_info rows of horses deleted before before to old_info_archive, oldest first"""
+    report = report or ArchiveReport()
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute("SELECT deletedAt FROM old_info WHERE deletedAt < %s "
+                           "ORDER BY deletedAt LIMIT 1 OFFSET %s", (before, chunk_rows - 1))
+            rows = cursor.fetchall()
+            if rows:
+                where, params = "deletedAt < %s AND deletedAt <= %s", (before, rows[0][0])
+            else:
+                where, params = "deletedAt < %s", (before,)
+            cursor.execute(f"INSERT INTO {ARCHIVE_TABLES['old_info']} SELECT * FROM old_info WHERE {where}", params)
+            report.old_info += cursor.rowcount
+            cursor.execute(f"DELETE FROM old_info WHERE {where}", params)
+            connection.commit()
+            if not rows:
+                return report
+            report.chunks += 1
+            time.sleep(pause)
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def archive_before(connection, before, chunk_races=DEFAULT_CHUNK_RACES, chunk_rows=DEFAULT_CHUNK_ROWS,
+                   pause=DEFAULT_PAUSE):
+    """Archive every race dated before before, and old_info rows deleted before it"""
+    started = time.perf_counter()
+    report = ArchiveReport()
+    cursor = connection.cursor()
+    try:
+        partitioned = bool(partitions.layout(cursor, 'Race'))
+    finally:
+        cursor.close()
+    if partitioned:
+        report.partitions = partitions.archive_partitions(connection, before)
+        for name, moved in report.partitions:
+            report.races += moved['Race']
+            report.results += moved['RaceResults']
+    move_races(connection, before, chunk_races, pause, report)
+    move_old_info(connection, before, chunk_rows, pause, report)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+def status(connection):
+    """[(live table, live rows, live bytes, archive, archived rows, archive bytes, archive row format)]
+
+    Row counts are InnoDB's estimates, so this is quick on any size of table.
+    """
+    cursor = connection.cursor()
+    try:
+        names = [name for pair in ARCHIVE_TABLES.items() for name in pair]
+        cursor.execute(TABLE_SIZES.format(names=in_list(len(names))), names)
+        sizes = {name: (rows or 0, size or 0, row_format) for name, rows, size, row_format in cursor.fetchall()}
+    finally:
+        cursor.close()
+    missing = (0, 0, 'missing')
+    return [(table, *sizes.get(table, missing)[:2], archive, *sizes.get(archive, missing))
+            for table, archive in ARCHIVE_TABLES.items()]
+
+def export_archived(connection, before, path, purge=False, chunk_races=DEFAULT_CHUNK_RACES):
+    """Write archived races dated before before, with their results, to a compressed .npz file
+
+    Dates are days since 1970-01-01, race times seconds since midnight,
+    prizes whole cents. With purge the exported rows are then deleted from
+    the archive tables. Returns (races, results) written.
+    """
+    races = {'race_id': [], 'race_name': [], 'race_track': [], 'race_day': [], 'race_time': []}
+    results = {'result_race': [], 'result_horse': [], 'result_position': [], 'result_prize': []}
+    chunks = []
+    cursor = connection.cursor()
+    try:
+        for chunk in race_chunks(cursor, ARCHIVE_TABLES['Race'], before, chunk_races):
+            where, params = chunk_filter(chunk)
+            cursor.execute(f"SELECT raceId, raceName, trackName, raceDate, raceTime "
+                           f"FROM {ARCHIVE_TABLES['Race']} WHERE {where}", params)
+            for race_id, name, track, race_date, race_time in cursor.fetchall():
+                races['race_id'].append(race_id)
+                races['race_name'].append(name)
+                races['race_track'].append(track)
+                races['race_day'].append(to_day(race_date))
+                races['race_time'].append(-1 if race_time is None else int(race_time.total_seconds()))
+            cursor.execute(f"SELECT raceId, horseId, position, prize "
+                           f"FROM {ARCHIVE_TABLES['RaceResults']} WHERE {where}", params)
+            for race_id, horse_id, position, prize in cursor.fetchall():
+                results['result_race'].append(race_id)
+                results['result_horse'].append(horse_id)
+                results['result_position'].append(position or 0)
+                results['result_prize'].append(0 if prize is None else int(prize * 100))
+            if purge:
+                chunks.append((where, params))
+        connection.rollback()
+
+        arrays = {name: text_array(races[name]) for name in ('race_id', 'race_name', 'race_track')}
+        arrays['race_day'] = np.array(races['race_day'], dtype=np.int32)
+        arrays['race_time'] = np.array(races['race_time'], dtype=np.int32)
+        arrays['result_race'] = text_array(results['result_race'])
+        arrays['result_horse'] = text_array(results['result_horse'])
+        arrays['result_position'] = np.array(results['result_position'], dtype=np.uint8)
+        arrays['result_prize'] = np.array(results['result_prize'], dtype=np.int64)
+        # Never overwrite an earlier export: its rows may already be purged
+        with open(path, 'xb') as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for where, params in chunks:
+            cursor.execute(f"DELETE FROM {ARCHIVE_TABLES['RaceResults']} WHERE {where}", params)
+            cursor.execute(f"DELETE FROM {ARCHIVE_TABLES['Race']} WHERE {where}", params)
+            connection.commit()
+    finally:
+        cursor.close()
+    return len(races['race_id']), len(results['result_race'])
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def main(argv=None):
+    """Archive cold race history"""
+    parser = argparse.ArgumentParser(description="Move cold race history out of the live tables")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="live and archived table sizes")
+    move = commands.add_parser('move', help="archive races dated before a cutoff and old_info rows deleted before it")
+    move.add_argument('--before', type=parse_date, required=True, metavar='YYYY-MM-DD', help="cutoff date")
+    move.add_argument('--chunk-races', type=int, default=DEFAULT_CHUNK_RACES, help="races moved per transaction")
+    move.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="old_info rows moved per transaction")
+    move.add_argument('--pause', type=float, default=DEFAULT_PAUSE, help="seconds to wait between chunks")
+    export = commands.add_parser('export', help="write archived races before a cutoff to a compressed .npz file")
+    export.add_argument('--before', type=parse_date, required=True, metavar='YYYY-MM-DD', help="cutoff date")
+    export.add_argument('--path', required=True, help="new .npz file to write")
+    export.add_argument('--purge', action='store_true', help="then delete the exported rows from the archive tables")
+    args = parser.parse_args(argv)
+
+    if getattr(args, 'chunk_races', 1) < 1 or getattr(args, 'chunk_rows', 1) < 1:
+        parser.error("chunk sizes must be at least 1")
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        if args.command == 'status':
+            for table, rows, size, archive, archived, archive_size, row_format in status(connection):
+                print(f"{table:12} ~{rows:>12,} rows {size / 1048576:10.1f} MB   "
+                      f"{archive:22} ~{archived:>12,} rows {archive_size / 1048576:10.1f} MB ({row_format})")
+        elif args.command == 'move':
+            print(archive_before(connection, args.before, args.chunk_races, args.chunk_rows, args.pause).summary())
+        elif args.command == 'export':
+            races, results = export_archived(connection, args.before, args.path, args.purge)
+            print(f"{races:,} races and {results:,} results written to {args.path}"
+                  + (" and purged from the archive tables" if args.purge else ""))
+        connection.close()
+        return 0
+    except (Error, partitions.PartitionError) as e:
+        print(f"Error: {e}")
+        return 1
+    except OSError as e:
+        print(f"Could not write {e.filename}: {e.strerror}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Benchmark suite for Horse Racing Database System
+Seeds a scratch database with a datagen.py dataset of a chosen size, times
+every guest report and the admin write paths (save race, move horse,
+DeleteOwner) through DatabaseManager, and writes latency percentiles and
+throughput to JSON so runs can be compared over time. Given a saved
+baseline, the run fails when an operation got slower than the tolerance.
+
+Usage:
+    python bench_suite.py --scale 10k --reseed                seed HorsesBench, then time everything
+    python bench_suite.py --iterations 200 --output run.json  time the data already seeded
+    python bench_suite.py --baseline run.json --tolerance 0.2 exit 1 on a regression
+    python bench_suite.py --only save_race move_horse         time some operations only
+
+The dataset is generated from --random-seed, so two --reseed runs at the
+same scale start from identical data. The write benchmarks change it
+(DeleteOwner removes owners), so reseed before runs meant to be compared.
+Any MySQL-compatible server works as a stand-in via --host/--user/--password.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import timedelta
+import mysql.connector
+from mysql.connector import Error
+import datagen
+import report_queries
+import stats_maintenance
+from bulk_loader import BulkLoader
+from data_access import DataAccessError, DatabaseManager, Repositories
+
+# RaceResults rows at each named scale
+SCALES = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+
+DEFAULT_DATABASE = "HorsesBench"
+DEFAULT_SEED = datagen.DEFAULT_SEED
+DEFAULT_ITERATIONS = 50
+DEFAULT_WARMUP = 3
+
+# A run fails when p50 or p95 grows by more than the tolerance...
+DEFAULT_TOLERANCE = 0.25
+# ...and by more than this, so sub-millisecond jitter never fails a run
+MIN_REGRESSION_MS = 0.5
+# Baselines seeded with a different number of results are not comparable
+MAX_DATASET_DRIFT = 0.05
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Tables emptied before seeding, summaries included
+CLEARED_TABLES = ('Owns', 'RaceResults', 'Race', 'Trainer', 'Horse', 'Owner', 'Stable', 'Track',
+                  'old_info', 'trainer_stats', 'track_stats', 'track_daily', 'track_horse_monthly', 'race_ids')
+
+def seed_database(db_manager, results, seed=DEFAULT_SEED, batch_rows=5000):
+    """Recreate the schema in db_manager's database and load a datagen dataset"""
+    db_manager.setup_database(reset=True)
+    connection = mysql.connector.connect(host=db_manager.host, user=db_manager.user,
+                                         password=db_manager.password, database=db_manager.database)
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        for table in CLEARED_TABLES:
+            cursor.execute(f"TRUNCATE TABLE `{table}`")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.close()
+        with BulkLoader(connection, batch_rows) as loader:
+            for table, columns, rows in datagen.generate(datagen.DatasetConfig(results, seed)):
+                loader.load_rows(table, columns, rows)
+        # Summary triggers ran row by row during the load; rebuild them from the final data
+        stats_maintenance.rebuild_trainer_stats(connection)
+        stats_maintenance.rebuild_track_stats(connection)
+    finally:
+        connection.close()
+    db_manager.invalidate_tables(None)
+    return loader.report
+
+class Workload:
+    """Ids sampled by the benchmarks, read from whatever data is in the database"""
+    def __init__(self, db_manager, seed=DEFAULT_SEED):
+        self.db_manager = db_manager
+        self.repos = Repositories(db_manager)
+        self.rng = random.Random(seed)
+        self.horses = self._ids("SELECT horseId FROM Horse ORDER BY horseId")
+        self.stables = self._ids("SELECT stableId FROM Stable ORDER BY stableId")
+        self.tracks = self._ids("SELECT trackName FROM Track ORDER BY trackName")
+        # delete_owner takes them from the end of the list
+        self.owners = self._ids("SELECT ownerId FROM Owner ORDER BY ownerId")
+
+    def _ids(self, query):
+        return [next(iter(row.values())) for row in self.db_manager.execute_query(query)]
+
+    def dataset(self):
+        """Row counts of the tables the benchmarks read"""
+        return {table: self.db_manager.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n']
+                for table in ('Horse', 'Owner', 'Race', 'RaceResults')}
+
+    def operations(self):
+        """name -> callable running the operation once"""
+        operations = {}
+        for name, (query, params) in report_queries.REPORTS.items():
+            if name == 'horse_info':
+                continue
+            operations[name] = lambda query=query, params=params: self.db_manager.execute_query(query, params)
+        operations['horse_info'] = lambda: self.db_manager.execute_query(
+            report_queries.HORSE_INFO, (self.rng.choice(self.horses),))
+        operations['save_race'] = self.save_race
+        operations['move_horse'] = lambda: self.repos.horses.move(self.rng.choice(self.horses),
+                                                                  self.rng.choice(self.stables))
+        operations['delete_owner'] = self.delete_owner
+        return operations
+
+    def save_race(self):
+        size = min(8, len(self.horses))
+        purse = datagen.PURSES[0]
+        results = [(horse, position, (purse * datagen.PURSE_SPLIT[position - 1]).quantize(datagen.CENT)
+                    if position <= len(datagen.PURSE_SPLIT) else 0)
+                   for position, horse in enumerate(self.rng.sample(self.horses, size), 1)]
+        day = datagen.FIRST_RACE_DAY + timedelta(days=self.rng.randrange(datagen.RACE_DAYS))
+        self.repos.races.add({
+            'raceName': "Benchmark Stakes",
+            'trackName': self.rng.choice(self.tracks),
+            'raceDate': day.isoformat(),
+            'raceTime': "14:30:00",
+        }, results)
+
+    def delete_owner(self):
+        if not self.owners:
+            raise DataAccessError("no owners left to delete; reseed the benchmark database")
+        self.repos.owners.delete(self.owners.pop())
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * p // 100) - 1))]
+
+def measure(operation, iterations, warmup):
+    """Run operation warmup + iterations times; latency summary in milliseconds and ops/sec"""
+    for _ in range(warmup):
+        operation()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        samples.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+    ordered = sorted(samples)
+    summary = {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'mean_ms': round(sum(ordered) / len(ordered), 3),
+    }
+    summary.update({f"p{p}_ms": round(percentile(ordered, p), 3) for p in PERCENTILES})
+    summary['max_ms'] = round(ordered[-1], 3)
+    summary['ops_per_sec'] = round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+def run_suite(db_manager, iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP, only=None, seed=DEFAULT_SEED):
+    """Time each operation and return the JSON-ready run record"""
+    workload = Workload(db_manager, seed)
+    operations = workload.operations()
+    unknown = set(only or ()) - set(operations)
+    if unknown:
+        raise ValueError(f"unknown operations: {', '.join(sorted(unknown))}")
+    record = {
+        'recorded': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'server': db_manager.execute_query("SELECT VERSION() AS version")[0]['version'],
+        'iterations': iterations,
+        'warmup': warmup,
+        'dataset': workload.dataset(),
+        'operations': {},
+    }
+    for name, operation in operations.items():
+        if only and name not in only:
+            continue
+        record['operations'][name] = measure(operation, iterations, warmup)
+        summary = record['operations'][name]
+        print(f"{name:22} p50 {summary['p50_ms']:9.3f} ms   p95 {summary['p95_ms']:9.3f} ms   "
+              f"{summary['ops_per_sec']:9.1f} ops/s")
+    return record
+
+def regressions(record, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a message for every operation slower than the baseline by more than tolerance"""
+    found = []
+    for name, now in record['operations'].items():
+        before = baseline['operations'].get(name)
+        if before is None:
+            continue
+        for stat in ('p50_ms', 'p95_ms'):
+            if now[stat] > before[stat] * (1 + tolerance) and now[stat] - before[stat] > MIN_REGRESSION_MS:
+                found.append(f"{name} {stat[:-3]}: {before[stat]:.3f} ms -> {now[stat]:.3f} ms "
+                             f"(+{(now[stat] / before[stat] - 1) * 100 if before[stat] else float('inf'):.0f}%)")
+    return found
+
+def comparable(record, baseline):
+    """None if the two runs used datasets of about the same size, else the reason they didn't"""
+    now = record['dataset'].get('RaceResults', 0)
+    before = baseline.get('dataset', {}).get('RaceResults', 0)
+    if abs(now - before) > max(now, before) * MAX_DATASET_DRIFT:
+        return f"baseline has {before:,} race results, this database {now:,}"
+    return None
+
+def main(argv=None):
+    """Seed and run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark the guest reports and admin write paths")
+    parser.add_argument('--scale', choices=sorted(SCALES, key=SCALES.get), default='10k',
+                        help="race results to seed with --reseed (default 10k)")
+    parser.add_argument('--results', type=int, help="seed exactly this many race results instead")
+    parser.add_argument('--reseed', action='store_true', help="recreate the schema and load a fresh dataset first")
+    parser.add_argument('--random-seed', type=int, default=DEFAULT_SEED, help="seed for data and workload")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="timed runs per operation")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="untimed runs per operation")
+    parser.add_argument('--only', nargs='+', metavar='OPERATION', help="time only these operations")
+    parser.add_argument('--output', metavar='PATH', help="write the run to a JSON file")
+    parser.add_argument('--baseline', metavar='PATH', help="fail if slower than this saved run")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed p50/p95 slowdown against the baseline (default 0.25 = 25%%)")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--user', default="root")
+    parser.add_argument('--password', default="Asd11011")
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help=f"scratch database, dropped and refilled by --reseed (default {DEFAULT_DATABASE})")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    # Timings come from the clock here, so skip the manager's own sampling and slow log
+    db_manager = DatabaseManager(pool_size=2, sample_rate=0, slow_query_log=None)
+    db_manager.host = args.host
+    db_manager.user = args.user
+    db_manager.password = args.password
+    db_manager.database = args.database
+
+    try:
+        if args.reseed:
+            results = args.results or SCALES[args.scale]
+            print(f"Seeding {args.database} with {results:,} race results...")
+            print(seed_database(db_manager, results, args.random_seed).summary())
+        record = run_suite(db_manager, args.iterations, args.warmup, args.only, args.random_seed)
+    except (DataAccessError, Error) as e:
+        print(f"Error: {e}")
+        return 1
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db_manager.close_connection()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(record, f, indent=2)
+        print(f"Run saved to {args.output}")
+
+    if baseline is not None:
+        reason = comparable(record, baseline)
+        if reason:
+            print(f"Not comparable with {args.baseline}: {reason}")
+            return 1
+        found = regressions(record, baseline, args.tolerance)
+        if found:
+            print(f"Regressions against {args.baseline}:")
+            for message in found:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
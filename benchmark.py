@@ -0,0 +1,139 @@
+"""
+Query benchmark for Horse Racing Database System
+Times the win-count queries, which filter on the finishing position, both
+with the old text predicate (results = 'first') and, once
+migrations/005_numeric_positions.sql has added it, the numeric one
+(position = 1)
+
+Usage:
+    python benchmark.py                        time every query and print the results
+    python benchmark.py --save before.json     also store the timings
+    python benchmark.py --compare before.json  show the change against stored timings
+
+To measure the migration itself, run with --save before applying it and
+with --compare afterwards, against the same data.
+"""
+
+import argparse
+import json
+import sys
+import time
+import mysql.connector
+from mysql.connector import Error
+import report_queries
+
+POSITION_WIN = "rr.position = 1"
+TEXT_WIN = "rr.results = 'first'"
+
+# name -> (query, params), written with the numeric predicate
+WIN_COUNT_QUERIES = {
+    'total_wins': ("SELECT COUNT(*) FROM RaceResults rr WHERE rr.position = 1", ()),
+    'wins_per_horse': ("""
+        SELECT rr.horseId, COUNT(*) as wins
+        FROM RaceResults rr
+        WHERE rr.position = 1
+        GROUP BY rr.horseId
+    """, ()),
+    'wins_per_trainer': (report_queries.TRAINER_WINNINGS_LIVE, ()),
+    'winning_trainers': report_queries.WINNING_TRAINERS.page(),
+}
+
+def text_variant(query):
+    """The same query filtering on the results text, as before migration 005"""
+    return query.replace(POSITION_WIN, TEXT_WIN)
+
+def has_position_column(cursor):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'RaceResults' AND COLUMN_NAME = 'position'
+    """)
+    return cursor.fetchone()[0] > 0
+
+def time_query(cursor, query, params, repeat):
+    """Run query repeat times after one warm-up run and return each time in milliseconds"""
+    cursor.execute(query, params)
+    cursor.fetchall()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+def run_benchmarks(connection, repeat=20):
+    """Return {query name: {'text' | 'position': timing summary}}"""
+    cursor = connection.cursor()
+    try:
+        numeric = has_position_column(cursor)
+        results = {}
+        for name, (query, params) in WIN_COUNT_QUERIES.items():
+            variants = [('text', text_variant(query))]
+            if numeric:
+                variants.append(('position', query))
+            results[name] = {
+                variant: summarize(time_query(cursor, sql, params, repeat))
+                for variant, sql in variants
+            }
+        return results
+    finally:
+        cursor.close()
+
+def current(timings):
+    """The variant the reports use: numeric once it exists"""
+    return timings.get('position') or timings['text']
+
+def print_results(results, baseline=None):
+    for name, timings in results.items():
+        for variant, summary in timings.items():
+            print(f"{name:18} {variant:9} median {summary['median_ms']:9.3f} ms   p95 {summary['p95_ms']:9.3f} ms")
+        if baseline and name in baseline:
+            before = current(baseline[name])['median_ms']
+            after = current(timings)['median_ms']
+            speedup = before / after if after else float('inf')
+            print(f"{name:18} {'change':9} {before:.3f} ms -> {after:.3f} ms ({speedup:.1f}x)")
+
+def main(argv=None):
+    """Benchmark the win-count queries"""
+    parser = argparse.ArgumentParser(description="Time the win-count queries on text and numeric positions")
+    parser.add_argument('--repeat', type=int, default=20, help="timed runs per query (default 20)")
+    parser.add_argument('--save', metavar='PATH', help="write the timings to a JSON file")
+    parser.add_argument('--compare', metavar='PATH', help="compare with timings saved earlier")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        results = run_benchmarks(connection, args.repeat)
+        connection.close()
+    except Error as e:
+        print(f"Error: {e}")
+        return 1
+
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'recorded': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}, f, indent=2)
+        print(f"Timings saved to {args.save}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Bulk loading engine for Horse Racing Database System
+Seeds tables quickly by batching single-row INSERTs into multi-row statements
+(or streaming TSV files through LOAD DATA LOCAL INFILE), with foreign key and
+unique checks switched off and secondary indexes rebuilt once at the end
+
+Usage:
+    python bulk_loader.py sample_data.sql [--batch-rows 1000]
+    python bulk_loader.py --tsv Horse=horses.tsv --tsv RaceResults=results.tsv
+    python bulk_loader.py --tsv 'Owns(ownerId,horseId)=owns.tsv'   columns in file order
+"""
+
+import argparse
+import re
+import sys
+import time
+import mysql.connector
+from mysql.connector import Error
+from sql_script import iter_statements
+
+# Single-table INSERT ... VALUES statements that can be merged with their neighbours,
+# optionally preceded by /* ... */ comments
+INSERT_PATTERN = re.compile(
+    r"^\s*(?:/\*.*?\*/\s*)*INSERT\s+INTO\s+`?(\w+)`?\s*(\([^)]*\))?\s*VALUES\s*(\(.*\))\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Stay well below the default 64MB max_allowed_packet
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+# --tsv TABLE=FILE or TABLE(col,col,...)=FILE
+TSV_SPEC = re.compile(r"^(\w+)(?:\(([\w\s,]+)\))?=(.+)$")
+
+# load_rows commits this often so a huge table never sits in one transaction
+COMMIT_ROWS = 100000
+
+class TableTiming:
+    """Rows and seconds spent loading one table"""
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.statements = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+class LoadReport:
+    """Per-table timings for one load"""
+    def __init__(self):
+        self.tables = {}
+        self.index_seconds = 0.0
+        self.elapsed = 0.0
+
+    def timing(self, table):
+        if table not in self.tables:
+            self.tables[table] = TableTiming(table)
+        return self.tables[table]
+
+    def summary(self):
+        lines = [f"{'Table':<15} {'Rows':>12} {'Stmts':>8} {'Seconds':>9} {'Rows/sec':>12}"]
+        for timing in self.tables.values():
+            lines.append(
+                f"{timing.table:<15} {timing.rows:>12,} {timing.statements:>8,} "
+                f"{timing.seconds:>9.2f} {timing.rows_per_second:>12,.0f}"
+            )
+        lines.append(f"Index rebuild: {self.index_seconds:.2f}s, total: {self.elapsed:.2f}s")
+        return "\n".join(lines)
+
+def count_tuples(values):
+    """Count top-level (...) groups in a VALUES list, ignoring quoted text"""
+    depth = 0
+    count = 0
+    quote = None
+    escaped = False
+    for ch in values:
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == '(':
+            if depth == 0:
+                count += 1
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+    return count
+
+def batch_inserts(statements, batch_rows=1000, max_bytes=MAX_BATCH_BYTES):
+    """Merge runs of INSERT INTO t VALUES (...) into multi-row statements
+
+    Yields (table, sql, rows) where table is None for statements that are
+    passed through unchanged (DDL, UPDATEs, INSERT ... SELECT, ...). A batch
+    holds at most batch_rows rows unless one statement alone has more.
+    """
+    key = None
+    head = None
+    values = []
+    rows = 0
+    size = 0
+
+    def flush():
+        return key[0], f"{head} VALUES {', '.join(values)}", rows
+
+    for statement in statements:
+        match = INSERT_PATTERN.match(statement)
+        if match is None or re.search(r"\)\s*ON\s+DUPLICATE\s+KEY", match.group(3), re.IGNORECASE):
+            if values:
+                yield flush()
+                key, values, rows, size = None, [], 0, 0
+            yield None, statement, 0
+            continue
+
+        table, columns, tuples = match.group(1), match.group(2) or '', match.group(3)
+        count = count_tuples(tuples)
+        if (table, columns) != key or rows + count > batch_rows or size + len(tuples) > max_bytes:
+            if values:
+                yield flush()
+            key = (table, columns)
+            head = f"INSERT INTO {table} {columns}".rstrip()
+            values, rows, size = [], 0, 0
+        values.append(tuples)
+        rows += count
+        size += len(tuples) + 2
+
+    if values:
+        yield flush()
+
+def secondary_indexes(cursor, table):
+    """Return {index_name: (unique, [columns])} for indexes that can be dropped during a load
+
+    PRIMARY and any index whose leading column backs a foreign key are kept,
+    since InnoDB refuses to drop indexes a constraint depends on.
+    """
+    cursor.execute("""
+        SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    indexes = {}
+    for name, non_unique, column, sub_part in cursor.fetchall():
+        unique, columns = indexes.setdefault(name, (not non_unique, []))
+        columns.append(f"`{column}`({sub_part})" if sub_part else f"`{column}`")
+
+    cursor.execute("""
+        SELECT COLUMN_NAME
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME IS NOT NULL
+    """, (table,))
+    fk_columns = {f"`{row[0]}`" for row in cursor.fetchall()}
+    return {
+        name: (unique, columns)
+        for name, (unique, columns) in indexes.items()
+        if columns[0] not in fk_columns
+    }
+
+def drop_indexes(cursor, table, indexes):
+    if indexes:
+        cursor.execute(f"ALTER TABLE `{table}` " + ", ".join(f"DROP INDEX `{name}`" for name in indexes))
+
+def rebuild_indexes(cursor, table, indexes):
+    """Re-create all deferred indexes of a table with a single sorted build"""
+    if indexes:
+        clauses = [
+            f"ADD {'UNIQUE ' if unique else ''}INDEX `{name}` ({', '.join(columns)})"
+            for name, (unique, columns) in indexes.items()
+        ]
+        cursor.execute(f"ALTER TABLE `{table}` " + ", ".join(clauses))
+
+class BulkLoader:
+    """Loads seed data over one connection with checks relaxed for the duration"""
+    def __init__(self, connection, batch_rows=1000, defer_indexes=True):
+        self.connection = connection
+        self.batch_rows = batch_rows
+        self.defer_indexes = defer_indexes
+        self.report = LoadReport()
+        self._deferred = {}
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        cursor = self.connection.cursor()
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+        cursor.close()
+        self._autocommit = self.connection.autocommit
+        self.connection.autocommit = False
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        cursor = self.connection.cursor()
+        try:
+            if exc_type is None:
+                self.connection.commit()
+                index_started = time.perf_counter()
+                for table, indexes in self._deferred.items():
+                    rebuild_indexes(cursor, table, indexes)
+                    cursor.execute(f"ANALYZE TABLE `{table}`")
+                    cursor.fetchall()
+                self.report.index_seconds = time.perf_counter() - index_started
+            else:
+                self.connection.rollback()
+                # Put back whatever was dropped so a failed load never loses indexes
+                for table, indexes in self._deferred.items():
+                    try:
+                        rebuild_indexes(cursor, table, indexes)
+                    except Error as e:
+                        print(f"Failed to restore indexes on {table}: {e}")
+        finally:
+            cursor.execute("SET SESSION unique_checks = 1")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.close()
+            self.connection.autocommit = self._autocommit
+            self.report.elapsed = time.perf_counter() - self._started
+        return False
+
+    def _prepare_table(self, cursor, table):
+        """Drop a table's deferrable secondary indexes the first time it is loaded"""
+        if not self.defer_indexes or table in self._deferred:
+            return
+        indexes = secondary_indexes(cursor, table)
+        drop_indexes(cursor, table, indexes)
+        self._deferred[table] = indexes
+
+    def load_statements(self, statements):
+        """Execute statements, batching consecutive single-table INSERTs"""
+        cursor = self.connection.cursor()
+        current = None
+        try:
+            for table, sql, rows in batch_inserts(statements, self.batch_rows):
+                if table is None:
+                    cursor.execute(sql)
+                    continue
+                if table != current:
+                    # Commit per table so the redo log stays small
+                    self.connection.commit()
+                    self._prepare_table(cursor, table)
+                    current = table
+                started = time.perf_counter()
+                cursor.execute(sql)
+                timing = self.report.timing(table)
+                timing.seconds += time.perf_counter() - started
+                timing.rows += rows
+                timing.statements += 1
+            self.connection.commit()
+        finally:
+            cursor.close()
+        return self.report
+
+    def load_rows(self, table, columns, rows):
+        """Insert row tuples from any iterable, batch_rows rows per multi-row INSERT
+
+        Rows are consumed as they are sent, so a generator loads in constant memory.
+        """
+        sql = (f"INSERT INTO `{table}` ({', '.join(columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        cursor = self.connection.cursor()
+        try:
+            self.connection.commit()
+            self._prepare_table(cursor, table)
+            timing = self.report.timing(table)
+            uncommitted = 0
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) < self.batch_rows:
+                    continue
+                started = time.perf_counter()
+                cursor.executemany(sql, batch)
+                uncommitted += len(batch)
+                if uncommitted >= COMMIT_ROWS:
+                    self.connection.commit()
+                    uncommitted = 0
+                timing.seconds += time.perf_counter() - started
+                timing.rows += len(batch)
+                timing.statements += 1
+                batch = []
+            started = time.perf_counter()
+            if batch:
+                cursor.executemany(sql, batch)
+                timing.rows += len(batch)
+                timing.statements += 1
+            self.connection.commit()
+            timing.seconds += time.perf_counter() - started
+        finally:
+            cursor.close()
+        return self.report
+
+    def load_tsv(self, table, path, columns=None):
+        """Stream a tab-separated file into a table with LOAD DATA LOCAL INFILE
+
+        The connection must be opened with allow_local_infile=True.
+        Use \\N for NULLs, as written by mysqldump --tab.
+        """
+        cursor = self.connection.cursor()
+        try:
+            self.connection.commit()
+            self._prepare_table(cursor, table)
+            column_list = f"({', '.join(columns)})" if columns else ""
+            started = time.perf_counter()
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` "
+                f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' {column_list}",
+                (path,)
+            )
+            self.connection.commit()
+            timing = self.report.timing(table)
+            timing.seconds += time.perf_counter() - started
+            timing.rows += max(cursor.rowcount, 0)
+            timing.statements += 1
+        finally:
+            cursor.close()
+        return self.report
+
+def main(argv=None):
+    """Command line entry point for seeding a database"""
+    parser = argparse.ArgumentParser(description="Bulk load seed data into the Horses database")
+    parser.add_argument('files', nargs='*', help="SQL files of INSERT statements")
+    parser.add_argument('--tsv', action='append', default=[], metavar='TABLE=FILE',
+                        help="load a tab-separated file with LOAD DATA LOCAL INFILE; "
+                             "TABLE(col,...)=FILE names the file's columns")
+    parser.add_argument('--batch-rows', type=int, default=1000, help="rows per multi-row INSERT")
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help="maintain secondary indexes during the load instead of rebuilding them")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--user', default="root")
+    parser.add_argument('--password', default="Asd11011")
+    parser.add_argument('--database', default="Horses")
+    args = parser.parse_args(argv)
+
+    tsv_specs = []
+    for spec in args.tsv:
+        match = TSV_SPEC.match(spec)
+        if match is None:
+            parser.error(f"--tsv expects TABLE=FILE or TABLE(col,...)=FILE, got {spec!r}")
+        table, columns, path = match.groups()
+        tsv_specs.append((table, [column.strip() for column in columns.split(',')] if columns else None, path))
+
+    try:
+        connection = mysql.connector.connect(
+            host=args.host,
+            user=args.user,
+            password=args.password,
+            database=args.database,
+            allow_local_infile=bool(args.tsv)
+        )
+        with BulkLoader(connection, args.batch_rows, not args.keep_indexes) as loader:
+            for filename in args.files:
+                loader.load_statements(iter_statements(filename))
+            for table, columns, path in tsv_specs:
+                loader.load_tsv(table, path, columns)
+        connection.close()
+    except Error as e:
+        print(f"Error: {e}")
+        return 1
+    print(loader.report.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""
+Data access layer for Horse Racing Database System
+Connection pooling, caching and repositories with no GUI imports, so the
+same code serves the Tkinter windows, the API server, process pools and
+command line jobs. Failures are raised as DataAccessError subclasses.
+"""
+
+from data_access.errors import (DataAccessError, ConnectionFailed, QueryFailed, ConstraintViolation,
+                                NotFound, InvalidData)
+from data_access.pool import ConnectionPool
+from data_access.instrumentation import QueryStats, call_site
+from data_access.manager import DatabaseManager
+from data_access.repositories import (Repositories, HorseRepository, RaceRepository, TrainerRepository,
+                                      OwnerRepository, TrackRepository, StableRepository)
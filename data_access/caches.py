@@ -0,0 +1,228 @@
+"""
+Statement and result caches for the data access layer
+Prepared statements kept per connection, and report results kept until a
+write touches the tables they read
+"""
+
+from collections import OrderedDict
+import re
+import sys
+import threading
+import time
+from mysql.connector import Error
+
+# Statements that can be replayed on a fresh connection without side effects
+READ_ONLY_VERBS = ('SELECT', 'SHOW', 'EXPLAIN', 'DESCRIBE', 'DESC')
+
+def is_read_only(query):
+    """True for statements that are safe to retry automatically"""
+    words = query.lstrip().lstrip('(').split(None, 1)
+    return bool(words) and words[0].upper() in READ_ONLY_VERBS
+
+# Server error for statements that cannot be prepared
+ER_UNSUPPORTED_PS = 1295
+
+# Statements the server can prepare; DDL, CALL and multi-statement scripts go as text
+PREPARABLE_VERBS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+class StatementCache:
+    """LRU cache of server-side prepared cursors for one connection, keyed by SQL text"""
+    def __init__(self, connection, max_size):
+        self.connection = connection
+        self.max_size = max_size
+        self._cursors = OrderedDict()
+
+    def get(self, query):
+        """Return the cached (cursor, query) pair for query, or None on a miss"""
+        entry = self._cursors.get(query)
+        if entry is not None:
+            self._cursors.move_to_end(query)
+        return entry
+
+    def add(self, query):
+        """Prepare a cursor for query; returns (cursor, query, number of statements evicted)"""
+        cursor = self.connection.cursor(prepared=True, dictionary=True)
+        # The cursor re-prepares whenever it sees a different operation object,
+        # so it is always executed with the exact string stored here
+        self._cursors[query] = (cursor, query)
+        evicted = 0
+        while len(self._cursors) > self.max_size:
+            old_cursor, _ = self._cursors.popitem(last=False)[1]
+            self._close_quietly(old_cursor)
+            evicted += 1
+        return cursor, query, evicted
+
+    def evict(self, query):
+        """Deallocate one statement, e.g. after it failed"""
+        entry = self._cursors.pop(query, None)
+        if entry is not None:
+            self._close_quietly(entry[0])
+
+    def clear(self):
+        """Deallocate every prepared statement on this connection"""
+        for cursor, _ in self._cursors.values():
+            self._close_quietly(cursor)
+        self._cursors.clear()
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def _close_quietly(self, cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+# Tables named after these keywords are the ones a statement reads or writes
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE|TABLE)\s+`?(\w+)`?", re.IGNORECASE)
+
+# Tables written by stored procedures, which hide their statements from the client
+PROCEDURE_TABLES = {
+    'DeleteOwner': ('Owns', 'Owner'),
+    'RebuildTrainerStats': ('trainer_stats',),
+    'RebuildTrackStats': ('track_stats', 'track_daily', 'track_horse_monthly'),
+}
+
+# Extra tables changed by triggers when a table is written
+TRIGGER_TABLES = {
+    'Horse': ('old_info', 'trainer_stats'),
+    'Race': ('RaceResults', 'track_stats', 'track_daily', 'track_horse_monthly'),
+    'RaceResults': ('trainer_stats', 'track_stats', 'track_daily', 'track_horse_monthly'),
+    'Trainer': ('trainer_stats',),
+}
+
+# Tables read by views (migrations/008_history_archive.py), so writing them invalidates reads of the view
+VIEW_TABLES = {
+    'race_history': ('Race', 'race_archive'),
+    'race_results_history': ('RaceResults', 'race_results_archive'),
+    'old_info_history': ('old_info', 'old_info_archive'),
+}
+
+def referenced_tables(query):
+    """Lower-cased names of the tables a statement mentions, plus the tables behind any view"""
+    tables = {name.lower() for name in TABLE_REFERENCE.findall(query)}
+    for view, underlying in VIEW_TABLES.items():
+        if view in tables:
+            tables.update(name.lower() for name in underlying)
+    return tables
+
+def written_tables(tables):
+    """Add the tables that triggers write as a side effect of writing tables"""
+    written = {table.lower() for table in tables}
+    for table, extra in TRIGGER_TABLES.items():
+        if table.lower() in written:
+            written.update(name.lower() for name in extra)
+    return written
+
+def estimate_size(rows):
+    """Rough memory footprint in bytes of a list of result rows"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            size += sys.getsizeof(value)
+    return size
+
+class ResultCache:
+    """LRU cache of read query results with a TTL, invalidated table by table on writes"""
+    def __init__(self, max_entries=256, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, rows, size)
+        self._by_table = {}  # table -> keys of entries that read it
+        self._generation = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    @staticmethod
+    def make_key(query, params):
+        """Hashable key for query plus parameters, or None if the parameters can't be hashed"""
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        elif isinstance(params, list):
+            params = tuple(params)
+        key = (query, params)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @property
+    def generation(self):
+        """Bumped by every invalidation; results read across a bump are not stored"""
+        return self._generation
+
+    def get(self, key):
+        """Return (True, rows) on a hit, (False, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, list(entry[2])
+
+    def put(self, key, rows, generation):
+        """Store rows for key unless a write invalidated anything since generation was read"""
+        tables = referenced_tables(key[0])
+        size = estimate_size(rows)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tables, list(rows), size)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate(self, tables):
+        """Drop every cached result that read any of tables"""
+        with self._lock:
+            self._generation += 1
+            for table in written_tables(tables):
+                for key in self._by_table.pop(table, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, tables, _, size = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
@@ -0,0 +1,50 @@
+"""
+Exceptions raised by the data access layer
+Callers catch these instead of mysql.connector errors; the original error
+is kept as __cause__ and in the cause attribute.
+"""
+
+from mysql.connector.errors import DataError, IntegrityError, PoolError
+from data_access.pool import is_connection_lost
+
+# Errors opening a connection: bad credentials, unknown database, server unreachable
+CONNECT_ERRNOS = {
+    1045,  # ER_ACCESS_DENIED_ERROR
+    1049,  # ER_BAD_DB_ERROR
+    2002,  # CR_CONNECTION_ERROR
+    2003,  # CR_CONN_HOST_ERROR
+    2005,  # CR_UNKNOWN_HOST
+}
+
+class DataAccessError(Exception):
+    """Base class for every data access failure"""
+    def __init__(self, message, cause=None):
+        super().__init__(message)
+        self.cause = cause
+
+class ConnectionFailed(DataAccessError):
+    """The database could not be reached, or no pooled connection freed up in time"""
+
+class QueryFailed(DataAccessError):
+    """The server rejected or failed a statement"""
+
+class ConstraintViolation(QueryFailed):
+    """A write broke a key, foreign key or other integrity constraint"""
+
+class NotFound(DataAccessError, LookupError):
+    """A row the operation depends on does not exist"""
+
+class InvalidData(DataAccessError, ValueError):
+    """Input that fails validation before it reaches the database"""
+
+def translate(error):
+    """The DataAccessError for a mysql.connector error"""
+    if isinstance(error, DataAccessError):
+        return error
+    if isinstance(error, PoolError) or is_connection_lost(error) or getattr(error, 'errno', None) in CONNECT_ERRNOS:
+        return ConnectionFailed(str(error), error)
+    if isinstance(error, IntegrityError):
+        return ConstraintViolation(str(error), error)
+    if isinstance(error, DataError):
+        return InvalidData(str(error), error)
+    return QueryFailed(str(error), error)
@@ -0,0 +1,302 @@
+"""
+Statement timing for the data access layer
+DatabaseManager reports every statement it runs here with its wall time,
+rows, time spent waiting for a pooled connection and the call site that
+issued it, e.g. GuestGUI.search_track_stats or ApiServer.track_stats.
+
+Every statement is timed and counted, which costs two clock reads. Only a
+sample of them (sample_rate) is attributed to a call site and added to the
+latency histograms, since walking the stack is the expensive part; slow
+statements are always attributed and written to a rotating log.
+Histograms export as JSON or Prometheus text.
+"""
+
+import bisect
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PERCENTILES = (50, 90, 99)
+
+# One statement in 20 feeds the histograms
+SAMPLE_RATE = 0.05
+
+SLOW_QUERY_SECONDS = 0.5
+SLOW_QUERY_LOG = 'slow_queries.log'
+SLOW_LOG_BYTES = 5 * 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+# Longest statement text written to the slow log
+SLOW_LOG_SQL = 2000
+
+# Frames in these modules are plumbing, not the call site of a statement
+PLUMBING_MODULES = {'data_access', 'database', 'task_runner', 'paged_treeview',
+                    'concurrent', 'threading', 'contextlib', 'asyncio'}
+
+UNKNOWN_SITE = 'unknown'
+
+logger = logging.getLogger(__name__)
+
+_site = contextvars.ContextVar('call_site', default=None)
+
+# Slow-log files shared by every QueryStats writing to the same path
+_slow_handlers = {}
+_slow_handlers_lock = threading.Lock()
+
+def site_of(frame):
+    """Class.method (or module.function) of a frame, ignoring nested functions"""
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name).split('.<locals>', 1)[0]
+    if '.' not in name:
+        name = f"{frame.f_globals.get('__name__', '?')}.{name}"
+    return name
+
+def _is_plumbing(frame):
+    return frame.f_globals.get('__name__', '').split('.', 1)[0] in PLUMBING_MODULES
+
+def caller_site():
+    """The call site for a statement issued now
+
+    The innermost call_site() in effect wins; otherwise the first frame
+    on the stack outside the data layer, task runner and thread pools.
+    """
+    site = _site.get()
+    if site is not None:
+        return site
+    frame = sys._getframe(1)
+    while frame is not None and _is_plumbing(frame):
+        frame = frame.f_back
+    return site_of(frame) if frame is not None else UNKNOWN_SITE
+
+def current_site():
+    """The site set by the innermost call_site(), or None"""
+    return _site.get()
+
+@contextmanager
+def call_site(name):
+    """Attribute statements run inside the block, on this thread or task, to name"""
+    token = _site.set(name)
+    try:
+        yield
+    finally:
+        _site.reset(token)
+
+def one_line(query, limit=SLOW_LOG_SQL):
+    """A statement with its whitespace collapsed, cut to limit characters"""
+    text = re.sub(r'\s+', ' ', query).strip()
+    return text if len(text) <= limit else text[:limit] + '...'
+
+class Histogram:
+    """Counts of observations per latency bucket, with sum and max"""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Estimate the p-th percentile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100.0
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+                return lower + (max(upper, lower) - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def to_dict(self):
+        summary = {'count': self.count, 'sum': self.sum, 'max': self.max}
+        summary.update({f"p{p}": self.percentile(p) for p in PERCENTILES})
+        summary['buckets'] = {str(bound): count for bound, count in zip(BUCKETS + ('+Inf',), self.counts)}
+        return summary
+
+class SiteStats:
+    """Sampled figures for one call site and kind of statement"""
+    def __init__(self):
+        self.seconds = Histogram()
+        self.wait = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+class QueryStats:
+    """Per-statement timing, slow-query log and histogram export for a DatabaseManager
+
+    sample_rate is the share of statements added to the histograms (0
+    turns them off); statements taking slow_query_seconds or more are
+    appended to slow_log, a file rotated at SLOW_LOG_BYTES, or only
+    counted when slow_log is None.
+    """
+    def __init__(self, sample_rate=SAMPLE_RATE, slow_query_seconds=SLOW_QUERY_SECONDS, slow_log=SLOW_QUERY_LOG):
+        self.sample_rate = sample_rate
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_log = slow_log
+        self._lock = threading.Lock()
+        self._sites = {}
+        self.statements = 0
+        self.sampled = 0
+        self.slow = 0
+        self.errors = 0
+
+    def after_fork(self):
+        """A lock held by another thread at fork time would never be released in the child"""
+        self._lock = threading.Lock()
+
+    def record(self, kind, query, started, connected, result):
+        """Record one statement that started waiting for a connection at started
+
+        connected is when it got one (None if it never did) and result what
+        it returned, None if it failed. Times are time.perf_counter() values.
+        """
+        finished = time.perf_counter()
+        seconds = finished - started
+        slow = seconds >= self.slow_query_seconds
+        sampled = random.random() < self.sample_rate
+        failed = result is None
+        if not (sampled or slow):
+            with self._lock:
+                self.statements += 1
+                self.errors += failed
+            return
+
+        wait = (connected if connected is not None else finished) - started
+        if isinstance(result, list):
+            rows = len(result)
+        elif isinstance(result, int) and not isinstance(result, bool):
+            rows = max(result, 0)
+        else:
+            rows = 0
+        site = caller_site()
+        with self._lock:
+            self.statements += 1
+            self.errors += failed
+            if sampled:
+                self.sampled += 1
+                stats = self._sites.get((site, kind))
+                if stats is None:
+                    stats = self._sites[(site, kind)] = SiteStats()
+                stats.seconds.add(seconds)
+                stats.wait.add(wait)
+                stats.rows += rows
+                stats.errors += failed
+            if slow:
+                self.slow += 1
+        if slow:
+            self._log_slow(kind, query, seconds, wait, rows, site, failed)
+
+    def _log_slow(self, kind, query, seconds, wait, rows, site, failed):
+        if not self.slow_log:
+            return
+        line = (f"{seconds:.3f}s wait={wait:.3f}s rows={rows} site={site} kind={kind}"
+                f"{' FAILED' if failed else ''} {one_line(query)}")
+        try:
+            slow_log_handler(self.slow_log).handle(logging.makeLogRecord({
+                'msg': line, 'levelno': logging.WARNING, 'levelname': 'WARNING'}))
+        except OSError as e:
+            logger.warning("Could not write slow query log %s: %s", self.slow_log, e)
+
+    def reset(self):
+        with self._lock:
+            self._sites = {}
+            self.statements = self.sampled = self.slow = self.errors = 0
+
+    def snapshot(self):
+        """Counters and per-site histograms as plain data, ready for JSON"""
+        with self._lock:
+            sites = [{
+                'site': site,
+                'kind': kind,
+                'sampled': stats.seconds.count,
+                'errors': stats.errors,
+                'rows': stats.rows,
+                'seconds': stats.seconds.to_dict(),
+                'wait_seconds': stats.wait.to_dict(),
+            } for (site, kind), stats in self._sites.items()]
+            snapshot = {
+                'statements': self.statements,
+                'sampled': self.sampled,
+                'slow': self.slow,
+                'errors': self.errors,
+            }
+        sites.sort(key=lambda entry: entry['seconds']['sum'], reverse=True)
+        snapshot.update({
+            'sample_rate': self.sample_rate,
+            'slow_query_seconds': self.slow_query_seconds,
+            'sites': sites,
+        })
+        return snapshot
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """The statistics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, help_text in (('statements', "Statements run"),
+                                ('sampled', "Statements sampled into the histograms"),
+                                ('slow', "Statements at or over the slow query threshold"),
+                                ('errors', "Statements that failed")):
+            metric(f"horses_db_{name}_total", 'counter', help_text)
+            lines.append(f"horses_db_{name}_total {snapshot[name]}")
+        metric('horses_db_sample_rate', 'gauge', "Share of statements sampled into the histograms")
+        lines.append(f"horses_db_sample_rate {snapshot['sample_rate']}")
+
+        for field, name, help_text in (
+                ('seconds', 'horses_db_statement_seconds', "Wall time of sampled statements, connection wait included"),
+                ('wait_seconds', 'horses_db_connection_wait_seconds', "Time sampled statements waited for a pooled connection")):
+            metric(name, 'histogram', help_text)
+            for entry in snapshot['sites']:
+                labels = f'site="{label_value(entry["site"])}",kind="{entry["kind"]}"'
+                histogram = entry[field]
+                cumulative = 0
+                for bound, count in histogram['buckets'].items():
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram['sum']}")
+                lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+
+        metric('horses_db_sampled_rows_total', 'counter', "Rows returned or changed by sampled statements")
+        for entry in snapshot['sites']:
+            lines.append(f'horses_db_sampled_rows_total{{site="{label_value(entry["site"])}",'
+                         f'kind="{entry["kind"]}"}} {entry["rows"]}')
+        return "\n".join(lines) + "\n"
+
+def label_value(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def slow_log_handler(path):
+    """The rotating handler for a slow-query log file, opened on first use"""
+    path = os.path.abspath(path)
+    with _slow_handlers_lock:
+        handler = _slow_handlers.get(path)
+        if handler is None:
+            handler = RotatingFileHandler(path, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_BACKUPS,
+                                          delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            _slow_handlers[path] = handler
+    return handler
@@ -0,0 +1,447 @@
+"""
+DatabaseManager for the data access layer
+Pooled connections, prepared statement and result caches, transactions and
+stored procedures. Failures are raised as data_access.errors exceptions and
+nothing here touches a GUI, so it works from worker threads, processes and
+command line jobs alike.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+import mysql.connector
+from mysql.connector import Error
+from sql_script import iter_statements, drop_statement
+from migrate import MigrationError, apply_migrations, is_initialized
+from data_access.caches import (ER_UNSUPPORTED_PS, PREPARABLE_VERBS, PROCEDURE_TABLES, ResultCache,
+                                StatementCache, is_read_only, referenced_tables, written_tables)
+from data_access.errors import ConnectionFailed, DataAccessError, translate
+from data_access.instrumentation import SAMPLE_RATE, SLOW_QUERY_LOG, SLOW_QUERY_SECONDS, QueryStats
+from data_access.pool import ConnectionPool, is_connection_lost
+
+logger = logging.getLogger(__name__)
+
+# Every manager, so a forked child can drop the connections it inherited
+_managers = weakref.WeakSet()
+
+def _after_fork():
+    for manager in list(_managers):
+        manager._reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+class DatabaseManager:
+    def __init__(self, pool_size=5, checkout_timeout=10.0, ping_interval=30.0,
+                 use_prepared_statements=True, statement_cache_size=32,
+                 result_cache_size=256, result_cache_ttl=60.0, sample_rate=SAMPLE_RATE,
+                 slow_query_seconds=SLOW_QUERY_SECONDS, slow_query_log=SLOW_QUERY_LOG):
+        self.host = "127.0.0.1"
+        self.database = "Horses"  # Match MCP configuration
+        self.user = "root"
+        self.password = "Asd11011"
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # Prepared statements live on the connection that prepared them
+        self.use_prepared_statements = use_prepared_statements
+        self.statement_cache_size = statement_cache_size
+        self._statement_caches = {}
+        self._unpreparable = set()
+        self._statement_lock = threading.Lock()
+        self._statement_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'unpreparable': 0}
+
+        # Report results, reused until a write through this manager touches their tables
+        self.result_cache = ResultCache(result_cache_size, result_cache_ttl)
+        self._write_listeners = []
+
+        # Timing of every statement, sampled histograms and the slow-query log
+        self.query_stats = QueryStats(sample_rate, slow_query_seconds, slow_query_log)
+        _managers.add(self)
+
+    def _reset_after_fork(self):
+        """Forget the parent's connections in a forked child; they are reopened on first use
+
+        The sockets belong to the parent, so they are dropped, not closed.
+        """
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._statement_caches = {}
+        self._statement_lock = threading.Lock()
+        self.query_stats.after_fork()
+
+    @property
+    def pool(self):
+        """Connection pool, created on first use so importing this module never connects"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self._connect, self.pool_size, self.checkout_timeout, self.ping_interval,
+                        on_close=self._forget_connection
+                    )
+        return self._pool
+
+    def _connect(self):
+        """Open a new physical connection for the pool"""
+        return mysql.connector.connect(
+            host=self.host,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            autocommit=True
+        )
+
+    def get_connection(self):
+        """Check out a pooled connection; hand it back with release_connection()
+
+        Raises ConnectionFailed if none can be opened.
+        """
+        try:
+            return self.pool.checkout()
+        except Error as e:
+            raise ConnectionFailed(f"Failed to connect to database: {e}", e) from e
+
+    def release_connection(self, connection):
+        """Return a connection obtained from get_connection() to the pool"""
+        self.pool.checkin(connection)
+
+    def close_connection(self):
+        """Close all pooled database connections"""
+        if self._pool is not None:
+            self._pool.close_all()
+            self._pool = None
+            logger.info("MySQL connections closed")
+
+    def get_pool_stats(self):
+        """Return connection pool statistics"""
+        return self.pool.get_stats()
+
+    def execute_query(self, query, params=None, use_cache=False):
+        """Execute a query and return its rows, or the row count for a write
+
+        With use_cache, a read is answered from the result cache when an
+        unexpired copy exists; writes always invalidate the tables they touch.
+        Raises a DataAccessError on failure.
+        """
+        read_only = is_read_only(query)
+        key = ResultCache.make_key(query, params) if use_cache and read_only else None
+        if key is not None:
+            hit, rows = self.result_cache.get(key)
+            if hit:
+                return rows
+            generation = self.result_cache.generation
+
+        # Reads are replayed once on a fresh connection if the old one died;
+        # writes are not, since the server may already have applied them
+        attempts = 2 if read_only else 1
+        for attempt in range(attempts):
+            try:
+                result = self._execute(query, params)
+                if key is not None:
+                    self.result_cache.put(key, result, generation)
+                elif not read_only:
+                    self.invalidate_tables(referenced_tables(query))
+                return result
+            except Error as e:
+                if is_connection_lost(e) and attempt + 1 < attempts:
+                    logger.warning("Connection lost, retrying query: %s", e)
+                    continue
+                raise translate(e) from e
+
+    def _execute(self, query, params):
+        """Run one statement on a pooled connection, timing it for query_stats"""
+        started = time.perf_counter()
+        connected = result = None
+        try:
+            with self.pool.connection() as connection:
+                connected = time.perf_counter()
+                result = self._run_statement(connection, query, params)
+                return result
+        finally:
+            self.query_stats.record('query', query, started, connected, result)
+
+    def _run_statement(self, connection, query, params):
+        """Run one statement, through the prepared statement cache when it can be"""
+        cache = self._statement_cache_for(connection, query)
+        if cache is None:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                return self._collect(connection, cursor, query)
+            finally:
+                cursor.close()
+
+        entry = cache.get(query)
+        if entry is None:
+            cursor, cached_query, evicted = cache.add(query)
+            self._count_statement('misses', evicted)
+        else:
+            cursor, cached_query = entry
+            self._count_statement('hits')
+        try:
+            cursor.execute(cached_query, params)
+            return self._collect(connection, cursor, query)
+        except Error as e:
+            cache.evict(query)
+            if getattr(e, 'errno', None) != ER_UNSUPPORTED_PS:
+                raise
+        # The server refused to prepare it, so nothing ran; send it as text from now on
+        with self._statement_lock:
+            self._unpreparable.add(query)
+            self._statement_stats['unpreparable'] += 1
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return self._collect(connection, cursor, query)
+        finally:
+            cursor.close()
+
+    def _collect(self, connection, cursor, query):
+        """Fetch rows for reads, commit and return the row count for writes"""
+        # Check if query is a SELECT statement
+        if is_read_only(query):
+            results = cursor.fetchall()
+            return results
+        else:
+            # For INSERT, UPDATE, DELETE
+            connection.commit()
+            return cursor.rowcount
+
+    def _statement_cache_for(self, connection, query):
+        """Return the connection's prepared statement cache, or None to use the text protocol"""
+        if not self.use_prepared_statements:
+            with self._statement_lock:
+                cache = self._statement_caches.pop(connection, None)
+            if cache is not None:
+                cache.clear()
+            return None
+        words = query.lstrip().split(None, 1)
+        if not words or words[0].upper() not in PREPARABLE_VERBS or query in self._unpreparable:
+            return None
+        with self._statement_lock:
+            cache = self._statement_caches.get(connection)
+            if cache is None:
+                cache = StatementCache(connection, self.statement_cache_size)
+                self._statement_caches[connection] = cache
+        return cache
+
+    def _forget_connection(self, connection):
+        """Drop the statement cache of a connection the pool is closing"""
+        with self._statement_lock:
+            self._statement_caches.pop(connection, None)
+
+    def _count_statement(self, outcome, evicted=0):
+        with self._statement_lock:
+            self._statement_stats[outcome] += 1
+            self._statement_stats['evictions'] += evicted
+
+    def set_prepared_statements(self, enabled):
+        """Turn the prepared statement cache on or off, e.g. to compare parse times"""
+        self.use_prepared_statements = enabled
+
+    def invalidate_tables(self, tables):
+        """Forget cached results that read any of tables; None or empty means every table"""
+        if tables:
+            self.result_cache.invalidate(tables)
+        else:
+            self.result_cache.clear()
+        written = written_tables(tables) if tables else None
+        for listener in list(self._write_listeners):
+            listener(written)
+
+    def add_write_listener(self, listener):
+        """Call listener(tables) after every write through this manager
+
+        tables is the set of lower-cased table names written, triggers
+        included, or None when everything may have changed.
+        """
+        self._write_listeners.append(listener)
+
+    def remove_write_listener(self, listener):
+        if listener in self._write_listeners:
+            self._write_listeners.remove(listener)
+
+    def get_result_cache_stats(self):
+        """Return result cache hit rate, size and memory footprint"""
+        return self.result_cache.get_stats()
+
+    def get_query_stats(self):
+        """Return statement counts and per-call-site latency histograms
+
+        query_stats.to_prometheus() gives the same figures as Prometheus text.
+        """
+        return self.query_stats.snapshot()
+
+    def get_statement_cache_stats(self):
+        """Return prepared statement cache hit/miss counters"""
+        with self._statement_lock:
+            stats = dict(self._statement_stats)
+            stats['cached_statements'] = sum(len(cache) for cache in self._statement_caches.values())
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['enabled'] = self.use_prepared_statements
+        stats['max_size'] = self.statement_cache_size
+        return stats
+
+    def execute_transaction(self, statements):
+        """Run (query, params) pairs atomically and return the total row count
+
+        When params is a list of tuples the statement runs through executemany,
+        which sends an INSERT as a single multi-row VALUES statement.
+        Nothing is committed unless every statement succeeds.
+        """
+        cursor = None
+        started = time.perf_counter()
+        connected = result = None
+        try:
+            with self.pool.connection() as connection:
+                connected = time.perf_counter()
+                try:
+                    connection.start_transaction()
+                    cursor = connection.cursor()
+                    rowcount = 0
+                    for query, params in statements:
+                        if isinstance(params, list):
+                            if not params:
+                                continue
+                            cursor.executemany(query, params)
+                        else:
+                            cursor.execute(query, params)
+                        rowcount += max(cursor.rowcount, 0)
+                    connection.commit()
+                    result = rowcount
+                    tables = set()
+                    for query, _ in statements:
+                        tables |= referenced_tables(query)
+                    self.invalidate_tables(tables)
+                    return rowcount
+                finally:
+                    if cursor:
+                        cursor.close()
+
+        except Error as e:
+            # The pool rolls the connection back before reusing it
+            raise translate(e) from e
+        finally:
+            self.query_stats.record('transaction', "; ".join(query for query, _ in statements),
+                                    started, connected, result)
+
+    def execute_procedure(self, procedure_name, params=None):
+        """Execute a stored procedure"""
+        cursor = None
+        started = time.perf_counter()
+        connected = result = None
+        try:
+            with self.pool.connection() as connection:
+                connected = time.perf_counter()
+                try:
+                    cursor = connection.cursor()
+
+                    # Call the stored procedure with parameters
+                    if params:
+                        cursor.callproc(procedure_name, params)
+                    else:
+                        cursor.callproc(procedure_name)
+
+                    # Commit the transaction
+                    connection.commit()
+                    self.invalidate_tables(PROCEDURE_TABLES.get(procedure_name))
+
+                    # Get results if any
+                    results = []
+                    for stored in cursor.stored_results():
+                        results.extend(stored.fetchall())
+
+                    result = results if results else True
+                    return result
+                finally:
+                    if cursor:
+                        cursor.close()
+
+        except Error as e:
+            raise translate(e) from e
+        finally:
+            self.query_stats.record('procedure', f"CALL {procedure_name}", started, connected, result)
+
+    def test_connection(self):
+        """Test database connection"""
+        try:
+            connection = self.get_connection()
+        except ConnectionFailed as e:
+            logger.warning("Connection test failed: %s", e)
+            return False
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()
+            cursor.close()
+            self.release_connection(connection)
+            return True
+        except Error as e:
+            logger.warning("Connection test failed: %s", e)
+            self.pool.discard(connection)
+            return False
+
+    def is_initialized(self):
+        """True if the Horses schema has already been loaded"""
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    return is_initialized(cursor)
+                finally:
+                    cursor.close()
+        except Error as e:
+            raise translate(e) from e
+
+    def setup_database(self, reset=False):
+        """Set up the database by running schema and sample data
+
+        An existing database is only upgraded with pending migrations unless
+        reset is True, since database_schema.sql drops every table. Returns
+        the migrations applied; raises a DataAccessError on failure.
+        """
+        try:
+            # First try to create the database (may fail if it already exists)
+            try:
+                temp_connection = mysql.connector.connect(
+                    host=self.host,
+                    user=self.user,
+                    password=self.password
+                )
+                cursor = temp_connection.cursor()
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.database}`")
+                temp_connection.close()
+            except Exception:
+                pass  # Database might already exist or no permissions
+
+            # Now connect to the database and stream each script through one connection
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    if not reset and is_initialized(cursor):
+                        applied = apply_migrations(connection)
+                        self.invalidate_tables(None)
+                        return applied
+                    for filename in ('database_schema.sql', 'sample_data.sql', 'procedures_triggers.sql'):
+                        for statement in iter_statements(filename):
+                            drop = drop_statement(statement)
+                            if drop:
+                                cursor.execute(drop)
+                            cursor.execute(statement)
+                finally:
+                    cursor.close()
+                applied = apply_migrations(connection)
+            self.invalidate_tables(None)
+            return applied
+
+        except Error as e:
+            raise translate(e) from e
+        except (OSError, MigrationError) as e:
+            raise DataAccessError(f"Database setup failed: {e}", e) from e
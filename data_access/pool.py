@@ -0,0 +1,187 @@
+"""
+Connection pool for the data access layer
+Fixed-size pool of MySQL connections with idle pings and dead-connection detection
+"""
+
+from contextlib import contextmanager
+from collections import deque
+import threading
+import time
+from mysql.connector import Error
+from mysql.connector.errors import PoolError, InterfaceError, OperationalError
+
+# Client error codes meaning the socket to the server is gone
+CONNECTION_LOST_ERRNOS = {
+    2006,  # CR_SERVER_GONE_ERROR
+    2013,  # CR_SERVER_LOST
+    2055,  # CR_SERVER_LOST_EXTENDED
+    4031,  # ER_CLIENT_INTERACTION_TIMEOUT
+}
+
+def is_connection_lost(error):
+    """True when a MySQL error means the connection itself died"""
+    errno = getattr(error, 'errno', None)
+    if errno is None:
+        # Client-side "connection not available" errors carry no server errno
+        return isinstance(error, (InterfaceError, OperationalError))
+    return errno in CONNECTION_LOST_ERRNOS
+
+class ConnectionPool:
+    """Fixed-size pool of MySQL connections shared by the admin and guest windows"""
+    def __init__(self, connect, pool_size=5, checkout_timeout=10.0, ping_interval=30.0, on_close=None):
+        self.connect = connect
+        # Called with each connection the pool closes, so per-connection state can be dropped
+        self.on_close = on_close
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        # Idle connections younger than this are trusted without a round trip
+        self.ping_interval = ping_interval
+
+        self._idle = deque()  # (connection, last_used) pairs, most recent on the right
+        self._created = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.connects = 0
+        self.pings = 0
+        self.reconnects = 0
+        self.discarded = 0
+
+    def checkout(self, timeout=None):
+        """Borrow a connection, waiting up to timeout seconds for one to free up"""
+        if timeout is None:
+            timeout = self.checkout_timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._available:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._created < self.pool_size:
+                    # Reserve a slot now, open the socket outside the lock
+                    self._created += 1
+                    connection, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolError(f"No free connection after {timeout:.1f}s (pool size {self.pool_size})")
+                self._available.wait(remaining)
+            self.checkouts += 1
+            self.wait_time += time.monotonic() - started
+
+        try:
+            if connection is not None and started - last_used >= self.ping_interval:
+                if not self._ping(connection):
+                    self.reconnects += 1
+                    self._close_quietly(connection)
+                    connection = None
+            if connection is None:
+                connection = self.connect()
+                self.connects += 1
+        except Exception:
+            self._release_slot()
+            raise
+        return connection
+
+    def checkin(self, connection):
+        """Return a borrowed connection to the pool"""
+        if self._closed:
+            self._close_quietly(connection)
+            self._release_slot()
+            return
+
+        with self._available:
+            self._idle.append((connection, time.monotonic()))
+            self._available.notify()
+
+    def discard(self, connection):
+        """Drop a broken connection and free its slot for a fresh one"""
+        self._close_quietly(connection)
+        self._release_slot()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks a connection out and always checks it back in"""
+        connection = self.checkout(timeout)
+        try:
+            yield connection
+        except Error as e:
+            if is_connection_lost(e):
+                # Found out from the failed statement itself; the next checkout opens a new one
+                self.reconnects += 1
+                self.discard(connection)
+                raise
+            # Don't hand on a connection left mid-transaction; drop it if it can't be reset
+            try:
+                connection.rollback()
+            except Error:
+                self.discard(connection)
+            else:
+                self.checkin(connection)
+            raise
+        except BaseException:
+            self.discard(connection)
+            raise
+        else:
+            self.checkin(connection)
+
+    def close_all(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._available:
+            self._closed = True
+            idle = [connection for connection, last_used in self._idle]
+            self._idle.clear()
+            self._created -= len(idle)
+            self._available.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def get_stats(self):
+        """Return a snapshot of pool usage counters"""
+        with self._available:
+            idle = len(self._idle)
+            created = self._created
+        return {
+            'pool_size': self.pool_size,
+            'open': created,
+            'idle': idle,
+            'in_use': created - idle,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': (self.wait_time / self.checkouts * 1000) if self.checkouts else 0.0,
+            'connects': self.connects,
+            'pings': self.pings,
+            'reconnects': self.reconnects,
+            'discarded': self.discarded,
+        }
+
+    def _ping(self, connection):
+        """Round-trip liveness check for a connection that sat idle past ping_interval"""
+        self.pings += 1
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _release_slot(self):
+        with self._available:
+            self._created -= 1
+            self.discarded += 1
+            self._available.notify()
+
+    def _close_quietly(self, connection):
+        if self.on_close is not None:
+            self.on_close(connection)
+        try:
+            connection.close()
+        except Exception:
+            pass
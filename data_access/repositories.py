@@ -0,0 +1,189 @@
+"""
+Repositories for Horse Racing Database System
+One class per table family, holding the lookups and writes the admin GUI
+and the API server share. Methods block, so GUIs call them through a
+TaskRunner and the API server on its worker threads. Bad input raises
+InvalidData, missing rows NotFound, database failures the other
+data_access.errors exceptions.
+"""
+
+import uuid
+import report_queries
+from data_access.errors import InvalidData, NotFound
+from data_access.validation import check_race_when, parse_position, parse_prize
+
+# Key columns are VARCHAR(15)
+ID_LENGTH = 15
+
+# Keep IN (...) lists well below max_allowed_packet
+LOOKUP_BATCH = 1000
+
+RACE_INSERT = """
+    INSERT INTO Race (raceId, raceName, trackName, raceDate, raceTime)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+RESULTS_INSERT = """
+    INSERT INTO RaceResults (raceId, horseId, position, prize)
+    VALUES (%s, %s, %s, %s)
+"""
+
+def new_id(prefix):
+    """A random id filling a VARCHAR(15) key column"""
+    return prefix + uuid.uuid4().hex[:ID_LENGTH - len(prefix)]
+
+def required_text(value, name, max_length):
+    """value stripped of blanks; InvalidData if empty or too long for its column"""
+    text = str(value).strip() if value is not None else ''
+    if not text:
+        raise InvalidData(f"{name} is required")
+    if len(text) > max_length:
+        raise InvalidData(f"{name} must be at most {max_length} characters")
+    return text
+
+class Repository:
+    """Base for repositories over a DatabaseManager"""
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def _first(self, query, params):
+        rows = self.db_manager.execute_query(query, params)
+        return rows[0] if rows else None
+
+    def _require(self, query, key, what):
+        if self._first(query, (key,)) is None:
+            raise NotFound(f"{what} '{key}' not found")
+
+    def _existing(self, query, column, keys):
+        """Which of keys exist, one IN (...) lookup per LOOKUP_BATCH keys"""
+        found = set()
+        keys = list(keys)
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            rows = self.db_manager.execute_query(query.format(names=report_queries.in_list(len(batch))), tuple(batch))
+            found.update(row[column] for row in rows)
+        return found
+
+class HorseRepository(Repository):
+    def info(self, horse_id):
+        """Name, age, gender and stable name of a horse, or None"""
+        return self._first(report_queries.HORSE_INFO, (horse_id,))
+
+    def name(self, horse_id):
+        """The horse's name, or None if there is no such horse"""
+        row = self._first("SELECT horseName FROM Horse WHERE horseId = %s", (horse_id,))
+        return row['horseName'] if row else None
+
+    def existing(self, horse_ids):
+        """The subset of horse_ids that exist"""
+        return self._existing("SELECT horseId FROM Horse WHERE horseId {names}", 'horseId', set(horse_ids))
+
+    def move(self, horse_id, stable_id):
+        """Move a horse to another stable"""
+        horse_id = required_text(horse_id, "Horse", ID_LENGTH)
+        stable_id = required_text(stable_id, "Stable", 30)
+        self._require("SELECT horseId FROM Horse WHERE horseId = %s", horse_id, "Horse")
+        self._require("SELECT stableId FROM Stable WHERE stableId = %s", stable_id, "Stable")
+        return self.db_manager.execute_query("UPDATE Horse SET stableId = %s WHERE horseId = %s",
+                                             (stable_id, horse_id))
+
+class StableRepository(Repository):
+    def list(self):
+        """Every stable's stableId and stableName, by name"""
+        return self.db_manager.execute_query("SELECT stableId, stableName FROM Stable ORDER BY stableName")
+
+class TrackRepository(Repository):
+    def names(self):
+        """Every track name, alphabetically"""
+        rows = self.db_manager.execute_query("SELECT trackName FROM Track ORDER BY trackName")
+        return [row['trackName'] for row in rows]
+
+    def existing(self, track_names):
+        """The subset of track_names that exist"""
+        return self._existing("SELECT trackName FROM Track WHERE trackName {names}", 'trackName',
+                              set(track_names))
+
+class OwnerRepository(Repository):
+    def list(self):
+        """Every owner's ownerId and full_name, by last then first name"""
+        return self.db_manager.execute_query("""
+            SELECT ownerId, CONCAT(fname, ' ', lname) as full_name
+            FROM Owner ORDER BY lname, fname
+        """)
+
+    def delete(self, owner_id):
+        """Delete an owner and their ownerships with the DeleteOwner procedure"""
+        owner_id = required_text(owner_id, "Owner", ID_LENGTH)
+        self._require("SELECT ownerId FROM Owner WHERE ownerId = %s", owner_id, "Owner")
+        self.db_manager.execute_procedure("DeleteOwner", [owner_id])
+
+class TrainerRepository(Repository):
+    def add(self, fname, lname, stable_id):
+        """Add a trainer to a stable and return the new trainerId"""
+        fname = required_text(fname, "First name", 30)
+        lname = required_text(lname, "Last name", 30)
+        stable_id = required_text(stable_id, "Stable", 30)
+        self._require("SELECT stableId FROM Stable WHERE stableId = %s", stable_id, "Stable")
+        trainer_id = new_id('T')
+        self.db_manager.execute_query(
+            "INSERT INTO Trainer (trainerId, fname, lname, stableId) VALUES (%s, %s, %s, %s)",
+            (trainer_id, fname, lname, stable_id)
+        )
+        return trainer_id
+
+class RaceRepository(Repository):
+    def existing(self, race_ids):
+        """The subset of race_ids already used by a live or archived race"""
+        return self._existing("SELECT raceId FROM race_history WHERE raceId {names}", 'raceId', set(race_ids))
+
+    def add(self, race, results):
+        """Insert a race and its results in one transaction and return the raceId
+
+        race holds raceName, trackName, raceDate (YYYY-MM-DD), raceTime
+        (HH:MM[:SS]) and optionally raceId; results is a list of
+        (horseId, position, prize), where position may be 3, '3' or 'third'.
+        """
+        race_id = race.get('raceId') or new_id('race')
+        race_id = required_text(race_id, "raceId", ID_LENGTH)
+        race_name = required_text(race.get('raceName'), "raceName", 30)
+        track_name = required_text(race.get('trackName'), "trackName", 30)
+        race_date = required_text(race.get('raceDate'), "raceDate", 10)
+        race_time = required_text(race.get('raceTime'), "raceTime", 8)
+        check_race_when(race_date, race_time)
+        if race.get('raceId') and self.existing([race_id]):
+            raise InvalidData(f"race {race_id} already exists")
+        if not results:
+            raise InvalidData("a race needs at least one result")
+
+        rows = []
+        seen = set()
+        for number, (horse_id, position, prize) in enumerate(results, 1):
+            try:
+                horse_id = required_text(horse_id, "horseId", ID_LENGTH)
+                if horse_id in seen:
+                    raise InvalidData(f"horse {horse_id} listed twice")
+                rows.append((race_id, horse_id, parse_position(position), parse_prize(prize)))
+            except ValueError as e:
+                raise InvalidData(f"result {number}: {e}") from e
+            seen.add(horse_id)
+
+        self._require("SELECT trackName FROM Track WHERE trackName = %s", track_name, "Track")
+        missing = seen - HorseRepository(self.db_manager).existing(seen)
+        if missing:
+            raise NotFound("Horse not found: " + ", ".join(sorted(missing)))
+
+        self.db_manager.execute_transaction([
+            (RACE_INSERT, (race_id, race_name, track_name, race_date, race_time)),
+            (RESULTS_INSERT, rows),
+        ])
+        return race_id
+
+class Repositories:
+    """Every repository over one DatabaseManager"""
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.horses = HorseRepository(db_manager)
+        self.races = RaceRepository(db_manager)
+        self.trainers = TrainerRepository(db_manager)
+        self.owners = OwnerRepository(db_manager)
+        self.tracks = TrackRepository(db_manager)
+        self.stables = StableRepository(db_manager)
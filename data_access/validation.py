@@ -0,0 +1,69 @@
+"""
+Input validation shared by the data access layer, the admin GUI, the race
+card importer and the API server
+"""
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from data_access.errors import InvalidData
+
+POSITION_NAMES = {
+    1: 'first',
+    2: 'second',
+    3: 'third',
+    4: 'fourth',
+    5: 'fifth',
+    6: 'sixth',
+    7: 'seventh',
+    8: 'eighth',
+    9: 'ninth',
+    10: 'tenth'
+}
+POSITION_NUMBERS = {name: number for number, name in POSITION_NAMES.items()}
+
+# RaceResults.position is a TINYINT UNSIGNED (migrations/005_numeric_positions.sql)
+MAX_POSITION = 255
+
+# RaceResults.prize is a DECIMAL(12,2) (migrations/006_decimal_prize.sql)
+CENT = Decimal('0.01')
+MAX_PRIZE = Decimal('9999999999.99')
+
+def position_to_text(position):
+    """Text form of a position, as kept in the RaceResults.results compatibility column"""
+    return POSITION_NAMES.get(position, str(position))
+
+def parse_position(value):
+    """Accept 3, '3' or 'third' and return the integer position"""
+    text = str(value).strip().lower()
+    if text in POSITION_NUMBERS:
+        return POSITION_NUMBERS[text]
+    try:
+        position = int(text)
+    except ValueError:
+        raise InvalidData(f"bad position '{value}'")
+    if not 1 <= position <= MAX_POSITION:
+        raise InvalidData(f"position must be between 1 and {MAX_POSITION}, got {position}")
+    return position
+
+def parse_prize(value):
+    """Accept 1500, '1500.5' or '' and return the prize as an exact Decimal in cents"""
+    if value in (None, ''):
+        return Decimal('0.00')
+    try:
+        prize = Decimal(str(value).strip())
+        if not prize.is_finite():
+            raise InvalidOperation
+        prize = prize.quantize(CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise InvalidData(f"bad prize '{value}'")
+    if not Decimal(0) <= prize <= MAX_PRIZE:
+        raise InvalidData(f"prize must be between 0 and {MAX_PRIZE}, got {prize}")
+    return prize
+
+def check_race_when(race_date, race_time):
+    """Reject a race date that isn't YYYY-MM-DD or a time that isn't HH:MM[:SS]"""
+    try:
+        datetime.strptime(race_date, '%Y-%m-%d')
+        datetime.strptime(race_time, '%H:%M:%S' if race_time.count(':') == 2 else '%H:%M')
+    except (TypeError, ValueError):
+        raise InvalidData(f"bad date/time '{race_date} {race_time}'")
@@ -1,5 +1,17 @@
 -- Horse Racing Database Schema (ICS321 Project #1)
 -- Drop tables if they exist to ensure clean setup
+-- Archived history and its views (migration 008) go too
+DROP VIEW IF EXISTS race_history;
+DROP VIEW IF EXISTS race_results_history;
+DROP VIEW IF EXISTS old_info_history;
+DROP TABLE IF EXISTS race_results_archive;
+DROP TABLE IF EXISTS race_archive;
+DROP TABLE IF EXISTS old_info_archive;
+DROP TABLE IF EXISTS race_ids;
+DROP TABLE IF EXISTS trainer_stats;
+DROP TABLE IF EXISTS track_stats;
+DROP TABLE IF EXISTS track_daily;
+DROP TABLE IF EXISTS track_horse_monthly;
 DROP TABLE IF EXISTS RaceResults;
 DROP TABLE IF EXISTS Race;
 DROP TABLE IF EXISTS Trainer;
@@ -9,6 +21,8 @@ DROP TABLE IF EXISTS Owner;
 DROP TABLE IF EXISTS Stable;
 DROP TABLE IF EXISTS Track;
 DROP TABLE IF EXISTS old_info;
+-- A fresh schema starts at version 0; run migrate.py (setup does) to upgrade it
+DROP TABLE IF EXISTS schema_version;
 
 -- Create Stable table
 CREATE TABLE Stable (
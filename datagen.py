@@ -0,0 +1,316 @@
+"""
+Synthetic data generator for Horse Racing Database System
+Streams a realistic dataset for every table (Stable, Horse, Owner, Owns,
+Trainer, Track, Race, RaceResults) from a seed, so the same options always
+produce the same rows. Sizes scale with the number of race results unless
+set, and the data is skewed the way real racing data is:
+
+- a few stables hold most horses (Zipf over stables, --stable-skew)
+- owner surnames follow a Zipf frequency curve (--name-skew)
+- popular tracks host more races and busy horses run more often
+- field sizes vary per race around a typical size (--field-size MIN MODE MAX)
+
+Rows are generated lazily and written in batches, so memory stays flat
+however many rows are asked for; only the per-category weight tables
+(one float per stable, horse, track and surname) are kept.
+
+Usage:
+    python datagen.py --results 10000000 > big_seed.sql      multi-row INSERT statements
+    python datagen.py --results 1000000 --tsv seed/           one tab-separated file per table
+    python datagen.py --results 50000 --stable-skew 1.5 --name-skew 0.8 --seed 7
+
+Load the SQL with "python bulk_loader.py big_seed.sql"; --tsv prints the
+matching bulk_loader.py command.
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+DEFAULT_SEED = 321
+DEFAULT_RESULTS = 10000
+BATCH_ROWS = 1000
+
+# Races run over these days; fixed so the same seed always gives the same data
+FIRST_RACE_DAY = date(2015, 1, 1)
+RACE_DAYS = 3650
+
+# Runners per race: (fewest, most common, most)
+FIELD_SIZE = (5, 8, 14)
+
+# Purse per race, the smaller ones far more common; split over the first places
+PURSES = (Decimal('10000'), Decimal('20000'), Decimal('50000'), Decimal('100000'), Decimal('250000'))
+PURSE_SPLIT = (Decimal('0.60'), Decimal('0.20'), Decimal('0.10'), Decimal('0.05'))
+CENT = Decimal('0.01')
+
+# Owners per horse and how often each count occurs
+OWNERS_PER_HORSE = ((1, 70), (2, 25), (3, 5))
+
+DEFAULT_SURNAMES = 2000
+
+# The most frequent surnames, in order; Smith and Jones are what report_queries.REPORTS looks up
+COMMON_SURNAMES = ('Smith', 'Jones', 'Alharbi', 'Alqahtani', 'Brown', 'Garcia', 'Khan', 'Lee', 'Martin',
+                   'Nguyen', 'Otaibi', 'Patel', 'Rossi', 'Silva', 'Taylor', 'Wilson', 'Zahrani', 'Young')
+SURNAME_SYLLABLES = ('al', 'ba', 'ber', 'dan', 'el', 'far', 'gar', 'han', 'is', 'ka', 'lam', 'mar',
+                     'na', 'or', 'ra', 'sa', 'ton', 'vi', 'wen', 'zu')
+FIRST_NAMES = ('Ahmed', 'Ali', 'Anna', 'Fatima', 'James', 'Layla', 'Maria', 'Mohammed', 'Noura',
+               'Omar', 'Sara', 'Yousef', 'Khalid', 'Reem', 'David', 'Huda')
+HORSE_WORDS = ('Thunder', 'Lightning', 'Storm', 'Desert', 'Wind', 'Star', 'Gold', 'Night', 'Fire',
+               'Swift', 'Royal', 'Dancer', 'Arrow', 'Spirit', 'Falcon', 'Moon', 'Silver', 'Rose')
+COLORS = ('orange', 'kiwi', 'cinnamon', 'lemon', 'bright blue', 'green', 'crimson', 'white')
+CITIES = ('Riyadh', 'Dubai', 'Jeddah', 'Jubail', 'Ajman', 'Dammam', 'Doha', 'Abu Dhabi', 'Muscat')
+GENDERS = 'CFMGS'
+
+# Columns written for each table, in load order (parents before children)
+COLUMNS = {
+    'Stable': ('stableId', 'stableName', 'location', 'colors'),
+    'Horse': ('horseId', 'horseName', 'age', 'gender', 'registration', 'stableId'),
+    'Owner': ('ownerId', 'lname', 'fname'),
+    'Owns': ('ownerId', 'horseId'),
+    'Trainer': ('trainerId', 'lname', 'fname', 'stableId'),
+    'Track': ('trackName', 'location', 'length'),
+    'Race': ('raceId', 'raceName', 'trackName', 'raceDate', 'raceTime'),
+    'RaceResults': ('raceId', 'horseId', 'position', 'prize'),
+}
+
+class Zipf:
+    """Draws ranks 1..n with probability proportional to 1 / rank**s (s = 0 is uniform)"""
+    def __init__(self, n, s):
+        self.n = n
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, n + 1):
+            total += rank ** -s
+            self.cumulative.append(total)
+        self.total = total
+
+    def draw(self, rng):
+        return min(bisect.bisect_right(self.cumulative, rng.random() * self.total) + 1, self.n)
+
+    def distinct(self, rng, count):
+        """count different ranks; count must not exceed n"""
+        chosen = []
+        for _ in range(count * 50):
+            rank = self.draw(rng)
+            if rank not in chosen:
+                chosen.append(rank)
+                if len(chosen) == count:
+                    return chosen
+        # Very steep skew over few ranks: fill up uniformly rather than spin
+        rest = [rank for rank in range(1, self.n + 1) if rank not in chosen]
+        return chosen + rng.sample(rest, count - len(chosen))
+
+class DatasetConfig:
+    """Sizes and skew of a dataset; sizes left as None scale with results"""
+    def __init__(self, results=DEFAULT_RESULTS, seed=DEFAULT_SEED, horses=None, stables=None, owners=None,
+                 trainers=None, tracks=None, surnames=DEFAULT_SURNAMES, stable_skew=1.1, name_skew=1.0,
+                 horse_skew=0.5, track_skew=0.8, field_size=FIELD_SIZE):
+        self.results = results
+        self.seed = seed
+        self.horses = horses or max(results // 40, 50)
+        self.stables = stables or max(self.horses // 25, 5)
+        self.owners = owners or max(self.horses // 2, 20)
+        self.trainers = trainers or self.stables + self.stables // 2
+        self.tracks = tracks or max(min(results // 50000, 200), 5)
+        self.surnames = surnames
+        self.stable_skew = stable_skew
+        self.name_skew = name_skew
+        self.horse_skew = horse_skew
+        self.track_skew = track_skew
+        self.field_size = field_size
+        if self.field_size[2] > self.horses:
+            raise ValueError(f"fields of up to {self.field_size[2]} runners need at least that many horses")
+        if self.trainers < self.stables:
+            raise ValueError("every stable needs a trainer, so trainers must be at least stables")
+
+    def rng(self, table):
+        """An independent random stream per table, so each table's rows depend only on the seed"""
+        return random.Random(f"{self.seed}-{table}")
+
+def surname_pool(count):
+    """count distinct surnames, most common first"""
+    names = list(COMMON_SURNAMES[:count])
+    seen = set(names)
+    rng = random.Random("surnames")
+    while len(names) < count:
+        name = "".join(rng.choice(SURNAME_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()[:15]
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+def horse_name(rng):
+    return f"{rng.choice(HORSE_WORDS)} {rng.choice(HORSE_WORDS)}"[:15]
+
+def race_plan(config):
+    """Yield (number, track, day, time, purse, runners) per race; runners add up to exactly results"""
+    rng = config.rng('races')
+    tracks = Zipf(config.tracks, config.track_skew)
+    purses = Zipf(len(PURSES), 1.0)
+    fewest, typical, most = config.field_size
+    left = config.results
+    number = 0
+    while left > 0:
+        number += 1
+        runners = min(int(round(rng.triangular(fewest, most, typical))), left)
+        left -= runners
+        day = FIRST_RACE_DAY + timedelta(days=rng.randrange(RACE_DAYS))
+        time = f"{rng.randint(12, 21):02d}:{rng.choice(('00', '15', '30', '45'))}:00"
+        yield number, tracks.draw(rng), day, time, PURSES[purses.draw(rng) - 1], runners
+
+def generate(config):
+    """Yield (table, columns, rows) for the whole dataset, parents first; rows is a generator"""
+    surnames = surname_pool(config.surnames)
+    surname = Zipf(len(surnames), config.name_skew)
+
+    def stables(rng):
+        for i in range(1, config.stables + 1):
+            yield (f"S{i}", f"{surnames[surname.draw(rng) - 1]} Stables"[:30], rng.choice(CITIES),
+                   rng.choice(COLORS))
+
+    def horses(rng):
+        stable = Zipf(config.stables, config.stable_skew)
+        for i in range(1, config.horses + 1):
+            yield (f"H{i}", horse_name(rng), rng.randint(2, 9), rng.choice(GENDERS), 100000 + i,
+                   f"S{stable.draw(rng)}")
+
+    def owners(rng):
+        for i in range(1, config.owners + 1):
+            yield (f"O{i}", surnames[surname.draw(rng) - 1], rng.choice(FIRST_NAMES))
+
+    def owns(rng):
+        counts = [count for count, _ in OWNERS_PER_HORSE]
+        weights = [weight for _, weight in OWNERS_PER_HORSE]
+        for i in range(1, config.horses + 1):
+            count = min(rng.choices(counts, weights)[0], config.owners)
+            for owner in rng.sample(range(1, config.owners + 1), count):
+                yield (f"O{owner}", f"H{i}")
+
+    def trainers(rng):
+        # Every stable gets a trainer; the big stables get most of the extra ones
+        stable = Zipf(config.stables, config.stable_skew)
+        for i in range(1, config.trainers + 1):
+            number = i if i <= config.stables else stable.draw(rng)
+            yield (f"T{i}", surnames[surname.draw(rng) - 1], rng.choice(FIRST_NAMES), f"S{number}")
+
+    def tracks(rng):
+        for i in range(1, config.tracks + 1):
+            yield (f"Track {i}", rng.choice(CITIES), rng.choice((1, 1, 2, 2, 3)))
+
+    def races(rng):
+        for number, track, day, time, purse, runners in race_plan(config):
+            yield (f"R{number}", f"Race {number}", f"Track {track}", day, time)
+
+    def race_results(rng):
+        horse = Zipf(config.horses, config.horse_skew)
+        for number, track, day, time, purse, runners in race_plan(config):
+            for position, rank in enumerate(horse.distinct(rng, runners), 1):
+                share = PURSE_SPLIT[position - 1] if position <= len(PURSE_SPLIT) else 0
+                yield (f"R{number}", f"H{rank}", position, (purse * share).quantize(CENT))
+
+    for table, rows in (('Stable', stables), ('Horse', horses), ('Owner', owners), ('Owns', owns),
+                        ('Trainer', trainers), ('Track', tracks), ('Race', races),
+                        ('RaceResults', race_results)):
+        yield table, COLUMNS[table], rows(config.rng(table))
+
+def sql_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    text = str(value)
+    if "\\" in text or "'" in text or "\n" in text:
+        text = text.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n")
+    return f"'{text}'"
+
+def write_sql(tables, out, batch_rows=BATCH_ROWS):
+    """Write multi-row INSERT statements of up to batch_rows rows each; returns rows per table"""
+    written = {}
+    for table, columns, rows in tables:
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append("(" + ", ".join(sql_literal(value) for value in row) + ")")
+            if len(batch) >= batch_rows:
+                out.write(head + ",\n".join(batch) + ";\n")
+                count += len(batch)
+                batch = []
+        if batch:
+            out.write(head + ",\n".join(batch) + ";\n")
+            count += len(batch)
+        written[table] = count
+    return written
+
+def tsv_field(value):
+    """A value as LOAD DATA reads it by default: \\N for NULL, special characters escaped"""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+def write_tsv(tables, directory):
+    """Write <Table>.tsv per table into directory; returns {table: (path, rows)}"""
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for table, columns, rows in tables:
+        path = os.path.join(directory, f"{table}.tsv")
+        count = 0
+        with open(path, 'w', newline='\n', encoding='utf-8') as f:
+            for row in rows:
+                f.write("\t".join(tsv_field(value) for value in row) + "\n")
+                count += 1
+        written[table] = (path, count)
+    return written
+
+def main(argv=None):
+    """Write a synthetic dataset as SQL or TSV"""
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic Horses dataset")
+    parser.add_argument('--results', type=int, default=DEFAULT_RESULTS, help="race results to generate")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    for name in ('horses', 'stables', 'owners', 'trainers', 'tracks'):
+        parser.add_argument(f"--{name}", type=int, help=f"number of {name} (default scales with --results)")
+    parser.add_argument('--surnames', type=int, default=DEFAULT_SURNAMES, help="distinct owner and trainer surnames")
+    parser.add_argument('--stable-skew', type=float, default=1.1, help="Zipf exponent of horses per stable")
+    parser.add_argument('--name-skew', type=float, default=1.0, help="Zipf exponent of surname frequency")
+    parser.add_argument('--horse-skew', type=float, default=0.5, help="Zipf exponent of races per horse")
+    parser.add_argument('--track-skew', type=float, default=0.8, help="Zipf exponent of races per track")
+    parser.add_argument('--field-size', type=int, nargs=3, metavar=('MIN', 'MODE', 'MAX'), default=list(FIELD_SIZE),
+                        help="runners per race (default 5 8 14)")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS, help="rows per INSERT statement")
+    parser.add_argument('--output', metavar='PATH', help="write SQL to a file instead of stdout")
+    parser.add_argument('--tsv', metavar='DIR', help="write one tab-separated file per table into DIR")
+    args = parser.parse_args(argv)
+
+    try:
+        config = DatasetConfig(args.results, args.seed, args.horses, args.stables, args.owners, args.trainers,
+                               args.tracks, args.surnames, args.stable_skew, args.name_skew, args.horse_skew,
+                               args.track_skew, tuple(args.field_size))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.tsv:
+        written = write_tsv(generate(config), args.tsv)
+        for table, (path, count) in written.items():
+            print(f"{table:12} {count:>12,} rows -> {path}")
+        specs = " ".join(f"--tsv '{table}({','.join(COLUMNS[table])})={path}'"
+                         for table, (path, count) in written.items())
+        print(f"Load with: python bulk_loader.py {specs}")
+        return 0
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        written = write_sql(generate(config), out, args.batch_rows)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        for table, count in written.items():
+            print(f"{table:12} {count:>12,} rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+EXPLAIN-based index check for Horse Racing Database System
+Runs EXPLAIN on each report query and verifies the optimizer uses the
+indexes added by the migrations in migrations/, and that the date-range
+reports only read the raceDate partitions their range covers
+
+Usage:
+    python explain_check.py
+"""
+
+import sys
+import partitions
+import report_queries
+
+# report -> {table alias: index names the optimizer may pick}
+EXPECTED_KEYS = {
+    'horses_by_owner': {
+        'owner': {'idx_owner_lname'},
+        'o': {'PRIMARY'},
+        'h': {'PRIMARY'},
+        't': {'idx_trainer_stable'},
+    },
+    'horses_by_owner_names': {
+        'owner': {'idx_owner_lname'},
+        'o': {'PRIMARY'},
+        'h': {'PRIMARY'},
+        't': {'idx_trainer_stable'},
+    },
+    'horses_by_name': {
+        'h': {'idx_horse_name'},
+        't': {'idx_trainer_stable'},
+    },
+    'horses_by_names': {
+        'h': {'idx_horse_name'},
+        't': {'idx_trainer_stable'},
+    },
+    'winning_trainers': {
+        'rr': {'idx_results_position', 'idx_results_horse'},
+        'h': {'PRIMARY', 'idx_horse_stable'},
+        't': {'idx_trainer_stable'},
+        'r': {'PRIMARY'},
+        'tr': {'PRIMARY'},
+    },
+    'winning_trainers_range': {
+        'rr': {'idx_results_position', 'idx_results_horse', 'PRIMARY'},
+        'h': {'PRIMARY', 'idx_horse_stable'},
+        't': {'idx_trainer_stable'},
+        'r': {'PRIMARY'},
+        'tr': {'PRIMARY'},
+    },
+    'winning_trainers_history_range': {
+        'h': {'PRIMARY', 'idx_horse_stable'},
+        't': {'idx_trainer_stable'},
+        'tr': {'PRIMARY'},
+    },
+    'trainer_winnings_range': {
+        'h': {'PRIMARY'},
+        't': {'idx_trainer_stable'},
+        's': {'PRIMARY'},
+    },
+    'trainer_winnings': {
+        'ts': {'idx_stats_rank'},
+        't': {'PRIMARY'},
+        's': {'PRIMARY'},
+    },
+    'track_stats': {
+        'ts': {'PRIMARY'},
+    },
+    'track_stats_range': {
+        'd': {'PRIMARY'},
+        'm': {'PRIMARY', 'idx_thm_horse'},
+    },
+    'trainer_winnings_history_range': {
+        'h': {'PRIMARY'},
+        't': {'idx_trainer_stable'},
+        's': {'PRIMARY'},
+    },
+    'horse_info': {
+        'h': {'PRIMARY'},
+        's': {'PRIMARY'},
+    },
+}
+
+# Aliases every row of which the report needs (or, for a LIKE search, may have to test) anyway,
+# so a full read is expected
+FULL_SCAN_OK = {
+    'horses_by_name': {'h'},
+    'trainer_winnings': {'ts'},
+    'track_stats': {'tr'},
+    'track_stats_range': {'tr'},
+    # Every result of the partitions the range covers is summed
+    'trainer_winnings_range': {'rr', '<derived2>'},
+    # The history views are materialized from live and archived rows, and the
+    # archive tables have no raceDate index; the price of asking for archived races
+    'winning_trainers_history_range': {'rr', 'r', 'RaceResults', 'Race',
+                                       partitions.ARCHIVE_TABLES['RaceResults'], partitions.ARCHIVE_TABLES['Race']},
+    'trainer_winnings_history_range': {'rr', '<derived2>', 'RaceResults',
+                                       partitions.ARCHIVE_TABLES['RaceResults']},
+    'track_stats_history_range': {'tr', 'rr', 'r', 'RaceResults', 'Race',
+                                  partitions.ARCHIVE_TABLES['RaceResults'], partitions.ARCHIVE_TABLES['Race']},
+}
+
+# report -> aliases of raceDate-partitioned tables that must be pruned to the
+# sample range in REPORTS (2024), so never reading p_before or p_future
+PRUNED = {
+    'winning_trainers_range': {'rr', 'r'},
+    'trainer_winnings_range': {'rr'},
+}
+
+def explain(connection, query, params=None):
+    """Return the EXPLAIN rows for a query"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def check_report(connection, name, query, params=None):
+    """Return (plan rows, list of problems) for one report"""
+    plan = explain(connection, query, params)
+    expected = EXPECTED_KEYS.get(name, {})
+    full_scan_ok = FULL_SCAN_OK.get(name, set())
+    pruned = PRUNED.get(name, set())
+    problems = []
+    for row in plan:
+        alias = row.get('table')
+        key = row.get('key')
+        if (alias or '').startswith('<union'):
+            # Reading back a UNION's temporary result, always a full read
+            continue
+        if alias in pruned:
+            read = set((row.get('partitions') or '').split(','))
+            if not row.get('partitions') or read & {partitions.FIRST_PARTITION, partitions.FUTURE_PARTITION}:
+                problems.append(f"{alias}: not pruned by raceDate (partitions: {row.get('partitions') or 'none'})")
+        if row.get('type') == 'ALL' and alias not in full_scan_ok:
+            problems.append(f"{alias}: full table scan (possible keys: {row.get('possible_keys') or 'none'})")
+        elif alias in expected and key not in expected[alias]:
+            problems.append(f"{alias}: uses {key or 'no index'}, expected {' or '.join(sorted(expected[alias]))}")
+    return plan, problems
+
+def check_all(connection):
+    """EXPLAIN every report; returns {report: problems}"""
+    results = {}
+    for name, (query, params) in report_queries.REPORTS.items():
+        plan, problems = check_report(connection, name, query, params)
+        print(f"\n{name}")
+        for row in plan:
+            print(f"  {row.get('table') or '-':<8} {row.get('type') or '-':<7} "
+                  f"{row.get('key') or '-':<22} rows={row.get('rows')}  {row.get('Extra') or ''}"
+                  f"{'  partitions=' + row['partitions'] if row.get('partitions') else ''}")
+        for problem in problems:
+            print(f"  [FAIL] {problem}")
+        if not problems:
+            print("  [OK] uses the expected indexes")
+        results[name] = problems
+    return results
+
+def main():
+    """Check every report query plan against the expected indexes"""
+    import database
+    with database.db_manager.pool.connection() as connection:
+        results = check_all(connection)
+    failed = [name for name, problems in results.items() if problems]
+    print(f"\n{len(results) - len(failed)}/{len(results)} report queries use their indexes")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
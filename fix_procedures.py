@@ -1,13 +1,15 @@
 """
 Script to properly create stored procedures and triggers
-This handles the DELIMITER issue when creating procedures
+Re-creates everything in procedures_triggers.sql; the streaming SQL parser
+handles DELIMITER directives and nested BEGIN ... END blocks
 """
 
 import mysql.connector
 from mysql.connector import Error
+from sql_script import iter_statements, routine_name, drop_statement
 
-def create_procedures():
-    """Create stored procedures with proper delimiter handling"""
+def create_procedures(filename='procedures_triggers.sql'):
+    """Drop and re-create every procedure and trigger defined in the script"""
     try:
         # Connect to MySQL
         print("Connecting to MySQL server...")
@@ -23,62 +25,25 @@ def create_procedures():
             
             cursor = connection.cursor()
             
-            # Drop existing procedure if it exists
-            print("Dropping existing procedure if it exists...")
-            try:
-                cursor.execute("DROP PROCEDURE IF EXISTS DeleteOwner")
+            for statement in iter_statements(filename):
+                routine = routine_name(statement)
+                if routine is None:
+                    cursor.execute(statement)
+                    continue
+                
+                kind, name = routine
+                # Drop existing procedure/trigger if it exists
+                print(f"Dropping existing {kind.lower()} {name} if it exists...")
+                try:
+                    cursor.execute(drop_statement(statement))
+                    connection.commit()
+                except Error as e:
+                    print(f"Note: {e}")
+                
+                print(f"Creating {name} {kind.lower()}...")
+                cursor.execute(statement)
                 connection.commit()
-                print("Existing procedure dropped.")
-            except Error as e:
-                print(f"Note: {e}")
-            
-            # Create DeleteOwner procedure
-            print("Creating DeleteOwner procedure...")
-            delete_owner_proc = """
-CREATE PROCEDURE DeleteOwner(IN owner_to_delete VARCHAR(15))
-BEGIN
-    DECLARE EXIT HANDLER FOR SQLEXCEPTION
-    BEGIN
-        ROLLBACK;
-        RESIGNAL;
-    END;
-    
-    START TRANSACTION;
-    
-    DELETE FROM Owns WHERE ownerId = owner_to_delete;
-    
-    DELETE FROM Owner WHERE ownerId = owner_to_delete;
-    
-    COMMIT;
-END
-"""
-            cursor.execute(delete_owner_proc)
-            connection.commit()
-            print("DeleteOwner procedure created successfully!")
-            
-            # Drop existing trigger if it exists
-            print("Dropping existing trigger if it exists...")
-            try:
-                cursor.execute("DROP TRIGGER IF EXISTS horse_delete_trigger")
-                connection.commit()
-                print("Existing trigger dropped.")
-            except Error as e:
-                print(f"Note: {e}")
-            
-            # Create horse_delete_trigger
-            print("Creating horse_delete_trigger...")
-            horse_trigger = """
-CREATE TRIGGER horse_delete_trigger
-    BEFORE DELETE ON Horse
-    FOR EACH ROW
-BEGIN
-    INSERT INTO old_info (horseId, horseName, age, gender, registration, stableId)
-    VALUES (OLD.horseId, OLD.horseName, OLD.age, OLD.gender, OLD.registration, OLD.stableId);
-END
-"""
-            cursor.execute(horse_trigger)
-            connection.commit()
-            print("horse_delete_trigger created successfully!")
+                print(f"{name} created successfully!")
             
             # Verify procedure was created
             cursor.execute("SHOW PROCEDURE STATUS WHERE Db = 'Horses'")
@@ -4,14 +4,26 @@ Handles all guest browsing and search functions
 """
 
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
 import database
+import report_queries
+from name_search import NameSearch
+from paged_treeview import PagedTreeview
+from task_runner import TaskRunner, Spinner
+
+# Quiet time after the last keystroke before a search-as-you-type query runs
+DEBOUNCE_MS = 300
 
 class GuestGUI:
-    def __init__(self, root, db_manager, back_callback):
+    def __init__(self, root, db_manager, back_callback, runner=None, name_search=None):
         self.root = root
         self.db_manager = db_manager
         self.back_callback = back_callback
+        self.runner = runner or TaskRunner(root)
+        self._owns_name_search = name_search is None
+        self.name_search = name_search or NameSearch(db_manager)
+        self._search_job = None
         self.root.title("Guest Panel - Horse Racing Database")
         self.root.geometry("800x600")
         self.root.configure(bg="#34495E")
@@ -47,6 +59,9 @@ class GuestGUI:
         )
         back_button.pack(side=tk.RIGHT, padx=20, pady=10)
         
+        self.spinner = Spinner(header_frame, text="Loading", font=("Arial", 10), bg="#2C3E50", fg="white")
+        self.spinner.pack(side=tk.RIGHT, pady=10)
+        
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -57,6 +72,11 @@ class GuestGUI:
         self.create_trainer_winnings_tab()
         self.create_tracks_stats_tab()
         
+        # Build the name indexes now so the first search doesn't wait for them
+        for kind in ('owner', 'horse'):
+            self.runner.submit(self.name_search.index, kind, on_success=lambda index: None,
+                               on_error=lambda e: None)
+        
     def create_horses_by_owner_tab(self):
         """Create tab for browsing horses by owner last name"""
         owner_frame = ttk.Frame(self.notebook)
@@ -65,7 +85,7 @@ class GuestGUI:
         # Title
         title_label = tk.Label(
             owner_frame,
-            text="Browse Horses by Owner Last Name",
+            text="Browse Horses by Owner Last Name or Horse Name",
             font=("Arial", 16, "bold"),
             bg="#34495E",
             fg="white"
@@ -76,7 +96,14 @@ class GuestGUI:
         search_frame = tk.Frame(owner_frame, bg="#34495E")
         search_frame.pack(pady=20)
         
-        tk.Label(search_frame, text="Owner Last Name:", bg="#34495E", fg="white", font=("Arial", 12)).pack()
+        kind_frame = tk.Frame(search_frame, bg="#34495E")
+        kind_frame.pack()
+        
+        self.search_kind_var = tk.StringVar(value='owner')
+        for text, kind in (("Owner Last Name", 'owner'), ("Horse Name", 'horse')):
+            tk.Radiobutton(kind_frame, text=text, variable=self.search_kind_var, value=kind,
+                           bg="#34495E", fg="white", selectcolor="#2C3E50",
+                           font=("Arial", 12)).pack(side=tk.LEFT, padx=10)
         
         input_frame = tk.Frame(search_frame, bg="#34495E")
         input_frame.pack(pady=10)
@@ -88,26 +115,21 @@ class GuestGUI:
         tk.Button(input_frame, text="Search", command=self.search_horses_by_owner, 
                  bg="#3498DB", fg="white", font=("Arial", 10)).pack(side=tk.LEFT, padx=10)
         
+        self.horses_status = tk.Label(search_frame, text="", bg="#34495E", fg="white", font=("Arial", 10))
+        self.horses_status.pack()
+        
+        # Search as you type, once typing pauses
+        self.owner_lname_var.trace_add('write', lambda *args: self.schedule_horse_search())
+        self.search_kind_var.trace_add('write', lambda *args: self.schedule_horse_search())
+        
         # Results frame
         results_frame = tk.Frame(owner_frame, bg="#34495E")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=20)
         
-        # Treeview for results
-        tree_frame = tk.Frame(results_frame, bg="#34495E")
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
+        # Paged Treeview: rows are fetched a page at a time as the user scrolls
         columns = ("Horse Name", "Age", "Gender", "Trainer")
-        self.horses_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
-        
-        for col in columns:
-            self.horses_tree.heading(col, text=col)
-            self.horses_tree.column(col, width=150)
-        
-        scrollbar_horses = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.horses_tree.yview)
-        self.horses_tree.configure(yscrollcommand=scrollbar_horses.set)
-        
-        self.horses_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar_horses.pack(side=tk.RIGHT, fill=tk.Y)
+        self.horses_view = PagedTreeview(results_frame, columns, self.runner, widths=150, spinner=self.spinner)
+        self.horses_view.pack(fill=tk.BOTH, expand=True)
         
     def create_winning_trainers_tab(self):
         """Create tab for browsing trainers with first place wins"""
@@ -128,29 +150,22 @@ class GuestGUI:
         search_frame = tk.Frame(winners_frame, bg="#34495E")
         search_frame.pack(pady=20)
         
-        tk.Button(search_frame, text="Show All Winning Trainers", command=self.search_winning_trainers,
+        # Optional month range; leave both empty for every race
+        self.winners_from_var, self.winners_to_var = self.create_month_range(search_frame)
+        
+        self.winners_archived_var = self.create_archived_check(search_frame)
+        
+        tk.Button(search_frame, text="Show Winning Trainers", command=self.search_winning_trainers,
                  bg="#3498DB", fg="white", font=("Arial", 12, "bold")).pack()
         
         # Results frame
         results_frame = tk.Frame(winners_frame, bg="#34495E")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=20)
         
-        # Treeview for results
-        tree_frame = tk.Frame(results_frame, bg="#34495E")
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
+        # Paged Treeview: rows are fetched a page at a time as the user scrolls
         columns = ("Trainer Name", "Horse Name", "Race Name", "Track", "Date", "Prize")
-        self.winners_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
-        
-        for col in columns:
-            self.winners_tree.heading(col, text=col)
-            self.winners_tree.column(col, width=120)
-        
-        scrollbar_winners = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.winners_tree.yview)
-        self.winners_tree.configure(yscrollcommand=scrollbar_winners.set)
-        
-        self.winners_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar_winners.pack(side=tk.RIGHT, fill=tk.Y)
+        self.winners_view = PagedTreeview(results_frame, columns, self.runner, widths=120, spinner=self.spinner)
+        self.winners_view.pack(fill=tk.BOTH, expand=True)
         
     def create_trainer_winnings_tab(self):
         """Create tab for browsing trainers sorted by total winnings"""
@@ -171,6 +186,10 @@ class GuestGUI:
         search_frame = tk.Frame(winnings_frame, bg="#34495E")
         search_frame.pack(pady=20)
         
+        # Optional month range; leave both empty for totals over every race
+        self.winnings_from_var, self.winnings_to_var = self.create_month_range(search_frame)
+        self.winnings_archived_var = self.create_archived_check(search_frame)
+        
         tk.Button(search_frame, text="Show Trainer Winnings", command=self.search_trainer_winnings,
                  bg="#3498DB", fg="white", font=("Arial", 12, "bold")).pack()
         
@@ -178,22 +197,10 @@ class GuestGUI:
         results_frame = tk.Frame(winnings_frame, bg="#34495E")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=20)
         
-        # Treeview for results
-        tree_frame = tk.Frame(results_frame, bg="#34495E")
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
+        # Paged Treeview: rows are fetched a page at a time as the user scrolls
         columns = ("Trainer Name", "Total Winnings", "Number of Wins", "Stable")
-        self.winnings_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
-        
-        for col in columns:
-            self.winnings_tree.heading(col, text=col)
-            self.winnings_tree.column(col, width=150)
-        
-        scrollbar_winnings = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.winnings_tree.yview)
-        self.winnings_tree.configure(yscrollcommand=scrollbar_winnings.set)
-        
-        self.winnings_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar_winnings.pack(side=tk.RIGHT, fill=tk.Y)
+        self.winnings_view = PagedTreeview(results_frame, columns, self.runner, widths=150, spinner=self.spinner)
+        self.winnings_view.pack(fill=tk.BOTH, expand=True)
         
     def create_tracks_stats_tab(self):
         """Create tab for browsing track statistics"""
@@ -214,6 +221,10 @@ class GuestGUI:
         search_frame = tk.Frame(tracks_frame, bg="#34495E")
         search_frame.pack(pady=20)
         
+        # Optional month range; leave both empty for totals over every race
+        self.track_from_var, self.track_to_var = self.create_month_range(search_frame)
+        self.track_archived_var = self.create_archived_check(search_frame)
+        
         tk.Button(search_frame, text="Show Track Statistics", command=self.search_track_stats,
                  bg="#3498DB", fg="white", font=("Arial", 12, "bold")).pack()
         
@@ -221,177 +232,220 @@ class GuestGUI:
         results_frame = tk.Frame(tracks_frame, bg="#34495E")
         results_frame.pack(fill=tk.BOTH, expand=True, pady=20)
         
-        # Treeview for results
-        tree_frame = tk.Frame(results_frame, bg="#34495E")
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
+        # Paged Treeview: rows are fetched a page at a time as the user scrolls
         columns = ("Track Name", "Location", "Length", "Number of Races", "Total Horses")
-        self.tracks_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
-        
-        for col in columns:
-            self.tracks_tree.heading(col, text=col)
-            self.tracks_tree.column(col, width=120)
+        self.tracks_view = PagedTreeview(results_frame, columns, self.runner, widths=120, spinner=self.spinner)
+        self.tracks_view.pack(fill=tk.BOTH, expand=True)
         
-        scrollbar_tracks = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tracks_tree.yview)
-        self.tracks_tree.configure(yscrollcommand=scrollbar_tracks.set)
+    def create_month_range(self, parent):
+        """Add From/To (YYYY-MM) entries to parent and return their StringVars"""
+        input_frame = tk.Frame(parent, bg="#34495E")
+        input_frame.pack(pady=10)
         
-        self.tracks_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar_tracks.pack(side=tk.RIGHT, fill=tk.Y)
+        tk.Label(input_frame, text="From (YYYY-MM):", bg="#34495E", fg="white", font=("Arial", 12)).pack(side=tk.LEFT)
+        from_var = tk.StringVar()
+        tk.Entry(input_frame, textvariable=from_var, font=("Arial", 12), width=10).pack(side=tk.LEFT, padx=10)
         
-    def search_horses_by_owner(self):
-        """Search horses by owner last name"""
+        tk.Label(input_frame, text="To (YYYY-MM):", bg="#34495E", fg="white", font=("Arial", 12)).pack(side=tk.LEFT)
+        to_var = tk.StringVar()
+        tk.Entry(input_frame, textvariable=to_var, font=("Arial", 12), width=10).pack(side=tk.LEFT, padx=10)
+        return from_var, to_var
+    
+    def create_archived_check(self, parent):
+        """Add an "Include archived races" box to parent and return its BooleanVar
+        
+        Reports count live races only; races moved out by archiver.py are
+        read from the history views on request, which is slower.
+        """
+        archived_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(parent, text="Include archived races", variable=archived_var,
+                       bg="#34495E", fg="white", selectcolor="#2C3E50",
+                       font=("Arial", 12)).pack(pady=(0, 10))
+        return archived_var
+    
+    def read_month_range(self, from_var, to_var):
+        """(first, last) month entered in a From/To pair, None if both are empty
+        
+        Warns the user and raises ValueError if the range is not valid.
+        """
+        month_from = from_var.get().strip()
+        month_to = to_var.get().strip()
+        if not (month_from or month_to):
+            return None
         try:
-            owner_lname = self.owner_lname_var.get().strip()
+            first = datetime.strptime(month_from or "1900-01", "%Y-%m").date()
+            last = datetime.strptime(month_to or "9999-12", "%Y-%m").date()
+        except ValueError:
+            messagebox.showwarning("Warning", "Please enter months as YYYY-MM")
+            raise
+        if first > last:
+            messagebox.showwarning("Warning", "The first month must not be after the last month")
+            raise ValueError("first month after last month")
+        return first, last
+    
+    def schedule_horse_search(self):
+        """Restart the debounce timer for search-as-you-type"""
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(DEBOUNCE_MS, lambda: self.search_horses_by_owner(typed=True))
+    
+    def search_horses_by_owner(self, typed=False):
+        """Search horses by owner last name or horse name
+
+        typed searches come from the debounce timer: they skip the pop-ups
+        and report in the status line instead.
+        """
+        self._search_job = None
+        try:
+            text = self.owner_lname_var.get().strip()
+            kind = self.search_kind_var.get()
+            label = "owner with last name" if kind == 'owner' else "horse name"
             
-            if not owner_lname:
-                messagebox.showwarning("Warning", "Please enter an owner last name")
+            if not text:
+                if typed:
+                    self.horses_view.clear()
+                    self.horses_status.config(text="")
+                else:
+                    messagebox.showwarning("Warning", "Please enter an owner last name or horse name")
                 return
             
-            # Clear existing results
-            for item in self.horses_tree.get_children():
-                self.horses_tree.delete(item)
+            def show_count(shown):
+                if shown:
+                    self.horses_status.config(text="")
+                elif typed:
+                    self.horses_status.config(text=f"No horses found for {label} '{text}'")
+                else:
+                    messagebox.showinfo("No Results", f"No horses found for {label} '{text}'")
             
-            query = """
-                SELECT DISTINCT h.horseName, h.age, h.gender, 
-                       CONCAT(t.fname, ' ', t.lname) as trainer_name
-                FROM Horse h
-                JOIN Owns o ON h.horseId = o.horseId
-                JOIN Owner owner ON o.ownerId = owner.ownerId
-                LEFT JOIN Trainer t ON h.stableId = t.stableId
-                WHERE owner.lname LIKE %s
-                ORDER BY h.horseName
-            """
+            def show(found):
+                if found is None:
+                    self.horses_view.clear()
+                    show_count(0)
+                    return
+                query, params = found
+                self.horses_view.load(self.db_manager, query, params, format_row=lambda row: (
+                    row['horseName'],
+                    row['age'],
+                    row['gender'],
+                    row['trainer_name'] or 'No Trainer'
+                ), on_loaded=show_count, on_error=failed)
             
-            results = self.db_manager.execute_query(query, (f"%{owner_lname}%",))
+            def failed(e):
+                messagebox.showerror("Error", f"Failed to search horses: {e}")
             
-            if results:
-                for row in results:
-                    self.horses_tree.insert("", tk.END, values=(
-                        row['horseName'],
-                        row['age'],
-                        row['gender'],
-                        row['trainer_name'] or 'No Trainer'
-                    ))
-            else:
-                messagebox.showinfo("No Results", f"No horses found for owner with last name '{owner_lname}'")
+            # Resolving the names may load the index, so it runs in the background too
+            self.runner.submit(self.name_search.horses_query, kind, text,
+                               on_success=show, on_error=failed, key='horse_search', spinner=self.spinner)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to search horses: {e}")
     
     def search_winning_trainers(self):
-        """Search trainers who have trained first place winners"""
+        """Search trainers who have trained first place winners, optionally in a range of months"""
         try:
-            # Clear existing results
-            for item in self.winners_tree.get_children():
-                self.winners_tree.delete(item)
-            
-            query = """
-                SELECT DISTINCT CONCAT(t.fname, ' ', t.lname) as trainer_name,
-                       h.horseName as horse_name,
-                       r.raceName,
-                       tr.trackName,
-                       r.raceDate,
-                       rr.prize
-                FROM Trainer t
-                JOIN Horse h ON h.stableId = t.stableId
-                JOIN RaceResults rr ON h.horseId = rr.horseId AND rr.results = 'first'
-                JOIN Race r ON rr.raceId = r.raceId
-                JOIN Track tr ON r.trackName = tr.trackName
-                ORDER BY r.raceDate DESC
-            """
+            try:
+                months = self.read_month_range(self.winners_from_var, self.winners_to_var)
+            except ValueError:
+                return
+            archived = self.winners_archived_var.get()
+            if months:
+                query = (report_queries.WINNING_TRAINERS_HISTORY_RANGE if archived
+                         else report_queries.WINNING_TRAINERS_RANGE)
+                params = report_queries.date_range_params(*months)
+            else:
+                query = report_queries.WINNING_TRAINERS_HISTORY if archived else report_queries.WINNING_TRAINERS
+                params = ()
             
-            results = self.db_manager.execute_query(query)
+            def show_count(shown):
+                if not shown:
+                    messagebox.showinfo("No Results", "No trainers found with first place wins")
             
-            if results:
-                for row in results:
-                    self.winners_tree.insert("", tk.END, values=(
-                        row['trainer_name'],
-                        row['horse_name'],
-                        row['raceName'],
-                        row['trackName'],
-                        row['raceDate'],
-                        f"${row['prize']:,.2f}" if row['prize'] else "$0.00"
-                    ))
-            else:
-                messagebox.showinfo("No Results", "No trainers found with first place wins")
+            self.winners_view.load(self.db_manager, query, params, format_row=lambda row: (
+                row['trainer_name'],
+                row['horse_name'],
+                row['raceName'],
+                row['trackName'],
+                row['raceDate'],
+                f"${row['prize']:,.2f}" if row['prize'] else "$0.00"
+            ), on_loaded=show_count,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to search winning trainers: {e}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to search winning trainers: {e}")
     
     def search_trainer_winnings(self):
-        """Search trainers sorted by total winnings"""
+        """Search trainers sorted by total winnings over live (or all) races, optionally in a range of months"""
         try:
-            # Clear existing results
-            for item in self.winnings_tree.get_children():
-                self.winnings_tree.delete(item)
-            
-            query = """
-                SELECT CONCAT(t.fname, ' ', t.lname) as trainer_name,
-                       IFNULL(SUM(rr.prize), 0) as total_winnings,
-                       COUNT(CASE WHEN rr.results = 'first' THEN 1 END) as num_wins,
-                       s.stableName
-                FROM Trainer t
-                LEFT JOIN Horse h ON h.stableId = t.stableId
-                LEFT JOIN RaceResults rr ON h.horseId = rr.horseId
-                LEFT JOIN Stable s ON t.stableId = s.stableId
-                GROUP BY t.trainerId, t.fname, t.lname, s.stableName
-                ORDER BY total_winnings DESC
-            """
+            try:
+                months = self.read_month_range(self.winnings_from_var, self.winnings_to_var)
+            except ValueError:
+                return
+            archived = self.winnings_archived_var.get()
+            if months:
+                query = (report_queries.TRAINER_WINNINGS_HISTORY_RANGE if archived
+                         else report_queries.TRAINER_WINNINGS_RANGE)
+                params = report_queries.month_days(*months)
+            else:
+                query = report_queries.TRAINER_WINNINGS_HISTORY if archived else report_queries.TRAINER_WINNINGS
+                params = ()
             
-            results = self.db_manager.execute_query(query)
+            def show_count(shown):
+                if not shown:
+                    messagebox.showinfo("No Results", "No trainers found")
             
-            if results:
-                for row in results:
-                    self.winnings_tree.insert("", tk.END, values=(
-                        row['trainer_name'],
-                        f"${row['total_winnings']:,.2f}",
-                        row['num_wins'],
-                        row['stableName']
-                    ))
-            else:
-                messagebox.showinfo("No Results", "No trainers found")
+            self.winnings_view.load(self.db_manager, query, params, format_row=lambda row: (
+                row['trainer_name'],
+                f"${row['total_winnings']:,.2f}",
+                row['num_wins'],
+                row['stableName']
+            ), on_loaded=show_count,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to search trainer winnings: {e}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to search trainer winnings: {e}")
     
     def search_track_stats(self):
-        """Search track statistics"""
+        """Search track statistics over live (or all) races, optionally in a range of months"""
         try:
-            # Clear existing results
-            for item in self.tracks_tree.get_children():
-                self.tracks_tree.delete(item)
-            
-            query = """
-                SELECT tr.trackName,
-                       tr.location,
-                       tr.length,
-                       COUNT(DISTINCT r.raceId) as num_races,
-                       COUNT(DISTINCT rr.horseId) as total_horses
-                FROM Track tr
-                LEFT JOIN Race r ON tr.trackName = r.trackName
-                LEFT JOIN RaceResults rr ON r.raceId = rr.raceId
-                GROUP BY tr.trackName, tr.location, tr.length
-                ORDER BY tr.trackName
-            """
+            try:
+                months = self.read_month_range(self.track_from_var, self.track_to_var)
+            except ValueError:
+                return
+            archived = self.track_archived_var.get()
+            if months and archived:
+                query = report_queries.TRACK_STATS_HISTORY_RANGE
+                params = report_queries.month_days(*months)
+            elif months:
+                query = report_queries.TRACK_STATS_RANGE
+                params = report_queries.track_stats_range_params(*months)
+            else:
+                query = report_queries.TRACK_STATS_HISTORY if archived else report_queries.TRACK_STATS
+                params = ()
             
-            results = self.db_manager.execute_query(query)
+            def show_count(shown):
+                if not shown:
+                    messagebox.showinfo("No Results", "No tracks found")
             
-            if results:
-                for row in results:
-                    self.tracks_tree.insert("", tk.END, values=(
-                        row['trackName'],
-                        row['location'],
-                        f"{row['length']} miles" if row['length'] else "N/A",
-                        row['num_races'],
-                        row['total_horses']
-                    ))
-            else:
-                messagebox.showinfo("No Results", "No tracks found")
+            self.tracks_view.load(self.db_manager, query, params, format_row=lambda row: (
+                row['trackName'],
+                row['location'],
+                f"{row['length']} miles" if row['length'] else "N/A",
+                row['num_races'],
+                row['total_horses']
+            ), on_loaded=show_count,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to search track statistics: {e}"))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to search track statistics: {e}")
     
     def back_to_main(self):
         """Return to main menu"""
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+            self._search_job = None
+        # Drop searches still running so their results never reach destroyed widgets
+        self.runner.cancel_all()
+        if self._owns_name_search:
+            self.name_search.close()
         self.root.destroy()
         self.back_callback()
\ No newline at end of file
@@ -8,6 +8,8 @@ from tkinter import ttk, messagebox
 import database
 from admin_gui import AdminGUI
 from guest_gui import GuestGUI
+from name_search import NameSearch
+from task_runner import TaskRunner, Spinner
 
 class MainApplication:
     def __init__(self, root):
@@ -19,6 +21,12 @@ class MainApplication:
         # Store database manager reference
         self.db_manager = database.db_manager
         
+        # Database calls run in the background and report back on the main loop
+        self.runner = TaskRunner(root)
+        
+        # Name indexes for the guest search, kept across guest sessions
+        self.name_search = NameSearch(self.db_manager)
+        
         # Create main interface
         self.create_main_interface()
         
@@ -114,6 +122,9 @@ class MainApplication:
         )
         self.status_label.pack()
         
+        self.spinner = Spinner(self.status_frame, text="Connecting", font=("Arial", 9), bg="#2C3E50", fg="#BDC3C7")
+        self.spinner.pack()
+        
         # Test connection button
         test_button = tk.Button(
             self.status_frame,
@@ -127,12 +138,22 @@ class MainApplication:
         
     def test_connection(self):
         """Test database connection"""
-        if self.db_manager.test_connection():
-            self.status_label.config(text="Database connection: Connected", fg="#27AE60")
-            messagebox.showinfo("Success", "Database connection successful!")
-        else:
-            self.status_label.config(text="Database connection: Failed", fg="#E74C3C")
-            messagebox.showerror("Error", "Failed to connect to database. Please check MySQL server and configuration.")
+        def tested(connected):
+            if connected:
+                self.status_label.config(text="Database connection: Connected", fg="#27AE60")
+                messagebox.showinfo("Success", "Database connection successful!")
+            else:
+                self.status_label.config(text="Database connection: Failed", fg="#E74C3C")
+                messagebox.showerror("Error", "Failed to connect to database. Please check MySQL server and configuration.")
+        
+        self.status_label.config(text="Database connection: Testing...", fg="#F39C12")
+        self.runner.submit(
+            self.db_manager.test_connection,
+            on_success=tested,
+            on_error=lambda e: tested(False),
+            key='test_connection',
+            spinner=self.spinner
+        )
     
     def setup_database(self):
         """Setup the database with schema and sample data"""
@@ -141,15 +162,26 @@ class MainApplication:
             messagebox.showerror("Error", "Cannot connect to database. Please ensure MySQL server is running.")
             return
         
-        # Since the "Horses" database already exists according to MCP config,
-        # we'll just run the schema and data setup
+        # An existing database is upgraded in place; reloading it wipes all data
         try:
-            success = self.db_manager.setup_database()
-            if success:
-                messagebox.showinfo("Success", "Database setup completed successfully!")
-                self.status_label.config(text="Database connection: Connected", fg="#27AE60")
+            reset = False
+            upgrade = self.db_manager.is_initialized()
+            if upgrade:
+                if not messagebox.askyesno("Database Exists",
+                                           "The database is already set up.\n\n"
+                                           "Apply pending schema migrations and keep all existing data?"):
+                    if not messagebox.askyesno("Reset Database",
+                                               "Drop every table and reload the sample data?\n\n"
+                                               "ALL EXISTING DATA WILL BE LOST."):
+                        return
+                    reset = True
+                    upgrade = False
+            applied = self.db_manager.setup_database(reset=reset)
+            if upgrade:
+                messagebox.showinfo("Success", f"Database is up to date ({len(applied)} migration(s) applied).")
             else:
-                messagebox.showerror("Error", "Failed to setup database.")
+                messagebox.showinfo("Success", "Database setup completed successfully!")
+            self.status_label.config(text="Database connection: Connected", fg="#27AE60")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Database setup failed: {e}")
@@ -158,13 +190,13 @@ class MainApplication:
         """Handle admin login"""
         self.root.withdraw()  # Hide main window
         admin_window = tk.Toplevel()
-        admin_gui = AdminGUI(admin_window, self.db_manager, self.back_to_main)
+        admin_gui = AdminGUI(admin_window, self.db_manager, self.back_to_main, self.runner)
         
     def guest_login(self):
         """Handle guest login"""
         self.root.withdraw()  # Hide main window
         guest_window = tk.Toplevel()
-        guest_gui = GuestGUI(guest_window, self.db_manager, self.back_to_main)
+        guest_gui = GuestGUI(guest_window, self.db_manager, self.back_to_main, self.runner, self.name_search)
         
     def back_to_main(self):
         """Return to main window"""
@@ -175,6 +207,7 @@ def main():
     root = tk.Tk()
     app = MainApplication(root)
     root.mainloop()
+    app.runner.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
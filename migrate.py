@@ -0,0 +1,414 @@
+"""
+Schema migrations for Horse Racing Database System
+Applies the numbered scripts in migrations/ in order and records each one in
+the schema_version table, so live databases are upgraded in place instead of
+being reloaded from database_schema.sql
+
+Migrations are either SQL scripts (NNN_name.sql) or Python modules
+(NNN_name.py) defining upgrade(cursor). They run online by default: every
+ALTER TABLE without an explicit LOCK clause gets LOCK=NONE, so MySQL refuses
+a change that would block reads or writes instead of silently locking the
+table, and metadata lock waits are capped by lock_wait_timeout. A migration
+that really needs a blocking rebuild says so with a "-- migrate: offline"
+line (or OFFLINE = True in a Python migration).
+
+A migration is recorded only once all of it succeeded, so a failed one is
+simply run again. Each DDL statement whose effect is already in the schema
+(an index, column, primary key or table that exists, or one dropped that is
+gone) is skipped on the rerun, and stored programs are dropped and
+recreated, so the rerun picks up where the failed run stopped.
+
+Usage:
+    python migrate.py              apply pending migrations
+    python migrate.py --dry-run    show what would run without touching the database
+    python migrate.py --status     list applied and pending migrations
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+import time
+import mysql.connector
+from mysql.connector import Error
+from sql_script import iter_statements, drop_statement
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# 001_report_indexes.sql -> version 1, "report_indexes"
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.(sql|py)$")
+
+OFFLINE_MARKER = re.compile(r"^\s*--\s*migrate:\s*offline\b", re.IGNORECASE | re.MULTILINE)
+ALTER_TABLE = re.compile(r"^\s*ALTER\s+TABLE\b", re.IGNORECASE)
+LOCK_CLAUSE = re.compile(r"\bLOCK\s*=", re.IGNORECASE)
+
+# DDL that is already done when the schema shows its effect
+ALTER_TABLE_NAME = re.compile(r"^\s*ALTER\s+TABLE\s+`?(\w+)`?\s+(.*)$", re.IGNORECASE | re.DOTALL)
+PARTITION_OPTIONS = re.compile(r"\b(?:PARTITION\s+BY|REMOVE\s+PARTITIONING)\b.*$", re.IGNORECASE | re.DOTALL)
+CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(?!IF\s+NOT\s+EXISTS)`?(\w+)`?", re.IGNORECASE)
+CREATE_INDEX = re.compile(r"^\s*CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?",
+                          re.IGNORECASE)
+ADD_INDEX = re.compile(r"^ADD\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?(?:INDEX|KEY)\s+`?(\w+)`?", re.IGNORECASE)
+ADD_PRIMARY_KEY = re.compile(r"^ADD\s+PRIMARY\s+KEY\s*\(([^)]*)\)", re.IGNORECASE)
+ADD_COLUMN = re.compile(r"^ADD\s+COLUMN\s+`?(\w+)`?", re.IGNORECASE)
+DROP_INDEX = re.compile(r"^DROP\s+(?:INDEX|KEY)\s+`?(\w+)`?", re.IGNORECASE)
+DROP_COLUMN = re.compile(r"^DROP\s+COLUMN\s+`?(\w+)`?", re.IGNORECASE)
+
+# Only one migration run at a time per server
+MIGRATION_LOCK = 'Horses.schema_migration'
+
+# Seconds a DDL statement may wait for a metadata lock before giving up,
+# so a long report query never leaves writers queued behind the migration
+LOCK_WAIT_TIMEOUT = 5
+
+VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        appliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        checksum CHAR(64),
+        durationMs INT,
+        PRIMARY KEY (version)
+    )
+"""
+
+def split_clauses(text):
+    """Split an ALTER TABLE body at the commas outside parentheses and quotes"""
+    clauses, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            clauses.append(text[start:i].strip())
+            start = i + 1
+    clauses.append(text[start:].strip())
+    return [clause for clause in clauses if clause]
+
+def alter_checks(statement):
+    """(table, [(kind, name, wanted)]) for the clauses of an ALTER TABLE whose effect can be looked up
+
+    kind is 'index', 'column' or 'primary' (name then being the key's
+    columns), wanted whether it exists once the statement has run. An index
+    both dropped and added is being rebuilt, which the schema can't tell
+    apart from before, so it is left out. None for other statements.
+    """
+    match = ALTER_TABLE_NAME.match(statement)
+    if not match:
+        return None
+    table, body = match.groups()
+    checks = []
+    for clause in split_clauses(PARTITION_OPTIONS.sub('', body)):
+        for pattern, kind, wanted in ((ADD_INDEX, 'index', True), (DROP_INDEX, 'index', False),
+                                      (ADD_COLUMN, 'column', True), (DROP_COLUMN, 'column', False)):
+            found = pattern.match(clause)
+            if found:
+                checks.append((kind, found.group(1), wanted))
+                break
+        else:
+            found = ADD_PRIMARY_KEY.match(clause)
+            if found:
+                columns = tuple(column.strip(' `') for column in found.group(1).split(','))
+                checks.append(('primary', columns, True))
+    rebuilt = ({name for kind, name, wanted in checks if kind == 'index' and wanted}
+               & {name for kind, name, wanted in checks if kind == 'index' and not wanted})
+    return table, [check for check in checks if not (check[0] == 'index' and check[1] in rebuilt)]
+
+def index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchall()[0][0] > 0
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchall()[0][0] > 0
+
+def primary_key(cursor, table):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY'
+        ORDER BY SEQ_IN_INDEX
+    """, (table,))
+    return tuple(row[0] for row in cursor.fetchall())
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchall()[0][0] > 0
+
+def satisfied(cursor, statement):
+    """True if a DDL statement already took effect, e.g. in a run that failed later on
+
+    An ALTER TABLE is atomic, so one clause that shows in the schema means
+    the whole statement ran; it counts as done when every clause that can
+    be checked is.
+    """
+    match = CREATE_TABLE.match(statement)
+    if match:
+        return table_exists(cursor, match.group(1))
+    match = CREATE_INDEX.match(statement)
+    if match:
+        return index_exists(cursor, match.group(2), match.group(1))
+    checks = alter_checks(statement)
+    if not checks or not checks[1]:
+        return False
+    table = checks[0]
+    for kind, name, wanted in checks[1]:
+        if kind == 'index':
+            done = index_exists(cursor, table, name) == wanted
+        elif kind == 'column':
+            done = column_exists(cursor, table, name) == wanted
+        else:
+            done = primary_key(cursor, table) == name
+        if not done:
+            return False
+    return True
+
+def execute_once(cursor, statement, params=None):
+    """Run a DDL statement unless it already took effect; for Python migrations"""
+    if satisfied(cursor, statement):
+        print(f"  already applied, skipped: {' '.join(statement.split())[:80]}")
+        return False
+    cursor.execute(statement, params)
+    if cursor.with_rows:
+        cursor.fetchall()
+    return True
+
+class MigrationError(Exception):
+    """Raised when migrations cannot be applied safely"""
+    pass
+
+class Migration:
+    """One numbered migration file"""
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.kind = os.path.splitext(path)[1][1:]
+
+    @property
+    def label(self):
+        return f"{self.version:03d}_{self.name}"
+
+    def checksum(self):
+        with open(self.path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def is_offline(self):
+        if self.kind == 'py':
+            return bool(getattr(self.load(), 'OFFLINE', False))
+        with open(self.path, 'r') as f:
+            return bool(OFFLINE_MARKER.search(f.read()))
+
+    def statements(self, online=True):
+        """Yield the SQL statements of a .sql migration, made online-safe if requested"""
+        for statement in iter_statements(self.path):
+            if online and ALTER_TABLE.match(statement) and not LOCK_CLAUSE.search(statement):
+                statement = f"{statement},\n    LOCK=NONE"
+            yield statement
+
+    def load(self):
+        """Import a .py migration module"""
+        spec = importlib.util.spec_from_file_location(f"migration_{self.label}", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def describe(self, online=True):
+        """Lines shown for this migration in a dry run"""
+        if self.kind == 'py':
+            doc = (self.load().__doc__ or '').strip()
+            return [f"(python) {line}" for line in doc.splitlines()] or ["(python) upgrade(cursor)"]
+        return [statement for statement in self.statements(online)]
+
+    def apply(self, cursor, online=True):
+        if self.kind == 'py':
+            self.load().upgrade(cursor)
+            return
+        for statement in self.statements(online):
+            # Stored programs survive a schema reload, so they are replaced rather than duplicated
+            drop = drop_statement(statement)
+            if drop:
+                cursor.execute(drop)
+            execute_once(cursor, statement)
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Return every migration in directory, oldest first"""
+    migrations = []
+    seen = {}
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"Migrations {seen[version]} and {filename} share version {version}")
+        seen[version] = filename
+        migrations.append(Migration(version, match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda migration: migration.version)
+    return migrations
+
+def ensure_version_table(cursor):
+    """Create schema_version, or add columns missing from an older copy of it"""
+    cursor.execute(VERSION_TABLE)
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_version'
+    """)
+    columns = {row[0] for row in cursor.fetchall()}
+    if 'checksum' not in columns:
+        cursor.execute("ALTER TABLE schema_version ADD COLUMN checksum CHAR(64), ADD COLUMN durationMs INT")
+
+def applied_migrations(cursor):
+    """Return {version: (name, checksum, appliedAt)} for applied migrations"""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_version' AND COLUMN_NAME = 'checksum'
+    """)
+    if not cursor.fetchall():
+        # No table yet (or a pre-checksum one): fall back to what is there
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_version'
+        """)
+        if not cursor.fetchone()[0]:
+            return {}
+        cursor.execute("SELECT version, name, NULL, appliedAt FROM schema_version")
+    else:
+        cursor.execute("SELECT version, name, checksum, appliedAt FROM schema_version")
+    return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+def current_version(cursor):
+    """Highest applied migration version, 0 for a fresh schema"""
+    applied = applied_migrations(cursor)
+    return max(applied) if applied else 0
+
+def pending_migrations(cursor, directory=MIGRATIONS_DIR):
+    """Return migrations not yet applied, checking applied ones were not edited afterwards"""
+    applied = applied_migrations(cursor)
+    pending = []
+    for migration in list_migrations(directory):
+        if migration.version not in applied:
+            pending.append(migration)
+            continue
+        checksum = applied[migration.version][1]
+        if checksum and checksum != migration.checksum():
+            print(f"Warning: migration {migration.label} changed after it was applied")
+    return pending
+
+def apply_migrations(connection, directory=MIGRATIONS_DIR, dry_run=False, online=True):
+    """Apply every pending migration in order; returns the versions applied (or that would be)"""
+    cursor = connection.cursor()
+    try:
+        if dry_run:
+            pending = pending_migrations(cursor, directory)
+            for migration in pending:
+                offline = migration.is_offline()
+                print(f"-- {migration.label} ({'offline' if offline else 'online'})")
+                for line in migration.describe(online and not offline):
+                    print(f"{line};" if migration.kind == 'sql' else line)
+            return [migration.version for migration in pending]
+
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (MIGRATION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise MigrationError("Another migration run is in progress")
+        applied = []
+        try:
+            ensure_version_table(cursor)
+            pending = pending_migrations(cursor, directory)
+            cursor.execute("SET SESSION lock_wait_timeout = %s", (LOCK_WAIT_TIMEOUT,))
+            for migration in pending:
+                offline = migration.is_offline()
+                print(f"Applying migration {migration.label}{' (offline)' if offline else ''}...")
+                started = time.perf_counter()
+                # DDL commits implicitly, so the version row is written only after every statement
+                # succeeded; rerunning a failed migration skips the DDL that already took effect
+                migration.apply(cursor, online and not offline)
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, name, checksum, durationMs) VALUES (%s, %s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum(), duration_ms)
+                )
+                connection.commit()
+                print(f"Migration {migration.label} applied in {duration_ms / 1000:.2f}s")
+                applied.append(migration.version)
+        finally:
+            cursor.execute("SET SESSION lock_wait_timeout = DEFAULT")
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+        return applied
+    finally:
+        cursor.close()
+
+def is_initialized(cursor):
+    """True if the base schema is already loaded (so reloading it would wipe data)"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Horse'
+    """)
+    return cursor.fetchone()[0] > 0
+
+def print_status(connection, directory=MIGRATIONS_DIR):
+    """List applied and pending migrations"""
+    cursor = connection.cursor()
+    try:
+        applied = applied_migrations(cursor)
+    finally:
+        cursor.close()
+    for migration in list_migrations(directory):
+        if migration.version in applied:
+            name, checksum, applied_at = applied[migration.version]
+            changed = " (file changed since)" if checksum and checksum != migration.checksum() else ""
+            print(f"[applied {applied_at}] {migration.label}{changed}")
+        else:
+            print(f"[pending] {migration.label}")
+    print(f"Current schema version: {max(applied) if applied else 0}")
+
+def main(argv=None):
+    """Upgrade the Horses database to the latest schema version"""
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the Horses database")
+    parser.add_argument('--dry-run', action='store_true', help="print pending migrations without running them")
+    parser.add_argument('--status', action='store_true', help="list applied and pending migrations")
+    parser.add_argument('--allow-locking', action='store_true',
+                        help="don't force LOCK=NONE on ALTER TABLE statements")
+    args = parser.parse_args(argv)
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        if args.status:
+            print_status(connection)
+            connection.close()
+            return 0
+        applied = apply_migrations(connection, dry_run=args.dry_run, online=not args.allow_locking)
+        connection.close()
+    except (Error, MigrationError) as e:
+        print(f"Migration failed: {e}")
+        return 1
+    if args.dry_run:
+        print(f"-- {len(applied)} pending migration(s); nothing was changed")
+    else:
+        print(f"Applied {len(applied)} migration(s); database is up to date.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
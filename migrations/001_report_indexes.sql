@@ -0,0 +1,37 @@
+-- Covering secondary indexes for the guest report joins and filters
+-- The join indexes (Horse and Trainer by stableId, Race by trackName,
+-- RaceResults by horseId) lead with a foreign key column, so InnoDB drops the
+-- implicit single-column FK index it created for that column and uses the new
+-- one instead. The winners index (RaceResults by results) and the owner
+-- last-name index serve filters and searches, and are added alongside the
+-- existing indexes.
+-- Built in place without blocking reads or writes.
+
+-- Trainer reports join horses to trainers through the stable
+ALTER TABLE Horse
+    ADD INDEX idx_horse_stable (stableId, horseName),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE Trainer
+    ADD INDEX idx_trainer_stable (stableId, lname, fname),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Track statistics group races by track
+ALTER TABLE Race
+    ADD INDEX idx_race_track_date (trackName, raceDate),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Per-horse results with finishing position and prize, for winnings totals
+ALTER TABLE RaceResults
+    ADD INDEX idx_results_horse (horseId, results, prize),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Winners only: rr.results = 'first'
+ALTER TABLE RaceResults
+    ADD INDEX idx_results_position (results, horseId),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Owner search by last name; ownerId rides along as the primary key
+ALTER TABLE Owner
+    ADD INDEX idx_owner_lname (lname, fname),
+    ALGORITHM=INPLACE, LOCK=NONE;
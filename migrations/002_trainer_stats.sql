@@ -0,0 +1,141 @@
+-- Materialized trainer winnings for the Trainer Winnings report
+-- A trainer is credited with every result of every horse in their stable,
+-- as in the original Trainer -> Horse -> RaceResults aggregate. Triggers keep
+-- the totals current; CALL RebuildTrainerStats() (or stats_maintenance.py
+-- --rebuild) recomputes them from scratch.
+
+CREATE TABLE trainer_stats (
+    trainerId VARCHAR(15) NOT NULL,
+    stableId VARCHAR(30),
+    totalPrize DECIMAL(14,2) NOT NULL DEFAULT 0,
+    numWins INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (trainerId),
+    INDEX idx_stats_stable (stableId),
+    -- Report order: richest first, read backwards a page at a time
+    INDEX idx_stats_rank (totalPrize, trainerId)
+);
+
+CREATE PROCEDURE RebuildTrainerStats()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM trainer_stats;
+
+    INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+    SELECT t.trainerId, t.stableId,
+           IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+           COUNT(CASE WHEN rr.results = 'first' THEN 1 END)
+    FROM Trainer t
+    LEFT JOIN Horse h ON h.stableId = t.stableId
+    LEFT JOIN RaceResults rr ON rr.horseId = h.horseId
+    GROUP BY t.trainerId, t.stableId;
+
+    COMMIT;
+END;
+
+-- A new result credits every trainer of the horse's stable
+CREATE TRIGGER results_insert_stats
+    AFTER INSERT ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize + IFNULL(ROUND(NEW.prize, 2), 0),
+        numWins = numWins + IF(NEW.results = 'first', 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = NEW.horseId);
+END;
+
+CREATE TRIGGER results_delete_stats
+    AFTER DELETE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize - IFNULL(ROUND(OLD.prize, 2), 0),
+        numWins = numWins - IF(OLD.results = 'first', 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = OLD.horseId);
+END;
+
+CREATE TRIGGER results_update_stats
+    AFTER UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize - IFNULL(ROUND(OLD.prize, 2), 0),
+        numWins = numWins - IF(OLD.results = 'first', 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = OLD.horseId);
+
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize + IFNULL(ROUND(NEW.prize, 2), 0),
+        numWins = numWins + IF(NEW.results = 'first', 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = NEW.horseId);
+END;
+
+-- Moving a horse takes its whole record from the old stable's trainers to the new one's
+CREATE TRIGGER horse_move_stats
+    AFTER UPDATE ON Horse
+    FOR EACH ROW
+BEGIN
+    DECLARE horse_prize DECIMAL(14,2);
+    DECLARE horse_wins INT;
+
+    IF NOT (OLD.stableId <=> NEW.stableId) THEN
+        SELECT IFNULL(SUM(ROUND(prize, 2)), 0), COUNT(CASE WHEN results = 'first' THEN 1 END)
+        INTO horse_prize, horse_wins
+        FROM RaceResults
+        WHERE horseId = NEW.horseId;
+
+        UPDATE trainer_stats
+        SET totalPrize = totalPrize - horse_prize, numWins = numWins - horse_wins
+        WHERE stableId = OLD.stableId;
+
+        UPDATE trainer_stats
+        SET totalPrize = totalPrize + horse_prize, numWins = numWins + horse_wins
+        WHERE stableId = NEW.stableId;
+    END IF;
+END;
+
+-- New trainers start with their stable's current record
+CREATE TRIGGER trainer_insert_stats
+    AFTER INSERT ON Trainer
+    FOR EACH ROW
+BEGIN
+    INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+    SELECT NEW.trainerId, NEW.stableId,
+           IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+           COUNT(CASE WHEN rr.results = 'first' THEN 1 END)
+    FROM Horse h
+    JOIN RaceResults rr ON rr.horseId = h.horseId
+    WHERE h.stableId = NEW.stableId;
+END;
+
+CREATE TRIGGER trainer_update_stats
+    AFTER UPDATE ON Trainer
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.stableId <=> NEW.stableId) OR OLD.trainerId <> NEW.trainerId THEN
+        DELETE FROM trainer_stats WHERE trainerId = OLD.trainerId;
+
+        INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+        SELECT NEW.trainerId, NEW.stableId,
+               IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+               COUNT(CASE WHEN rr.results = 'first' THEN 1 END)
+        FROM Horse h
+        JOIN RaceResults rr ON rr.horseId = h.horseId
+        WHERE h.stableId = NEW.stableId;
+    END IF;
+END;
+
+CREATE TRIGGER trainer_delete_stats
+    AFTER DELETE ON Trainer
+    FOR EACH ROW
+BEGIN
+    DELETE FROM trainer_stats WHERE trainerId = OLD.trainerId;
+END;
+
+-- Fill the table from existing data
+CALL RebuildTrainerStats();
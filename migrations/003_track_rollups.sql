@@ -0,0 +1,234 @@
+-- Incremental track statistics rollups for the Track Statistics report
+--   track_stats          all-time races and distinct horses per track
+--   track_daily          races and results per track and race day
+--   track_horse_monthly  results per track, month and horse, so distinct
+--                        horses over a month range never touch RaceResults
+-- Races without a date are bucketed on 1000-01-01, outside any real range.
+-- Triggers on Race and RaceResults keep the rollups current;
+-- CALL RebuildTrackStats() (or stats_maintenance.py --rebuild) recomputes them.
+
+CREATE TABLE track_stats (
+    trackName VARCHAR(30) NOT NULL,
+    numRaces INT NOT NULL DEFAULT 0,
+    numHorses INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (trackName)
+);
+
+CREATE TABLE track_daily (
+    trackName VARCHAR(30) NOT NULL,
+    raceDay DATE NOT NULL,
+    numRaces INT NOT NULL DEFAULT 0,
+    numResults INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (trackName, raceDay)
+);
+
+CREATE TABLE track_horse_monthly (
+    trackName VARCHAR(30) NOT NULL,
+    month DATE NOT NULL,
+    horseId VARCHAR(15) NOT NULL,
+    numResults INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (trackName, month, horseId),
+    -- "has this horse run here before?" when a result is added or removed
+    INDEX idx_thm_horse (trackName, horseId)
+);
+
+-- Bucket keys for a race date
+CREATE FUNCTION rollup_day(race_date DATE) RETURNS DATE DETERMINISTIC
+    RETURN IFNULL(race_date, DATE '1000-01-01');
+
+CREATE FUNCTION rollup_month(race_date DATE) RETURNS DATE DETERMINISTIC
+    RETURN rollup_day(race_date) - INTERVAL (DAYOFMONTH(rollup_day(race_date)) - 1) DAY;
+
+-- Recompute one track's rollups; used by the triggers for rare edits that
+-- move races or results between tracks or dates
+CREATE PROCEDURE RefreshTrackStats(IN track VARCHAR(30))
+BEGIN
+    DELETE FROM track_daily WHERE trackName = track;
+    DELETE FROM track_horse_monthly WHERE trackName = track;
+    DELETE FROM track_stats WHERE trackName = track;
+
+    INSERT INTO track_daily (trackName, raceDay, numRaces, numResults)
+    SELECT r.trackName, rollup_day(r.raceDate), COUNT(DISTINCT r.raceId), COUNT(rr.horseId)
+    FROM Race r
+    LEFT JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName = track
+    GROUP BY r.trackName, rollup_day(r.raceDate);
+
+    INSERT INTO track_horse_monthly (trackName, month, horseId, numResults)
+    SELECT r.trackName, rollup_month(r.raceDate), rr.horseId, COUNT(*)
+    FROM Race r
+    JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName = track
+    GROUP BY r.trackName, rollup_month(r.raceDate), rr.horseId;
+
+    INSERT INTO track_stats (trackName, numRaces, numHorses)
+    SELECT track,
+           (SELECT COUNT(*) FROM Race WHERE trackName = track),
+           (SELECT COUNT(DISTINCT horseId) FROM track_horse_monthly WHERE trackName = track);
+END;
+
+CREATE PROCEDURE RebuildTrackStats()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM track_daily;
+    DELETE FROM track_horse_monthly;
+    DELETE FROM track_stats;
+
+    INSERT INTO track_daily (trackName, raceDay, numRaces, numResults)
+    SELECT r.trackName, rollup_day(r.raceDate), COUNT(DISTINCT r.raceId), COUNT(rr.horseId)
+    FROM Race r
+    LEFT JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName IS NOT NULL
+    GROUP BY r.trackName, rollup_day(r.raceDate);
+
+    INSERT INTO track_horse_monthly (trackName, month, horseId, numResults)
+    SELECT r.trackName, rollup_month(r.raceDate), rr.horseId, COUNT(*)
+    FROM Race r
+    JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName IS NOT NULL
+    GROUP BY r.trackName, rollup_month(r.raceDate), rr.horseId;
+
+    INSERT INTO track_stats (trackName, numRaces, numHorses)
+    SELECT d.trackName, d.numRaces, IFNULL(h.numHorses, 0)
+    FROM (SELECT trackName, SUM(numRaces) as numRaces FROM track_daily GROUP BY trackName) d
+    LEFT JOIN (SELECT trackName, COUNT(DISTINCT horseId) as numHorses
+               FROM track_horse_monthly GROUP BY trackName) h ON h.trackName = d.trackName;
+
+    COMMIT;
+END;
+
+CREATE TRIGGER race_insert_track_stats
+    AFTER INSERT ON Race
+    FOR EACH ROW
+BEGIN
+    IF NEW.trackName IS NOT NULL THEN
+        INSERT INTO track_stats (trackName, numRaces, numHorses)
+        VALUES (NEW.trackName, 1, 0)
+        ON DUPLICATE KEY UPDATE numRaces = numRaces + 1;
+
+        INSERT INTO track_daily (trackName, raceDay, numRaces, numResults)
+        VALUES (NEW.trackName, rollup_day(NEW.raceDate), 1, 0)
+        ON DUPLICATE KEY UPDATE numRaces = numRaces + 1;
+    END IF;
+END;
+
+CREATE TRIGGER race_delete_track_stats
+    AFTER DELETE ON Race
+    FOR EACH ROW
+BEGIN
+    IF OLD.trackName IS NOT NULL THEN
+        UPDATE track_stats SET numRaces = numRaces - 1 WHERE trackName = OLD.trackName;
+
+        UPDATE track_daily SET numRaces = numRaces - 1
+        WHERE trackName = OLD.trackName AND raceDay = rollup_day(OLD.raceDate);
+
+        DELETE FROM track_daily
+        WHERE trackName = OLD.trackName AND raceDay = rollup_day(OLD.raceDate)
+          AND numRaces <= 0 AND numResults <= 0;
+    END IF;
+END;
+
+CREATE TRIGGER race_update_track_stats
+    AFTER UPDATE ON Race
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.trackName <=> NEW.trackName) OR NOT (OLD.raceDate <=> NEW.raceDate) THEN
+        IF OLD.trackName IS NOT NULL THEN
+            CALL RefreshTrackStats(OLD.trackName);
+        END IF;
+        IF NEW.trackName IS NOT NULL AND NOT (OLD.trackName <=> NEW.trackName) THEN
+            CALL RefreshTrackStats(NEW.trackName);
+        END IF;
+    END IF;
+END;
+
+CREATE TRIGGER results_insert_track_stats
+    AFTER INSERT ON RaceResults
+    FOR EACH ROW
+BEGIN
+    DECLARE race_track VARCHAR(30);
+    DECLARE race_date DATE;
+    DECLARE earlier INT;
+
+    SELECT trackName, raceDate INTO race_track, race_date FROM Race WHERE raceId = NEW.raceId;
+
+    IF race_track IS NOT NULL THEN
+        SELECT COUNT(*) INTO earlier
+        FROM track_horse_monthly
+        WHERE trackName = race_track AND horseId = NEW.horseId;
+
+        INSERT INTO track_daily (trackName, raceDay, numRaces, numResults)
+        VALUES (race_track, rollup_day(race_date), 0, 1)
+        ON DUPLICATE KEY UPDATE numResults = numResults + 1;
+
+        INSERT INTO track_horse_monthly (trackName, month, horseId, numResults)
+        VALUES (race_track, rollup_month(race_date), NEW.horseId, 1)
+        ON DUPLICATE KEY UPDATE numResults = numResults + 1;
+
+        IF earlier = 0 THEN
+            INSERT INTO track_stats (trackName, numRaces, numHorses)
+            VALUES (race_track, 0, 1)
+            ON DUPLICATE KEY UPDATE numHorses = numHorses + 1;
+        END IF;
+    END IF;
+END;
+
+CREATE TRIGGER results_delete_track_stats
+    AFTER DELETE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    DECLARE race_track VARCHAR(30);
+    DECLARE race_date DATE;
+    DECLARE remaining INT;
+
+    SELECT trackName, raceDate INTO race_track, race_date FROM Race WHERE raceId = OLD.raceId;
+
+    IF race_track IS NOT NULL THEN
+        UPDATE track_daily SET numResults = numResults - 1
+        WHERE trackName = race_track AND raceDay = rollup_day(race_date);
+
+        UPDATE track_horse_monthly SET numResults = numResults - 1
+        WHERE trackName = race_track AND month = rollup_month(race_date) AND horseId = OLD.horseId;
+
+        DELETE FROM track_horse_monthly
+        WHERE trackName = race_track AND month = rollup_month(race_date) AND horseId = OLD.horseId
+          AND numResults <= 0;
+
+        SELECT COUNT(*) INTO remaining
+        FROM track_horse_monthly
+        WHERE trackName = race_track AND horseId = OLD.horseId;
+
+        IF remaining = 0 THEN
+            UPDATE track_stats SET numHorses = numHorses - 1 WHERE trackName = race_track;
+        END IF;
+    END IF;
+END;
+
+CREATE TRIGGER results_update_track_stats
+    AFTER UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    DECLARE old_track VARCHAR(30);
+    DECLARE new_track VARCHAR(30);
+
+    IF OLD.raceId <> NEW.raceId OR OLD.horseId <> NEW.horseId THEN
+        SELECT trackName INTO old_track FROM Race WHERE raceId = OLD.raceId;
+        SELECT trackName INTO new_track FROM Race WHERE raceId = NEW.raceId;
+        IF old_track IS NOT NULL THEN
+            CALL RefreshTrackStats(old_track);
+        END IF;
+        IF new_track IS NOT NULL AND NOT (old_track <=> new_track) THEN
+            CALL RefreshTrackStats(new_track);
+        END IF;
+    END IF;
+END;
+
+-- Fill the rollups from existing data
+CALL RebuildTrackStats();
@@ -0,0 +1,8 @@
+-- Horse name lookups for the guest name search
+-- name_search.NameSearch turns a typed substring into the exact horse names
+-- it matches; this index serves the resulting horseName IN (...) seek and the
+-- ORDER BY horseName of the horse list.
+
+ALTER TABLE Horse
+    ADD INDEX idx_horse_name (horseName),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,210 @@
+-- Numeric finishing positions
+-- RaceResults.position holds the finishing place as a TINYINT UNSIGNED
+-- (1 = winner). Reports filter on it instead of comparing the results text.
+-- results stays as a compatibility column: triggers keep the two in step,
+-- so writers that still send 'first', 'second', ... (or '12') keep working
+-- and readers of results see the same text as before.
+
+-- Added last, so TSV loads and scripts that list the old four columns in
+-- table order still line up
+ALTER TABLE RaceResults
+    ADD COLUMN position TINYINT UNSIGNED NULL,
+    DROP INDEX idx_results_horse,
+    ADD INDEX idx_results_horse (horseId, position, prize),
+    DROP INDEX idx_results_position,
+    ADD INDEX idx_results_position (position, horseId),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- 'first' .. 'tenth' or a bare number -> position; anything else -> NULL
+CREATE FUNCTION position_number(position_text VARCHAR(15)) RETURNS TINYINT UNSIGNED DETERMINISTIC
+    RETURN CASE
+        WHEN FIELD(LOWER(TRIM(position_text)), 'first', 'second', 'third', 'fourth', 'fifth',
+                   'sixth', 'seventh', 'eighth', 'ninth', 'tenth') > 0
+            THEN FIELD(LOWER(TRIM(position_text)), 'first', 'second', 'third', 'fourth', 'fifth',
+                       'sixth', 'seventh', 'eighth', 'ninth', 'tenth')
+        WHEN TRIM(position_text) REGEXP '^[0-9]{1,3}$'
+             AND CAST(TRIM(position_text) AS UNSIGNED) BETWEEN 1 AND 255
+            THEN CAST(TRIM(position_text) AS UNSIGNED)
+        ELSE NULL
+    END;
+
+-- position -> the text race_import.position_to_text has always written
+CREATE FUNCTION position_text(place TINYINT UNSIGNED) RETURNS VARCHAR(15) DETERMINISTIC
+    RETURN IFNULL(ELT(place, 'first', 'second', 'third', 'fourth', 'fifth',
+                      'sixth', 'seventh', 'eighth', 'ninth', 'tenth'),
+                  CAST(place AS CHAR));
+
+-- Whichever of the two columns a writer sets, fill in the other
+CREATE TRIGGER results_position_insert
+    BEFORE INSERT ON RaceResults
+    FOR EACH ROW
+BEGIN
+    IF NEW.position IS NOT NULL THEN
+        SET NEW.results = position_text(NEW.position);
+    ELSE
+        SET NEW.position = position_number(NEW.results);
+    END IF;
+END;
+
+CREATE TRIGGER results_position_update
+    BEFORE UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    IF NOT (NEW.position <=> OLD.position) THEN
+        SET NEW.results = position_text(NEW.position);
+    ELSEIF NOT (NEW.results <=> OLD.results) THEN
+        SET NEW.position = position_number(NEW.results);
+    END IF;
+END;
+
+-- The backfill doesn't change winners or prizes, so the trainer_stats
+-- update trigger would only add work; it is recreated below
+DROP TRIGGER IF EXISTS results_update_stats;
+
+-- Backfill in small transactions so no lock is held on the whole table,
+-- walking the primary key a range of about 5000 results at a time so each
+-- row is read once (no index could find the rows still NULL)
+CREATE PROCEDURE BackfillPositions()
+BEGIN
+    DECLARE last_race VARCHAR(15) DEFAULT '';
+    DECLARE next_race VARCHAR(15);
+
+    REPEAT
+        -- Range end: the race of the 5000th result after last_race, NULL near the end of the table
+        SET next_race = (SELECT raceId FROM RaceResults
+                         WHERE raceId > last_race
+                         ORDER BY raceId
+                         LIMIT 1 OFFSET 4999);
+        IF next_race IS NULL THEN
+            UPDATE RaceResults
+            SET position = position_number(results)
+            WHERE raceId > last_race AND position IS NULL;
+        ELSE
+            UPDATE RaceResults
+            SET position = position_number(results)
+            WHERE raceId > last_race AND raceId <= next_race AND position IS NULL;
+        END IF;
+        COMMIT;
+        SET last_race = next_race;
+    UNTIL next_race IS NULL END REPEAT;
+END;
+
+CALL BackfillPositions();
+
+DROP PROCEDURE BackfillPositions;
+
+-- trainer_stats routines from migration 002, now counting wins by position
+CREATE PROCEDURE RebuildTrainerStats()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    DELETE FROM trainer_stats;
+
+    INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+    SELECT t.trainerId, t.stableId,
+           IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+           COUNT(CASE WHEN rr.position = 1 THEN 1 END)
+    FROM Trainer t
+    LEFT JOIN Horse h ON h.stableId = t.stableId
+    LEFT JOIN RaceResults rr ON rr.horseId = h.horseId
+    GROUP BY t.trainerId, t.stableId;
+
+    COMMIT;
+END;
+
+CREATE TRIGGER results_insert_stats
+    AFTER INSERT ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize + IFNULL(ROUND(NEW.prize, 2), 0),
+        numWins = numWins + IF(NEW.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = NEW.horseId);
+END;
+
+CREATE TRIGGER results_delete_stats
+    AFTER DELETE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize - IFNULL(ROUND(OLD.prize, 2), 0),
+        numWins = numWins - IF(OLD.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = OLD.horseId);
+END;
+
+CREATE TRIGGER results_update_stats
+    AFTER UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize - IFNULL(ROUND(OLD.prize, 2), 0),
+        numWins = numWins - IF(OLD.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = OLD.horseId);
+
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize + IFNULL(ROUND(NEW.prize, 2), 0),
+        numWins = numWins + IF(NEW.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = NEW.horseId);
+END;
+
+CREATE TRIGGER horse_move_stats
+    AFTER UPDATE ON Horse
+    FOR EACH ROW
+BEGIN
+    DECLARE horse_prize DECIMAL(14,2);
+    DECLARE horse_wins INT;
+
+    IF NOT (OLD.stableId <=> NEW.stableId) THEN
+        SELECT IFNULL(SUM(ROUND(prize, 2)), 0), COUNT(CASE WHEN position = 1 THEN 1 END)
+        INTO horse_prize, horse_wins
+        FROM RaceResults
+        WHERE horseId = NEW.horseId;
+
+        UPDATE trainer_stats
+        SET totalPrize = totalPrize - horse_prize, numWins = numWins - horse_wins
+        WHERE stableId = OLD.stableId;
+
+        UPDATE trainer_stats
+        SET totalPrize = totalPrize + horse_prize, numWins = numWins + horse_wins
+        WHERE stableId = NEW.stableId;
+    END IF;
+END;
+
+CREATE TRIGGER trainer_insert_stats
+    AFTER INSERT ON Trainer
+    FOR EACH ROW
+BEGIN
+    INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+    SELECT NEW.trainerId, NEW.stableId,
+           IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+           COUNT(CASE WHEN rr.position = 1 THEN 1 END)
+    FROM Horse h
+    JOIN RaceResults rr ON rr.horseId = h.horseId
+    WHERE h.stableId = NEW.stableId;
+END;
+
+CREATE TRIGGER trainer_update_stats
+    AFTER UPDATE ON Trainer
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.stableId <=> NEW.stableId) OR OLD.trainerId <> NEW.trainerId THEN
+        DELETE FROM trainer_stats WHERE trainerId = OLD.trainerId;
+
+        INSERT INTO trainer_stats (trainerId, stableId, totalPrize, numWins)
+        SELECT NEW.trainerId, NEW.stableId,
+               IFNULL(SUM(ROUND(rr.prize, 2)), 0),
+               COUNT(CASE WHEN rr.position = 1 THEN 1 END)
+        FROM Horse h
+        JOIN RaceResults rr ON rr.horseId = h.horseId
+        WHERE h.stableId = NEW.stableId;
+    END IF;
+END;
+
+-- Pick up any result written while results_update_stats was missing
+CALL RebuildTrainerStats();
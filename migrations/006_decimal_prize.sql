@@ -0,0 +1,16 @@
+-- Exact prize money
+-- RaceResults.prize was FLOAT(10,2), a single-precision float: amounts
+-- over about 100,000 lose their cents and long SUM()s drift. DECIMAL(12,2)
+-- stores every amount up to 9,999,999,999.99 exactly; values already
+-- stored are rounded to the nearest cent on conversion.
+-- Changing a column's type copies the table, which MySQL can't do while
+-- writes continue, so this migration runs offline: reads carry on during
+-- the copy (LOCK=SHARED) but writes to RaceResults wait for it.
+-- migrate: offline
+
+ALTER TABLE RaceResults
+    MODIFY prize DECIMAL(12,2),
+    ALGORITHM=COPY, LOCK=SHARED;
+
+-- trainer_stats was summed from float values; recompute it from the exact ones
+CALL RebuildTrainerStats();
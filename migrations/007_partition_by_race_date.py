@@ -0,0 +1,306 @@
+"""
+Partition Race and RaceResults by raceDate
+RaceResults gets its own copy of its race's raceDate, kept in step by
+triggers, so both tables can be range-partitioned on it: p_before, one
+partition per year from the first race (or ten years back) through next
+year, and p_future. Reports given a date range then read only the
+partitions it covers. partitions.py adds upcoming partitions and archives
+old ones.
+
+MySQL allows no foreign keys on partitioned tables, in either direction,
+and every unique key must include the partitioning column. The keys
+Race -> Track, RaceResults -> Race and RaceResults -> Horse are therefore
+replaced by triggers raising the same errors (1451/1452) and honouring
+foreign_key_checks like the keys did, and the primary keys gain raceDate.
+raceId stays unique across partitions through race_ids, an unpartitioned
+table with raceId as its real primary key: the Race triggers claim a
+race's id there, so of two concurrent inserts of one raceId the second
+waits for the first and then fails with 1062. Owns keeps its
+real foreign keys, so DeleteOwner behaves as before; deleting a horse that
+has results is still refused before horse_delete_trigger copies it to
+old_info. Races without a raceDate must be dated before this runs.
+
+Repartitioning copies both tables, so this runs offline.
+"""
+
+from datetime import date
+from mysql.connector import Error
+from migrate import execute_once
+from partitions import HISTORY_YEARS, RACE_IDS_TABLE, partition_clause
+from sql_script import drop_statement
+
+OFFLINE = True
+
+# Races whose results get their raceDate per backfill transaction
+BACKFILL_RACES = 1000
+
+# raceDate of a result whose race can't be found (only possible with foreign_key_checks off)
+NO_RACE_DATE = '1000-01-01'
+
+FOREIGN_KEYS = """
+    SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+    WHERE CONSTRAINT_SCHEMA = DATABASE()
+      AND (TABLE_NAME IN ('Race', 'RaceResults') OR REFERENCED_TABLE_NAME IN ('Race', 'RaceResults'))
+"""
+
+BACKFILL = """
+    UPDATE RaceResults rr
+    JOIN Race r ON r.raceId = rr.raceId
+    SET rr.raceDate = r.raceDate
+    WHERE rr.raceId > %s {upper}
+"""
+
+# The backfill leaves winners and prizes alone, so results_update_stats
+# would only add work; it is recreated as migration 005 left it
+RESULTS_UPDATE_STATS = """
+CREATE TRIGGER results_update_stats
+    AFTER UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize - IFNULL(ROUND(OLD.prize, 2), 0),
+        numWins = numWins - IF(OLD.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = OLD.horseId);
+
+    UPDATE trainer_stats
+    SET totalPrize = totalPrize + IFNULL(ROUND(NEW.prize, 2), 0),
+        numWins = numWins + IF(NEW.position = 1, 1, 0)
+    WHERE stableId = (SELECT stableId FROM Horse WHERE horseId = NEW.horseId);
+END
+"""
+
+# One row per race; its primary key is what keeps raceId unique
+RACE_IDS = f"""
+    CREATE TABLE IF NOT EXISTS {RACE_IDS_TABLE} (
+        raceId VARCHAR(15) NOT NULL,
+        PRIMARY KEY (raceId)
+    )
+"""
+
+# Foreign keys checked by triggers, which also keep race_ids in step with Race
+KEY_TRIGGERS = [
+    """
+CREATE TRIGGER race_check_insert
+    BEFORE INSERT ON Race
+    FOR EACH ROW
+BEGIN
+    -- A locking insert, unlike an EXISTS check: a concurrent insert of the
+    -- same raceId waits for this one, then fails on the duplicate key (1062)
+    INSERT INTO race_ids (raceId) VALUES (NEW.raceId);
+    IF @@foreign_key_checks AND NEW.trackName IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM Track WHERE trackName = NEW.trackName) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot add or update a child row: Race.trackName has no matching Track',
+                MYSQL_ERRNO = 1452;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER race_check_update
+    BEFORE UPDATE ON Race
+    FOR EACH ROW
+BEGIN
+    IF NEW.raceId <> OLD.raceId THEN
+        IF @@foreign_key_checks AND EXISTS (SELECT 1 FROM RaceResults WHERE raceId = OLD.raceId) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Cannot delete or update a parent row: RaceResults refer to this Race',
+                    MYSQL_ERRNO = 1451;
+        END IF;
+        UPDATE race_ids SET raceId = NEW.raceId WHERE raceId = OLD.raceId;
+    END IF;
+    IF @@foreign_key_checks AND NEW.trackName IS NOT NULL AND NOT (NEW.trackName <=> OLD.trackName)
+       AND NOT EXISTS (SELECT 1 FROM Track WHERE trackName = NEW.trackName) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot add or update a child row: Race.trackName has no matching Track',
+                MYSQL_ERRNO = 1452;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER race_check_delete
+    BEFORE DELETE ON Race
+    FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks AND EXISTS (SELECT 1 FROM RaceResults WHERE raceId = OLD.raceId) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: RaceResults refer to this Race',
+                MYSQL_ERRNO = 1451;
+    END IF;
+    DELETE FROM race_ids WHERE raceId = OLD.raceId;
+END
+""",
+    """
+CREATE TRIGGER race_sync_result_dates
+    AFTER UPDATE ON Race
+    FOR EACH ROW
+BEGIN
+    IF NEW.raceDate <> OLD.raceDate THEN
+        UPDATE RaceResults SET raceDate = NEW.raceDate WHERE raceId = NEW.raceId;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER results_check_insert
+    BEFORE INSERT ON RaceResults
+    FOR EACH ROW
+BEGIN
+    DECLARE race_date DATE;
+
+    SET race_date = (SELECT raceDate FROM Race WHERE raceId = NEW.raceId);
+    SET NEW.raceDate = IFNULL(race_date, '1000-01-01');
+    IF @@foreign_key_checks THEN
+        IF race_date IS NULL THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Cannot add or update a child row: RaceResults.raceId has no matching Race',
+                    MYSQL_ERRNO = 1452;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM Horse WHERE horseId = NEW.horseId) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Cannot add or update a child row: RaceResults.horseId has no matching Horse',
+                    MYSQL_ERRNO = 1452;
+        END IF;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER results_check_update
+    BEFORE UPDATE ON RaceResults
+    FOR EACH ROW
+BEGIN
+    DECLARE race_date DATE;
+
+    SET race_date = (SELECT raceDate FROM Race WHERE raceId = NEW.raceId);
+    SET NEW.raceDate = IFNULL(race_date, '1000-01-01');
+    IF @@foreign_key_checks THEN
+        IF race_date IS NULL THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Cannot add or update a child row: RaceResults.raceId has no matching Race',
+                    MYSQL_ERRNO = 1452;
+        END IF;
+        IF NEW.horseId <> OLD.horseId AND NOT EXISTS (SELECT 1 FROM Horse WHERE horseId = NEW.horseId) THEN
+            SIGNAL SQLSTATE '23000'
+                SET MESSAGE_TEXT = 'Cannot add or update a child row: RaceResults.horseId has no matching Horse',
+                    MYSQL_ERRNO = 1452;
+        END IF;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER horse_check_delete
+    BEFORE DELETE ON Horse
+    FOR EACH ROW
+    PRECEDES horse_delete_trigger
+BEGIN
+    IF @@foreign_key_checks AND EXISTS (SELECT 1 FROM RaceResults WHERE horseId = OLD.horseId) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: RaceResults refer to this Horse',
+                MYSQL_ERRNO = 1451;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER horse_check_update
+    BEFORE UPDATE ON Horse
+    FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks AND NEW.horseId <> OLD.horseId
+       AND EXISTS (SELECT 1 FROM RaceResults WHERE horseId = OLD.horseId) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: RaceResults refer to this Horse',
+                MYSQL_ERRNO = 1451;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER track_check_delete
+    BEFORE DELETE ON Track
+    FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks AND EXISTS (SELECT 1 FROM Race WHERE trackName = OLD.trackName) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: Races refer to this Track',
+                MYSQL_ERRNO = 1451;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER track_check_update
+    BEFORE UPDATE ON Track
+    FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks AND NEW.trackName <> OLD.trackName
+       AND EXISTS (SELECT 1 FROM Race WHERE trackName = OLD.trackName) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: Races refer to this Track',
+                MYSQL_ERRNO = 1451;
+    END IF;
+END
+""",
+]
+
+def create(cursor, statement):
+    """Create a stored program, replacing any copy left by an earlier schema load"""
+    cursor.execute(drop_statement(statement))
+    cursor.execute(statement)
+
+def backfill_race_dates(cursor):
+    """Give every result its race's date, BACKFILL_RACES races per transaction"""
+    last = ''
+    while True:
+        cursor.execute("SELECT raceId FROM Race WHERE raceId > %s ORDER BY raceId LIMIT 1 OFFSET %s",
+                       (last, BACKFILL_RACES - 1))
+        rows = cursor.fetchall()
+        if rows:
+            cursor.execute(BACKFILL.format(upper="AND rr.raceId <= %s"), (last, rows[0][0]))
+        else:
+            cursor.execute(BACKFILL.format(upper=""), (last,))
+        cursor.execute("COMMIT")
+        if not rows:
+            return
+        last = rows[0][0]
+
+def upgrade(cursor):
+    cursor.execute("SELECT raceId FROM Race WHERE raceDate IS NULL ORDER BY raceId LIMIT 10")
+    undated = [row[0] for row in cursor.fetchall()]
+    if undated:
+        raise Error(msg="Race.raceDate becomes part of the primary key; set a date on these races first: "
+                        + ", ".join(undated))
+
+    cursor.execute(FOREIGN_KEYS)
+    for table, name in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE `{table}` DROP FOREIGN KEY `{name}`")
+
+    # Filled while Race's primary key still guarantees one row per raceId
+    cursor.execute(RACE_IDS)
+    cursor.execute(f"INSERT IGNORE INTO {RACE_IDS_TABLE} (raceId) SELECT raceId FROM Race")
+
+    # Added last, like position, so TSV loads listing the older columns still line up
+    execute_once(cursor, f"ALTER TABLE RaceResults ADD COLUMN raceDate DATE NOT NULL DEFAULT '{NO_RACE_DATE}'")
+    cursor.execute("DROP TRIGGER IF EXISTS results_update_stats")
+    backfill_race_dates(cursor)
+    create(cursor, RESULTS_UPDATE_STATS)
+
+    cursor.execute("SELECT YEAR(MIN(raceDate)) FROM Race")
+    first_year = min(cursor.fetchall()[0][0] or date.today().year, date.today().year - HISTORY_YEARS)
+    partitioning = partition_clause(first_year, date(date.today().year + 2, 1, 1))
+    # Both ALTERs below are skipped when rerun after a failure if their new primary key is already
+    # in place. Race also makes raceDate NOT NULL, as a primary key column must be
+    execute_once(cursor, f"""
+        ALTER TABLE Race
+            MODIFY raceDate DATE NOT NULL,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (raceId, raceDate)
+        {partitioning}
+    """)
+    execute_once(cursor, f"""
+        ALTER TABLE RaceResults
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (raceId, horseId, raceDate)
+        {partitioning}
+    """)
+
+    for statement in KEY_TRIGGERS:
+        create(cursor, statement)
+
+    # Pick up any result written while results_update_stats was missing
+    cursor.execute("CALL RebuildTrainerStats()")
@@ -0,0 +1,43 @@
+"""
+Compressed archive tables and history views
+archiver.py (and partitions.py archive) move cold race history out of the
+live tables into race_archive, race_results_archive and old_info_archive:
+unpartitioned copies of Race, RaceResults and old_info stored
+ROW_FORMAT=COMPRESSED. The views race_history, race_results_history and
+old_info_history read each live table UNION ALL its archive, for reports
+that should include archived history.
+
+old_info gets an index on deletedAt so the archiver can take deleted
+horses oldest first without scanning the table. New tables, views and an
+online index, so this runs online.
+"""
+
+from migrate import execute_once
+from partitions import ARCHIVE_TABLES, ensure_archive_table
+
+# view -> (live table, archive table, columns)
+HISTORY_VIEWS = {
+    'race_history': ('Race', ARCHIVE_TABLES['Race'],
+                     "raceId, raceName, trackName, raceDate, raceTime"),
+    'race_results_history': ('RaceResults', ARCHIVE_TABLES['RaceResults'],
+                             "raceId, horseId, results, position, prize, raceDate"),
+    'old_info_history': ('old_info', ARCHIVE_TABLES['old_info'],
+                         "horseId, horseName, age, gender, registration, stableId, deletedAt"),
+}
+
+def upgrade(cursor):
+    execute_once(cursor, """
+        ALTER TABLE old_info
+            ADD INDEX idx_old_info_deleted (deletedAt),
+            ALGORITHM=INPLACE, LOCK=NONE
+    """)
+    # Created after the index, so the archive has it too
+    for table, archive, columns in HISTORY_VIEWS.values():
+        ensure_archive_table(cursor, table, archive)
+    for view, (table, archive, columns) in HISTORY_VIEWS.items():
+        cursor.execute(f"""
+            CREATE OR REPLACE VIEW {view} AS
+            SELECT {columns} FROM {table}
+            UNION ALL
+            SELECT {columns} FROM {archive}
+        """)
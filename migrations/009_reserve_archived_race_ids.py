@@ -0,0 +1,34 @@
+"""
+Keep the raceIds of archived races reserved
+race_ids (migrations/007) freed the id of every race deleted from Race,
+including races archiver.py moved to race_archive, so a card re-importing
+an archived race was accepted and race_history ended up with two races
+under one raceId. race_check_delete now leaves the id in race_ids while the
+archiver's session has ARCHIVING_FLAG set, and ids already archived are
+claimed again. Recreating a trigger is quick, so this runs online.
+"""
+
+from partitions import ARCHIVE_TABLES, ARCHIVING_FLAG, RACE_IDS_TABLE
+from sql_script import drop_statement
+
+RACE_CHECK_DELETE = f"""
+CREATE TRIGGER race_check_delete
+    BEFORE DELETE ON Race
+    FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks AND EXISTS (SELECT 1 FROM RaceResults WHERE raceId = OLD.raceId) THEN
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'Cannot delete or update a parent row: RaceResults refer to this Race',
+                MYSQL_ERRNO = 1451;
+    END IF;
+    -- An archived race keeps its id, so it can't be imported a second time
+    IF {ARCHIVING_FLAG} IS NULL THEN
+        DELETE FROM {RACE_IDS_TABLE} WHERE raceId = OLD.raceId;
+    END IF;
+END
+"""
+
+def upgrade(cursor):
+    cursor.execute(drop_statement(RACE_CHECK_DELETE))
+    cursor.execute(RACE_CHECK_DELETE)
+    cursor.execute(f"INSERT IGNORE INTO {RACE_IDS_TABLE} (raceId) SELECT raceId FROM {ARCHIVE_TABLES['Race']}")
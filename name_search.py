@@ -0,0 +1,191 @@
+"""
+Name search for Horse Racing Database System
+In-process trigram indexes over owner last names and horse names. A typed
+substring is resolved to the exact names containing it, which the database
+then looks up through ordinary indexes instead of scanning with LIKE '%...%'.
+The indexes also list every one- and two-character substring, so the first
+keystrokes of a search are answered from one posting list too. After a write
+the old index keeps answering while its replacement is built in the background
+"""
+
+import logging
+import threading
+import time
+from array import array
+import report_queries
+from data_access.errors import DataAccessError
+
+logger = logging.getLogger(__name__)
+
+# Most names sent as an IN (...) list; a broader match falls back to LIKE,
+# which is cheap then because matching horses are common enough to fill the
+# first page after a short walk of the horse list
+MAX_NAMES = 256
+
+# Seconds an index is trusted before being reloaded, to pick up writes made
+# by other clients; writes through the DatabaseManager reload it at once
+REFRESH_SECONDS = 300
+
+# kind -> (query loading the distinct names, table whose writes change them)
+SOURCES = {
+    'owner': ("SELECT DISTINCT lname as name FROM Owner WHERE lname IS NOT NULL", 'owner'),
+    'horse': ("SELECT DISTINCT horseName as name FROM Horse WHERE horseName IS NOT NULL", 'horse'),
+}
+
+# Substrings up to this long have their own posting list; longer searches
+# intersect the lists of their trigrams
+GRAM_SIZE = 3
+
+def grams(text, size=GRAM_SIZE):
+    """The distinct size-character substrings of text, lower-cased"""
+    text = text.lower()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+class NameIndex:
+    """Immutable index of the 1-, 2- and 3-character substrings of a collection of names"""
+    def __init__(self, names):
+        self.names = sorted({name for name in names if name}, key=lambda name: (name.lower(), name))
+        self._lowered = [name.lower() for name in self.names]
+        postings = {}
+        for ordinal, name in enumerate(self._lowered):
+            for size in range(1, GRAM_SIZE + 1):
+                for gram in grams(name, size):
+                    postings.setdefault(gram, []).append(ordinal)
+        # Ordinals are added in name order, so every posting list is sorted
+        # and matches come out alphabetically; arrays keep 1M names compact
+        self._postings = {gram: array('I', ordinals) for gram, ordinals in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, text, limit=None):
+        """Names containing text, ignoring case, in alphabetical order"""
+        text = text.lower()
+        if not text:
+            candidates = range(len(self._lowered))
+        elif len(text) <= GRAM_SIZE:
+            # The text is a gram itself: its list holds exactly the matches
+            return [self.names[ordinal] for ordinal in self._postings.get(text, ())[:limit]]
+        else:
+            postings = [self._postings.get(gram) for gram in grams(text)]
+            if not all(postings):
+                return []
+            # Every match is in the rarest trigram's list; confirm the rest by substring test
+            candidates = min(postings, key=len)
+
+        matches = []
+        for ordinal in candidates:
+            if text in self._lowered[ordinal]:
+                matches.append(self.names[ordinal])
+                if limit is not None and len(matches) >= limit:
+                    break
+        return matches
+
+class NameSearch:
+    """Name indexes loaded on first use and reloaded after writes to their table"""
+    def __init__(self, db_manager, refresh_seconds=REFRESH_SECONDS):
+        self.db_manager = db_manager
+        self.refresh_seconds = refresh_seconds
+        self._indexes = {}  # kind -> (loaded at, generation loaded, NameIndex)
+        self._generations = {kind: 0 for kind in SOURCES}
+        self._locks = {kind: threading.Lock() for kind in SOURCES}  # held while loading
+        self._reloading = set()  # kinds with a background reload running
+        self._state_lock = threading.Lock()
+        db_manager.add_write_listener(self._on_write)
+
+    def close(self):
+        """Stop following writes"""
+        self.db_manager.remove_write_listener(self._on_write)
+
+    def index(self, kind):
+        """The NameIndex for kind, loading it on first use
+
+        The first load hits the database, so call this off the Tk main thread;
+        if it fails the error is raised. Afterwards a stale index is returned
+        at once and replaced by a reload on a background thread.
+        """
+        with self._state_lock:
+            entry = self._indexes.get(kind)
+        if entry is None:
+            with self._locks[kind]:
+                with self._state_lock:
+                    entry = self._indexes.get(kind)
+                if entry is None:
+                    return self._load(kind)
+        if self._stale(kind, entry):
+            self._reload_in_background(kind)
+        return entry[2]
+
+    def _stale(self, kind, entry):
+        loaded_at, generation, _ = entry
+        return (generation != self._generations[kind]
+                or time.monotonic() - loaded_at >= self.refresh_seconds)
+
+    def _load(self, kind):
+        """Read the names of kind and make them the current index; call holding the lock of kind"""
+        with self._state_lock:
+            generation = self._generations[kind]
+        rows = self.db_manager.execute_query(SOURCES[kind][0])
+        index = NameIndex(row['name'] for row in rows)
+        with self._state_lock:
+            # A write during the load may be missing; the older generation marks it stale
+            self._indexes[kind] = (time.monotonic(), generation, index)
+        return index
+
+    def _reload_in_background(self, kind):
+        with self._state_lock:
+            if kind in self._reloading:
+                return
+            self._reloading.add(kind)
+        threading.Thread(target=self._reload, args=(kind,), name=f"name-index-{kind}", daemon=True).start()
+
+    def _reload(self, kind):
+        try:
+            with self._locks[kind]:
+                # Go again if writes came in while loading
+                while self._stale(kind, self._indexes[kind]):
+                    self._load(kind)
+        except DataAccessError as e:
+            # Keep answering from the old names until the database is back
+            logger.warning("Reloading the %s name index failed, keeping the old one: %s", kind, e)
+        finally:
+            with self._state_lock:
+                self._reloading.discard(kind)
+
+    def match(self, kind, text):
+        """Exact names of kind containing text, or None if there are too many to list"""
+        names = self.index(kind).search(text, MAX_NAMES + 1)
+        return names if len(names) <= MAX_NAMES else None
+
+    def horses_query(self, kind, text):
+        """(PagedQuery, params) listing horses whose owner last name or name contains text
+
+        kind is 'owner' or 'horse'. Returns None when no name matches, so
+        there is nothing to ask the database.
+        """
+        names = self.match(kind, text)
+        if names is None:
+            query = report_queries.HORSES_BY_OWNER if kind == 'owner' else report_queries.HORSES_BY_NAME
+            return query, (f"%{text}%",)
+        if not names:
+            return None
+        # Pad to a power of two so only a few distinct statements get prepared and cached
+        size = 1
+        while size < len(names):
+            size *= 2
+        params = tuple(names) + (names[-1],) * (size - len(names))
+        if kind == 'owner':
+            return report_queries.horses_by_owner_names(size), params
+        return report_queries.horses_by_names(size), params
+
+    def _on_write(self, tables):
+        loaded = []
+        with self._state_lock:
+            for kind, (_, table) in SOURCES.items():
+                if tables is None or table in tables:
+                    self._generations[kind] += 1
+                    if kind in self._indexes:
+                        loaded.append(kind)
+        # Searches keep using the old names until the reload finishes
+        for kind in loaded:
+            self._reload_in_background(kind)
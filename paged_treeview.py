@@ -0,0 +1,145 @@
+"""
+Paged Treeview for Horse Racing Database System
+Shows a report one keyset page at a time, fetching the next (or previous)
+page as the user scrolls, so only a few pages are ever held in the widget.
+Pages are fetched on a task_runner.TaskRunner so scrolling never blocks the UI
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from data_access.instrumentation import caller_site
+
+# Pages kept in the Treeview at once; older ones are dropped and re-fetched on demand
+MAX_PAGES = 3
+
+# Fraction of the scroll range from either end at which the neighbouring page is loaded
+EDGE = 0.1
+
+class PagedTreeview:
+    """A Treeview with scrollbar bound to a report_queries.PagedQuery"""
+    def __init__(self, parent, columns, runner, widths=120, page_size=None, max_pages=MAX_PAGES, spinner=None):
+        self.frame = tk.Frame(parent, bg="#34495E")
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings")
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=widths)
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.runner = runner
+        self.spinner = spinner
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._fetch = None
+        self._clear_pages()
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _clear_pages(self):
+        # _starts[i] is the key the i-th page starts after (None for the first page);
+        # _pages holds the item ids of the loaded pages _first .. _first + len(_pages) - 1
+        self._starts = [None]
+        self._pages = []
+        self._first = 0
+        self._exhausted = True
+        self._loading = False
+
+    def clear(self):
+        """Empty the view and drop any page still being fetched"""
+        self.runner.cancel(self)
+        self.tree.delete(*self.tree.get_children())
+        self._clear_pages()
+        self._fetch = None
+
+    def load(self, db_manager, query, params=(), format_row=tuple, on_loaded=None, on_error=None,
+             use_cache=True):
+        """Show the first page of query in the background
+
+        on_loaded(count) is called with the number of rows on the first page.
+        A new load cancels any page still being fetched for the previous one.
+        Pages come from the result cache when use_cache is set.
+        """
+        self.tree.delete(*self.tree.get_children())
+        self._clear_pages()
+        # Pages fetched while scrolling are timed under the action that loaded the report
+        site = caller_site()
+
+        def fetch(last_key, callback):
+            if self.page_size:
+                sql, args = query.page(params, last_key, self.page_size)
+            else:
+                sql, args = query.page(params, last_key)
+            limit = args[-1]
+
+            def done(rows):
+                try:
+                    callback(rows or [], limit)
+                finally:
+                    self._loading = False
+
+            def failed(error):
+                self._loading = False
+                if on_error is not None:
+                    on_error(error)
+
+            self._loading = True
+            self.runner.submit(lambda: db_manager.execute_query(sql, args, use_cache=use_cache),
+                               on_success=done, on_error=failed, key=self, spinner=self.spinner, site=site)
+
+        def first_page(rows, limit):
+            self._append(rows, limit)
+            if on_loaded is not None:
+                on_loaded(len(rows))
+
+        self._fetch = fetch
+        self._key_of = query.key_of
+        self._format_row = format_row
+        fetch(None, first_page)
+
+    def _append(self, rows, limit):
+        page = self._first + len(self._pages)
+        items = [self.tree.insert("", tk.END, values=self._format_row(row)) for row in rows]
+        self._pages.append(items)
+        self._exhausted = len(rows) < limit
+        if not self._exhausted and page + 1 == len(self._starts):
+            self._starts.append(self._key_of(rows[-1]))
+        return items
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._fetch is None or self._loading:
+            return
+        if float(last) >= 1 - EDGE and not self._exhausted:
+            page = self._first + len(self._pages)
+            if page >= len(self._starts):
+                self._exhausted = True
+                return
+            self._fetch(self._starts[page], self._show_next)
+        elif float(first) <= EDGE and self._first > 0:
+            self._fetch(self._starts[self._first - 1], self._show_previous)
+
+    def _show_next(self, rows, limit):
+        if not rows:
+            self._exhausted = True
+            return
+        items = self._append(rows, limit)
+        if len(self._pages) > self.max_pages:
+            self.tree.delete(*self._pages.pop(0))
+            self._first += 1
+            # Keep the row the user was looking at in view
+            self.tree.see(items[0])
+
+    def _show_previous(self, rows, limit):
+        items = [self.tree.insert("", position, values=self._format_row(row))
+                 for position, row in enumerate(rows)]
+        self._pages.insert(0, items)
+        self._first -= 1
+        if len(self._pages) > self.max_pages:
+            self.tree.delete(*self._pages.pop())
+            self._exhausted = False
+        if items:
+            self.tree.see(items[-1])
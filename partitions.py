@@ -0,0 +1,398 @@
+"""
+Partition maintenance for Horse Racing Database System
+Race and RaceResults are partitioned by raceDate (migrations/007_partition_by_race_date.py):
+p_before for everything older than the first year, one partition per year
+(or month), and p_future for everything later. Both tables always have the
+same partitions, so a date range read from either prunes the same way.
+
+MySQL can't enforce foreign keys on partitioned tables, so triggers check
+them instead. Like real foreign keys they are skipped while
+foreign_key_checks is off, as during bulk loads; check finds what such a
+load left dangling.
+
+Usage:
+    python partitions.py list                             partitions with their ranges and row estimates
+    python partitions.py add                              yearly partitions through next year
+    python partitions.py add --through 2027-06 --monthly  monthly partitions through June 2027
+    python partitions.py archive --before 2018            move partitions older than 2018 to the archive tables
+    python partitions.py check                            orphaned rows and stale RaceResults.raceDate copies
+    python partitions.py repair                           copy Race.raceDate onto results whose copy is stale
+"""
+
+import argparse
+import sys
+from datetime import date, datetime
+import mysql.connector
+from mysql.connector import Error
+import stats_maintenance
+
+# Children first, so a race never disappears before its results
+PARTITIONED_TABLES = ('RaceResults', 'Race')
+
+# Archived rows end up here; same columns, not partitioned (archiver.py also moves old_info)
+ARCHIVE_TABLES = {
+    'Race': 'race_archive',
+    'RaceResults': 'race_results_archive',
+    'old_info': 'old_info_archive',
+}
+
+# Unpartitioned table whose primary key keeps raceId unique across partitions
+# (migrations/007); the Race triggers add and remove its rows. Ids of
+# archived races stay in it, so an archived race can't be imported again
+RACE_IDS_TABLE = 'race_ids'
+
+# Session variable set while races move to the archive; race_check_delete
+# then leaves their ids reserved (migrations/009_reserve_archived_race_ids.py)
+ARCHIVING_FLAG = '@archiving_races'
+
+# Archived rows are rarely read, so they are stored compressed (about half the space)
+ARCHIVE_ROW_FORMAT = "ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8"
+
+# Yearly partitions created by the migration reach at least this far back,
+# so a history loaded after it doesn't all land in p_before
+HISTORY_YEARS = 10
+
+FIRST_PARTITION = 'p_before'
+FUTURE_PARTITION = 'p_future'
+
+# What the foreign keys used to guarantee; each query counts the rows breaking it
+CHECKS = {
+    'results without a race': """
+        SELECT COUNT(*) FROM RaceResults rr
+        WHERE NOT EXISTS (SELECT 1 FROM Race r WHERE r.raceId = rr.raceId)
+    """,
+    'results without a horse': """
+        SELECT COUNT(*) FROM RaceResults rr
+        WHERE NOT EXISTS (SELECT 1 FROM Horse h WHERE h.horseId = rr.horseId)
+    """,
+    'races without a track': """
+        SELECT COUNT(*) FROM Race r
+        WHERE r.trackName IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM Track t WHERE t.trackName = r.trackName)
+    """,
+    'race ids used twice': """
+        SELECT COUNT(*) FROM (SELECT raceId FROM Race GROUP BY raceId HAVING COUNT(*) > 1) d
+    """,
+    'race ids out of step with race_ids': """
+        SELECT (SELECT COUNT(*) FROM race_history r
+                WHERE NOT EXISTS (SELECT 1 FROM race_ids i WHERE i.raceId = r.raceId))
+             + (SELECT COUNT(*) FROM race_ids i
+                WHERE NOT EXISTS (SELECT 1 FROM race_history r WHERE r.raceId = i.raceId))
+    """,
+    'race ids both live and archived': """
+        SELECT COUNT(*) FROM Race r
+        WHERE EXISTS (SELECT 1 FROM race_archive a WHERE a.raceId = r.raceId)
+    """,
+    'results with a stale raceDate': """
+        SELECT COUNT(*) FROM RaceResults rr
+        JOIN Race r ON r.raceId = rr.raceId
+        WHERE rr.raceDate <> r.raceDate
+    """,
+}
+
+REPAIR_DATES = """
+    UPDATE RaceResults rr
+    JOIN Race r ON r.raceId = rr.raceId
+    SET rr.raceDate = r.raceDate
+    WHERE rr.raceDate <> r.raceDate
+"""
+
+# race_ids falls out of step only when Race changes without its triggers
+# (e.g. TRUNCATE); ids of live and archived races are kept, any others freed
+REPAIR_RACE_IDS = (
+    "INSERT IGNORE INTO race_ids (raceId) SELECT raceId FROM race_history",
+    """
+    DELETE i FROM race_ids i
+    WHERE NOT EXISTS (SELECT 1 FROM race_history r WHERE r.raceId = i.raceId)
+    """,
+)
+
+class PartitionError(Exception):
+    """Raised when the partition layout doesn't allow a maintenance step"""
+    pass
+
+class Partition:
+    """One raceDate range partition; bound is its exclusive upper date, None for MAXVALUE"""
+    def __init__(self, name, bound, rows):
+        self.name = name
+        self.bound = bound
+        self.rows = rows
+
+def partition_name(start, monthly=False):
+    """p2024 for a yearly partition starting in 2024, p202406 for a monthly one"""
+    return f"p{start:%Y%m}" if monthly else f"p{start.year}"
+
+def next_bound(start, monthly=False):
+    """First day after the year (or month) starting at start"""
+    if not monthly:
+        return date(start.year + 1, 1, 1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+def plan(start, end, monthly=False):
+    """(name, bound) of the partitions covering start up to end, exclusive"""
+    planned = []
+    while start < end:
+        bound = next_bound(start, monthly)
+        planned.append((partition_name(start, monthly), bound))
+        start = bound
+    return planned
+
+def definition(name, bound):
+    if bound is None:
+        return f"PARTITION {name} VALUES LESS THAN (MAXVALUE)"
+    return f"PARTITION {name} VALUES LESS THAN ('{bound.isoformat()}')"
+
+def partition_clause(first_year, end):
+    """PARTITION BY clause with p_before, a partition per year from first_year until end, and p_future"""
+    start = date(first_year, 1, 1)
+    bounds = [(FIRST_PARTITION, start)] + plan(start, end) + [(FUTURE_PARTITION, None)]
+    return ("PARTITION BY RANGE COLUMNS(raceDate) (\n    "
+            + ",\n    ".join(definition(name, bound) for name, bound in bounds) + "\n)")
+
+def parse_bound(description):
+    """Upper date of a RANGE COLUMNS partition from information_schema ('2025-01-01' or MAXVALUE)"""
+    description = description.strip().strip("'")
+    if description.upper() == 'MAXVALUE':
+        return None
+    return date.fromisoformat(description)
+
+def layout(cursor, table):
+    """The partitions of table in order; empty if it isn't partitioned"""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    return [Partition(name, parse_bound(description), rows) for name, description, rows in cursor.fetchall()]
+
+def shared_layout(cursor):
+    """Partitions of Race, after checking RaceResults has the same ones"""
+    layouts = {table: layout(cursor, table) for table in PARTITIONED_TABLES}
+    race = layouts['Race']
+    if not race:
+        raise PartitionError("Race isn't partitioned yet; run migrate.py first")
+    if [(p.name, p.bound) for p in race] != [(p.name, p.bound) for p in layouts['RaceResults']]:
+        raise PartitionError("Race and RaceResults partitions differ; fix them by hand before maintenance")
+    if race[-1].name != FUTURE_PARTITION or race[-1].bound is not None:
+        raise PartitionError(f"the last partition must be {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return race
+
+def count(cursor, query, params=()):
+    cursor.execute(query, params)
+    return cursor.fetchall()[0][0]
+
+def add_partitions(connection, end, monthly=False):
+    """Split p_future so dates up to end (exclusive) get their own partitions; returns the names added"""
+    cursor = connection.cursor()
+    try:
+        partitions = shared_layout(cursor)
+        last_bound = partitions[-2].bound if len(partitions) > 1 else None
+        if last_bound is None:
+            raise PartitionError("no bounded partition to continue from")
+        planned = plan(last_bound, end, monthly)
+        if not planned:
+            return []
+        definitions = ",\n    ".join(definition(name, bound) for name, bound in planned + [(FUTURE_PARTITION, None)])
+        for table in PARTITIONED_TABLES:
+            # Only p_future's rows are copied, and it is normally empty
+            cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    {definitions}\n)")
+        return [name for name, bound in planned]
+    finally:
+        cursor.close()
+
+def ensure_unpartitioned_copy(cursor, table, copy):
+    """Create copy with table's columns and indexes but no partitioning, unless it exists"""
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {copy} LIKE {table}")
+    if layout(cursor, copy):
+        cursor.execute(f"ALTER TABLE {copy} REMOVE PARTITIONING")
+
+def ensure_archive_table(cursor, table, archive):
+    """Create archive as a compressed, unpartitioned copy of table's columns and indexes, unless it exists"""
+    ensure_unpartitioned_copy(cursor, table, archive)
+    cursor.execute("""
+        SELECT ROW_FORMAT FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (archive,))
+    if cursor.fetchall()[0][0] != 'Compressed':
+        cursor.execute(f"ALTER TABLE {archive} {ARCHIVE_ROW_FORMAT}")
+
+def table_exists(cursor, table):
+    return bool(count(cursor, """
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,)))
+
+def archive_staging(connection, cursor, staging, archive):
+    """Append a staging table's rows to archive and drop it; returns the rows added"""
+    # EXCHANGE PARTITION fires no delete trigger, so the races' ids stay reserved in race_ids
+    # IGNORE: after a crash between this copy and the DROP the rows are already archived
+    cursor.execute(f"INSERT IGNORE INTO {archive} SELECT * FROM {staging}")
+    added = cursor.rowcount
+    connection.commit()
+    cursor.execute(f"DROP TABLE {staging}")
+    return added
+
+def archive_partition(connection, cursor, table, partition):
+    """Move one partition's rows into table's archive table; returns how many moved
+
+    EXCHANGE PARTITION swaps the rows into an empty staging table without
+    copying them, so the live table is only locked for a moment; the copy
+    into the archive happens afterwards. A staging table left by an
+    interrupted run still holds swapped-out rows and is finished first.
+    """
+    archive = ARCHIVE_TABLES[table]
+    staging = f"{archive}_{partition}"
+    ensure_archive_table(cursor, table, archive)
+    moved = 0
+    if table_exists(cursor, staging):
+        moved += archive_staging(connection, cursor, staging, archive)
+    while count(cursor, f"SELECT COUNT(*) FROM {table} PARTITION ({partition})"):
+        ensure_unpartitioned_copy(cursor, table, staging)
+        cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {staging}")
+        moved += archive_staging(connection, cursor, staging, archive)
+    return moved
+
+def drop_empty_partition(cursor, partition):
+    """Drop a partition from both tables, provided nothing was written to it meanwhile"""
+    cursor.execute("LOCK TABLES " + ", ".join(f"{table} WRITE" for table in PARTITIONED_TABLES))
+    try:
+        for table in PARTITIONED_TABLES:
+            if count(cursor, f"SELECT COUNT(*) FROM {table} PARTITION ({partition})"):
+                raise PartitionError(f"rows were added to {table} partition {partition} while archiving it; "
+                                     "run archive again")
+        for table in PARTITIONED_TABLES:
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition}")
+    finally:
+        cursor.execute("UNLOCK TABLES")
+
+def archive_partitions(connection, before):
+    """Archive every partition holding only dates before the date before
+
+    Returns [(partition, {table: rows moved})]. The summaries are rebuilt
+    afterwards, so reports only count races still in the live tables.
+    """
+    cursor = connection.cursor()
+    archived = []
+    try:
+        for partition in shared_layout(cursor):
+            if partition.bound is None or partition.bound > before:
+                break
+            moved = {table: archive_partition(connection, cursor, table, partition.name)
+                     for table in PARTITIONED_TABLES}
+            drop_empty_partition(cursor, partition.name)
+            archived.append((partition.name, moved))
+    finally:
+        cursor.close()
+    if archived:
+        stats_maintenance.rebuild_trainer_stats(connection)
+        stats_maintenance.rebuild_track_stats(connection)
+    return archived
+
+def check(connection):
+    """{problem: rows} for every broken rule the dropped foreign keys used to enforce"""
+    cursor = connection.cursor()
+    try:
+        return {problem: count(cursor, query) for problem, query in CHECKS.items()}
+    finally:
+        cursor.close()
+
+def repair_dates(connection):
+    """Copy Race.raceDate onto results whose copy differs; returns the rows fixed"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(REPAIR_DATES)
+        fixed = cursor.rowcount
+        connection.commit()
+        return fixed
+    finally:
+        cursor.close()
+
+def repair_race_ids(connection):
+    """Add missing raceIds to race_ids and free ids of races neither live nor archived; returns the rows fixed"""
+    cursor = connection.cursor()
+    try:
+        fixed = 0
+        for statement in REPAIR_RACE_IDS:
+            cursor.execute(statement)
+            fixed += cursor.rowcount
+        connection.commit()
+        return fixed
+    finally:
+        cursor.close()
+
+def parse_period(value):
+    """(first day, monthly) of YYYY or YYYY-MM"""
+    for pattern, monthly in (("%Y", False), ("%Y-%m", True)):
+        try:
+            return datetime.strptime(value, pattern).date(), monthly
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"expected YYYY or YYYY-MM, got {value!r}")
+
+def main(argv=None):
+    """Add, archive and check raceDate partitions"""
+    parser = argparse.ArgumentParser(description="Maintain the raceDate partitions of Race and RaceResults")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="show partitions with their ranges and estimated rows")
+    add = commands.add_parser('add', help="add partitions for upcoming dates")
+    add.add_argument('--through', type=parse_period, metavar='YYYY[-MM]',
+                     help="last year or month to cover (default: next year)")
+    add.add_argument('--monthly', action='store_true', help="one partition per month instead of per year")
+    archive = commands.add_parser('archive', help="move whole partitions of old races to the archive tables")
+    archive.add_argument('--before', type=parse_period, required=True, metavar='YYYY[-MM]',
+                         help="archive partitions ending on or before the start of this year or month")
+    commands.add_parser('check', help="look for rows the foreign key triggers would have refused")
+    commands.add_parser('repair', help="copy Race.raceDate onto results whose copy is stale and resync race_ids")
+    args = parser.parse_args(argv)
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        status = 0
+        if args.command == 'list':
+            cursor = connection.cursor()
+            partitions = shared_layout(cursor)
+            cursor.close()
+            lower = None
+            for partition in partitions:
+                print(f"{partition.name:10} {str(lower or ''):>10} .. {str(partition.bound or ''):10} "
+                      f"~{partition.rows:,} races")
+                lower = partition.bound
+        elif args.command == 'add':
+            if args.through:
+                through, monthly = args.through
+                end = next_bound(through, monthly)
+            else:
+                end = date(date.today().year + 2, 1, 1)
+            added = add_partitions(connection, end, args.monthly)
+            print(f"Added {', '.join(added)}" if added else "Partitions already cover that range")
+        elif args.command == 'archive':
+            archived = archive_partitions(connection, args.before[0])
+            for name, moved in archived:
+                print(f"{name}: " + ", ".join(f"{rows:,} {table} rows" for table, rows in moved.items())
+                      + " archived")
+            if archived:
+                print("trainer_stats and track rollups rebuilt without the archived races")
+            else:
+                print(f"No partition ends before {args.before[0]}")
+        elif args.command == 'check':
+            for problem, rows in check(connection).items():
+                print(f"{problem}: {rows}")
+                if rows:
+                    status = 1
+        elif args.command == 'repair':
+            print(f"{repair_dates(connection)} result(s) given their race's date")
+            print(f"{repair_race_ids(connection)} race_ids row(s) added or removed")
+        connection.close()
+        return status
+    except (Error, PartitionError) as e:
+        print(f"Error: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
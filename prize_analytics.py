@@ -0,0 +1,171 @@
+"""
+Prize money analytics for Horse Racing Database System
+Pulls prize amounts into NumPy arrays and computes the count, total, mean
+and percentiles for every trainer, stable or track at once, for reports and
+CSV exports. Amounts are handled as integer cents, so totals are exact.
+
+Usage:
+    python prize_analytics.py trainer                  top trainers by total prize money
+    python prize_analytics.py track --csv tracks.csv   export per-track figures
+    python prize_analytics.py stable --percentiles 25 50 75
+"""
+
+import argparse
+import csv
+import sys
+from decimal import Decimal
+import numpy as np
+import mysql.connector
+from mysql.connector import Error
+
+DEFAULT_PERCENTILES = (50, 90)
+
+# grouping -> query returning (group key, label, prize in cents) for every result
+GROUPINGS = {
+    'trainer': """
+        SELECT t.trainerId, CONCAT(t.fname, ' ', t.lname), CAST(rr.prize * 100 AS SIGNED)
+        FROM Trainer t
+        JOIN Horse h ON h.stableId = t.stableId
+        JOIN RaceResults rr ON rr.horseId = h.horseId
+        WHERE rr.prize IS NOT NULL
+    """,
+    'stable': """
+        SELECT h.stableId, IFNULL(s.stableName, h.stableId), CAST(rr.prize * 100 AS SIGNED)
+        FROM Horse h
+        JOIN RaceResults rr ON rr.horseId = h.horseId
+        LEFT JOIN Stable s ON s.stableId = h.stableId
+        WHERE h.stableId IS NOT NULL AND rr.prize IS NOT NULL
+    """,
+    'track': """
+        SELECT r.trackName, r.trackName, CAST(rr.prize * 100 AS SIGNED)
+        FROM Race r
+        JOIN RaceResults rr ON rr.raceId = r.raceId
+        WHERE r.trackName IS NOT NULL AND rr.prize IS NOT NULL
+    """,
+}
+
+def load_prizes(connection, grouping):
+    """Return (group keys, {key: label}, cents) for every result under grouping
+
+    group keys is an object array and cents an int64 array of the same length.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(GROUPINGS[grouping])
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    keys = np.empty(len(rows), dtype=object)
+    keys[:] = [row[0] for row in rows]
+    labels = {row[0]: row[1] for row in rows}
+    cents = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+    return keys, labels, cents
+
+def summarize(keys, cents, percentiles=DEFAULT_PERCENTILES):
+    """Per-group statistics of cents, computed without a Python loop over rows
+
+    Returns a dict of equal-length arrays: 'key', 'count', 'total' (int64
+    cents), 'mean' and one 'p<N>' per percentile (float cents), with
+    percentiles interpolated linearly like numpy.percentile.
+    """
+    if len(cents) == 0:
+        empty = {'key': np.empty(0, dtype=object), 'count': np.empty(0, dtype=np.int64),
+                 'total': np.empty(0, dtype=np.int64), 'mean': np.empty(0)}
+        empty.update({f"p{p:g}": np.empty(0) for p in percentiles})
+        return empty
+
+    groups, group_of = np.unique(keys, return_inverse=True)
+    # Sort by group, then by amount within each group
+    order = np.lexsort((cents, group_of))
+    ordered = cents[order]
+    counts = np.bincount(group_of, minlength=len(groups))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    summary = {
+        'key': groups,
+        'count': counts,
+        'total': np.add.reduceat(ordered, starts),
+    }
+    summary['mean'] = summary['total'] / counts
+    for p in percentiles:
+        position = starts + (counts - 1) * (p / 100.0)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, starts + counts - 1)
+        fraction = position - below
+        summary[f"p{p:g}"] = ordered[below] + (ordered[above] - ordered[below]) * fraction
+    return summary
+
+def prize_summary(connection, grouping, percentiles=DEFAULT_PERCENTILES):
+    """summarize() the prizes of every trainer, stable or track, with a 'label' array added"""
+    keys, labels, cents = load_prizes(connection, grouping)
+    summary = summarize(keys, cents, percentiles)
+    summary['label'] = np.array([labels[key] for key in summary['key']], dtype=object)
+    return summary
+
+def to_rows(summary, order_by='total', descending=True, limit=None):
+    """Turn a summary into dicts with Decimal amounts, ready to format or export"""
+    order = np.argsort(summary[order_by], kind='stable')
+    if descending:
+        order = order[::-1]
+    if limit is not None:
+        order = order[:limit]
+    statistics = [name for name in summary if name not in ('key', 'label', 'count', 'total')]
+    rows = []
+    for i in order:
+        row = {
+            'key': summary['key'][i],
+            'label': summary['label'][i] if 'label' in summary else summary['key'][i],
+            'count': int(summary['count'][i]),
+            'total': Decimal(int(summary['total'][i])).scaleb(-2),
+        }
+        for name in statistics:
+            row[name] = Decimal(f"{summary[name][i] / 100:.2f}")
+        rows.append(row)
+    return rows
+
+def write_csv(rows, path):
+    """Write to_rows() output to a CSV file"""
+    if not rows:
+        fieldnames = ['key', 'label', 'count', 'total', 'mean']
+    else:
+        fieldnames = list(rows[0])
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv=None):
+    """Print or export prize statistics"""
+    parser = argparse.ArgumentParser(description="Prize money statistics per trainer, stable or track")
+    parser.add_argument('grouping', choices=sorted(GROUPINGS))
+    parser.add_argument('--percentiles', type=float, nargs='+', default=list(DEFAULT_PERCENTILES))
+    parser.add_argument('--top', type=int, default=20, help="rows to print (default 20)")
+    parser.add_argument('--csv', metavar='PATH', help="export every group to a CSV file")
+    args = parser.parse_args(argv)
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        summary = prize_summary(connection, args.grouping, args.percentiles)
+        connection.close()
+    except Error as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.csv:
+        write_csv(to_rows(summary), args.csv)
+        print(f"{len(summary['key'])} {args.grouping}s written to {args.csv}")
+        return 0
+
+    for row in to_rows(summary, limit=args.top):
+        figures = "  ".join(f"{name} ${value:,.2f}" for name, value in row.items()
+                            if name not in ('key', 'label', 'count'))
+        print(f"{row['label']:30} {row['count']:6} results  {figures}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Bulk race-card import for Horse Racing Database System
+Loads whole races (Race plus RaceResults rows) from CSV or JSON files
+
+CSV files have one row per result with the columns
+    raceId, raceName, trackName, raceDate, raceTime, horseId, position, prize
+JSON files hold a list of races (or {"races": [...]}), each with the race
+columns above and a "results" list of {horseId, position, prize} objects.
+
+Usage:
+    python race_import.py results.csv [more.json ...] [--chunk-size N] [--dry-run]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from data_access.errors import ConstraintViolation, DataAccessError, InvalidData
+from data_access.repositories import RACE_INSERT, RESULTS_INSERT, Repositories
+from data_access.validation import check_race_when, parse_position, parse_prize
+
+RACE_COLUMNS = ('raceId', 'raceName', 'trackName', 'raceDate', 'raceTime')
+RESULT_COLUMNS = ('horseId', 'position', 'prize')
+
+class ImportReport:
+    """Counts and per-row problems collected during an import"""
+    def __init__(self):
+        self.races_loaded = 0
+        self.results_loaded = 0
+        self.races_rejected = 0
+        self.results_rejected = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def reject(self, source, reason, races=0, results=0):
+        self.errors.append(f"{source}: {reason}")
+        self.races_rejected += races
+        self.results_rejected += results
+
+    @property
+    def rows_per_second(self):
+        rows = self.races_loaded + self.results_loaded
+        return rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self, max_errors=10):
+        lines = [
+            f"Loaded {self.races_loaded} races and {self.results_loaded} results "
+            f"in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/sec)",
+        ]
+        if self.errors:
+            lines.append(f"Rejected {self.races_rejected} races and {self.results_rejected} results:")
+            lines.extend(f"  {error}" for error in self.errors[:max_errors])
+            if len(self.errors) > max_errors:
+                lines.append(f"  ... and {len(self.errors) - max_errors} more")
+        return "\n".join(lines)
+
+class RaceCard:
+    """One race and its results as read from an import file"""
+    def __init__(self, source, race):
+        self.source = source
+        self.race = race
+        self.results = []  # (source, horseId, position, prize)
+
+def read_csv(path, report):
+    """Group CSV result rows into race cards by raceId
+
+    Every row of a race must repeat the same race details; a race whose rows
+    disagree is rejected whole, with an error for each disagreeing row.
+    """
+    cards = {}
+    conflicting = set()
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [col for col in RACE_COLUMNS + RESULT_COLUMNS if col not in (reader.fieldnames or [])]
+        if missing:
+            report.reject(path, f"missing columns {', '.join(missing)}")
+            return []
+        for row in reader:
+            source = f"{os.path.basename(path)}:{reader.line_num}"
+            race_id = (row['raceId'] or '').strip()
+            if not race_id:
+                report.reject(source, "missing raceId", results=1)
+                continue
+            card = cards.get(race_id)
+            if card is None:
+                card = cards[race_id] = RaceCard(source, {col: row[col] for col in RACE_COLUMNS})
+            else:
+                differences = []
+                for col in RACE_COLUMNS[1:]:
+                    value, first = (row[col] or '').strip(), (card.race[col] or '').strip()
+                    if value != first:
+                        differences.append(f"{col} '{value}' differs from '{first}' at {card.source}")
+                if differences:
+                    report.reject(source, f"race {race_id}: " + "; ".join(differences), results=1)
+                    conflicting.add(race_id)
+                    continue
+            card.results.append((source, row['horseId'], row['position'], row['prize']))
+
+    for race_id in conflicting:
+        card = cards.pop(race_id)
+        report.reject(card.source, f"race {race_id} rejected: its rows disagree on the race details",
+                      races=1, results=len(card.results))
+    return list(cards.values())
+
+def read_json(path, report):
+    """Read race cards from a JSON list of races"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('races', [])
+    cards = []
+    for index, race in enumerate(data):
+        source = f"{os.path.basename(path)}[{index}]"
+        if not isinstance(race, dict):
+            report.reject(source, "race entry is not an object", races=1)
+            continue
+        card = RaceCard(source, {col: race.get(col) for col in RACE_COLUMNS})
+        for result_index, result in enumerate(race.get('results') or []):
+            result_source = f"{source}.results[{result_index}]"
+            if not isinstance(result, dict):
+                report.reject(result_source, "result entry is not an object", results=1)
+                continue
+            card.results.append((result_source, result.get('horseId'), result.get('position'), result.get('prize')))
+        cards.append(card)
+    return cards
+
+def read_race_cards(path, report):
+    """Read race cards from a CSV or JSON file, chosen by extension"""
+    if path.lower().endswith('.json'):
+        return read_json(path, report)
+    return read_csv(path, report)
+
+def validate_card(card, report):
+    """Normalise one card in place; returns False if the whole race must be rejected"""
+    race = card.race
+    for col in RACE_COLUMNS:
+        race[col] = str(race[col]).strip() if race[col] is not None else ''
+        if not race[col]:
+            report.reject(card.source, f"race is missing {col}", races=1, results=len(card.results))
+            return False
+    try:
+        check_race_when(race['raceDate'], race['raceTime'])
+    except ValueError as e:
+        report.reject(card.source, str(e), races=1, results=len(card.results))
+        return False
+
+    results = []
+    seen = set()
+    for source, horse_id, position, prize in card.results:
+        horse_id = str(horse_id).strip() if horse_id is not None else ''
+        try:
+            if not horse_id:
+                raise ValueError("missing horseId")
+            if horse_id in seen:
+                raise ValueError(f"horse {horse_id} listed twice in race {race['raceId']}")
+            position = parse_position(position)
+            prize = parse_prize(prize)
+        except (TypeError, ValueError) as e:
+            report.reject(source, str(e), results=1)
+            continue
+        seen.add(horse_id)
+        results.append((source, horse_id, position, prize))
+    card.results = results
+    if not results:
+        report.reject(card.source, f"race {race['raceId']} has no valid results", races=1)
+        return False
+    return True
+
+def check_references(repos, cards, report):
+    """Drop results for unknown horses and races with unknown tracks or duplicate ids"""
+    horses = repos.horses.existing(horse_id for card in cards for _, horse_id, _, _ in card.results)
+    tracks = repos.tracks.existing(card.race['trackName'] for card in cards)
+    existing_races = repos.races.existing(card.race['raceId'] for card in cards)
+
+    valid = []
+    for card in cards:
+        race_id = card.race['raceId']
+        if race_id in existing_races:
+            report.reject(card.source, f"race {race_id} already exists", races=1, results=len(card.results))
+            continue
+        if card.race['trackName'] not in tracks:
+            report.reject(card.source, f"track '{card.race['trackName']}' not found",
+                          races=1, results=len(card.results))
+            continue
+        results = []
+        for result in card.results:
+            if result[1] in horses:
+                results.append(result)
+            else:
+                report.reject(result[0], f"horse '{result[1]}' not found", results=1)
+        if not results:
+            report.reject(card.source, f"race {race_id} has no valid results", races=1)
+            continue
+        card.results = results
+        valid.append(card)
+    return valid
+
+def insert_statements(cards):
+    """The (query, params) pairs inserting cards: one multi-row INSERT per table"""
+    return [
+        (RACE_INSERT, [tuple(card.race[col] for col in RACE_COLUMNS) for card in cards]),
+        (RESULTS_INSERT, [(card.race['raceId'], horse_id, position, prize)
+                          for card in cards for _, horse_id, position, prize in card.results]),
+    ]
+
+def load_chunk(repos, cards, report, dry_run=False):
+    """Validate and insert one chunk in one transaction
+
+    A chunk rejected for its data is retried race by race, so only the
+    offending races are lost; any other failure is raised.
+    """
+    cards = check_references(repos, cards, report)
+    if not cards:
+        return
+    if not dry_run:
+        try:
+            repos.db_manager.execute_transaction(insert_statements(cards))
+        except (ConstraintViolation, InvalidData) as e:
+            if len(cards) == 1:
+                report.reject(cards[0].source, f"insert failed: {e}", races=1, results=len(cards[0].results))
+                return
+            # Isolate the offending race(s) without losing the rest of the chunk
+            for card in cards:
+                try:
+                    repos.db_manager.execute_transaction(insert_statements([card]))
+                except (ConstraintViolation, InvalidData) as e:
+                    report.reject(card.source, f"insert failed: {e}", races=1, results=len(card.results))
+                    continue
+                report.races_loaded += 1
+                report.results_loaded += len(card.results)
+            return
+    report.races_loaded += len(cards)
+    report.results_loaded += sum(len(card.results) for card in cards)
+
+def import_race_cards(db_manager, paths, chunk_size=500, dry_run=False, progress=None):
+    """Import race cards from files; returns an ImportReport
+
+    Races are committed in chunks of roughly chunk_size results, so a bad
+    row only costs its own race (or result) and never the whole batch.
+    Failures other than rejected rows (a lost connection, say) raise a
+    DataAccessError; chunks committed before it stay committed.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+
+    cards = []
+    for path in paths:
+        try:
+            cards.extend(read_race_cards(path, report))
+        except (OSError, ValueError, csv.Error) as e:
+            report.reject(path, f"cannot read file: {e}")
+    cards = [card for card in cards if validate_card(card, report)]
+
+    # Each committed chunk invalidates the cached reports it changes
+    repos = Repositories(db_manager)
+    chunk = []
+    chunk_results = 0
+    for card in cards:
+        chunk.append(card)
+        chunk_results += len(card.results)
+        if chunk_results >= chunk_size:
+            load_chunk(repos, chunk, report, dry_run)
+            if progress:
+                progress(report)
+            chunk = []
+            chunk_results = 0
+    if chunk:
+        load_chunk(repos, chunk, report, dry_run)
+        if progress:
+            progress(report)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+def main(argv=None):
+    """Command line entry point for headless imports"""
+    parser = argparse.ArgumentParser(description="Bulk import race cards from CSV or JSON files")
+    parser.add_argument('files', nargs='+', help="CSV or JSON race card files")
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help="results per transaction (default 500)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="validate against the database without inserting")
+    args = parser.parse_args(argv)
+
+    import database
+
+    def progress(report):
+        print(f"... {report.races_loaded} races, {report.results_loaded} results")
+
+    try:
+        report = import_race_cards(database.db_manager, args.files, args.chunk_size, args.dry_run, progress)
+    except DataAccessError as e:
+        print(f"Import failed: {e}")
+        return 1
+    print(report.summary(max_errors=50))
+    return 0 if not report.errors else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Report and lookup queries for Horse Racing Database System
+Shared by the guest/admin GUIs, the API server and the command line tools that check them
+"""
+
+import calendar
+
+# Rows fetched per page by the paged report views
+PAGE_SIZE = 200
+
+class PagedQuery:
+    """A report query read one keyset page at a time
+
+    sql holds an {after} marker where the key predicate goes and ends with
+    LIMIT %s. after compares the ORDER BY key with the last key already
+    shown, so each page is an index seek instead of an ever-growing OFFSET.
+    """
+    def __init__(self, sql, after, key):
+        self.sql = sql
+        self.after = after
+        self.key = key
+
+    def page(self, params=(), last_key=None, limit=PAGE_SIZE):
+        """Return (query, params) for the page following last_key (None for the first page)"""
+        if last_key is None:
+            return self.sql.format(after=""), tuple(params) + (limit,)
+        return self.sql.format(after=self.after), tuple(params) + tuple(last_key) + (limit,)
+
+    def key_of(self, row):
+        """The ordering key of a result row"""
+        return tuple(row[column] for column in self.key)
+
+# Guest: horses with their trainers, filtered by {match}
+HORSE_ROWS = """
+    SELECT h.horseName, h.age, h.gender, h.horseId,
+           CONCAT(t.fname, ' ', t.lname) as trainer_name,
+           IFNULL(t.trainerId, '') as trainer_key
+    FROM Horse h
+    LEFT JOIN Trainer t ON h.stableId = t.stableId
+    WHERE {match} {{after}}
+    ORDER BY h.horseName, h.horseId, trainer_key
+    LIMIT %s
+"""
+
+OWNER_MATCH = """EXISTS (
+        SELECT 1 FROM Owns o
+        JOIN Owner owner ON o.ownerId = owner.ownerId
+        WHERE o.horseId = h.horseId AND owner.lname {condition}
+    )"""
+
+def in_list(count):
+    """IN predicate with count placeholders"""
+    return "IN (" + ", ".join(["%s"] * count) + ")"
+
+def horses_matching(match):
+    """Paged horse list filtered by the SQL predicate match"""
+    return PagedQuery(HORSE_ROWS.format(match=match),
+                      "AND (h.horseName, h.horseId, IFNULL(t.trainerId, '')) > (%s, %s, %s)",
+                      ('horseName', 'horseId', 'trainer_key'))
+
+# Guest: browse horses by (part of) an owner's last name or horse name.
+# The LIKE forms scan; name_search.NameSearch resolves a substring to the
+# exact names it matches and uses the IN forms, which seek on idx_owner_lname
+# and idx_horse_name
+HORSES_BY_OWNER = horses_matching(OWNER_MATCH.format(condition="LIKE %s"))
+HORSES_BY_NAME = horses_matching("h.horseName LIKE %s")
+
+def horses_by_owner_names(count):
+    """Horses owned by anyone with one of count exact last names"""
+    return horses_matching(OWNER_MATCH.format(condition=in_list(count)))
+
+def horses_by_names(count):
+    """Horses with one of count exact names"""
+    return horses_matching("h.horseName " + in_list(count))
+
+# Guest: trainers whose horses won a race, newest first, filtered by {match};
+# {results} and {races} are the live tables or the history views that add
+# archived races (migrations/008_history_archive.py). Joining on raceDate as
+# well reads only the one partition of the race
+WINNING_TRAINER_ROWS = """
+    SELECT CONCAT(t.fname, ' ', t.lname) as trainer_name,
+           h.horseName as horse_name,
+           r.raceName,
+           tr.trackName,
+           r.raceDate,
+           rr.prize,
+           IFNULL(r.raceDate, DATE '1000-01-01') as sort_date,
+           rr.raceId, rr.horseId, t.trainerId
+    FROM Trainer t
+    JOIN Horse h ON h.stableId = t.stableId
+    JOIN {results} rr ON h.horseId = rr.horseId AND rr.position = 1
+    JOIN {races} r ON rr.raceId = r.raceId AND rr.raceDate = r.raceDate
+    JOIN Track tr ON r.trackName = tr.trackName
+    WHERE {match} {{after}}
+    ORDER BY sort_date DESC, rr.raceId DESC, rr.horseId DESC, t.trainerId DESC
+    LIMIT %s
+"""
+
+def winning_trainers_matching(match, history=False):
+    """Paged winning trainers filtered by the SQL predicate match, archived races included if history"""
+    results, races = ('race_results_history', 'race_history') if history else ('RaceResults', 'Race')
+    return PagedQuery(WINNING_TRAINER_ROWS.format(match=match, results=results, races=races),
+                      "AND (IFNULL(r.raceDate, DATE '1000-01-01'), rr.raceId, rr.horseId, t.trainerId) "
+                      "< (%s, %s, %s, %s)",
+                      ('sort_date', 'raceId', 'horseId', 'trainerId'))
+
+WINNING_TRAINERS = winning_trainers_matching("1 = 1")
+
+# The same for races between two dates; takes date_range_params(). Race and
+# RaceResults are partitioned by raceDate (migrations/007), and naming the
+# range on both tables lets MySQL read only the partitions it covers
+WINNING_TRAINERS_RANGE = winning_trainers_matching(
+    "rr.raceDate BETWEEN %s AND %s AND r.raceDate BETWEEN %s AND %s")
+
+# Both again with archiver.py's archived races; slower, since every archived
+# winner is read unless a range narrows it down
+WINNING_TRAINERS_HISTORY = winning_trainers_matching("1 = 1", history=True)
+WINNING_TRAINERS_HISTORY_RANGE = winning_trainers_matching(
+    "rr.raceDate BETWEEN %s AND %s AND r.raceDate BETWEEN %s AND %s", history=True)
+
+# Guest: total prize money and wins per trainer, read from the trainer_stats
+# summary that triggers keep current (migrations/002_trainer_stats.sql).
+# Races moved out by archiver.py are no longer counted; the _HISTORY forms
+# below sum them back in
+TRAINER_WINNINGS = PagedQuery("""
+    SELECT CONCAT(t.fname, ' ', t.lname) as trainer_name,
+           ts.totalPrize as total_winnings,
+           ts.numWins as num_wins,
+           s.stableName,
+           ts.trainerId
+    FROM trainer_stats ts
+    JOIN Trainer t ON t.trainerId = ts.trainerId
+    LEFT JOIN Stable s ON ts.stableId = s.stableId
+    WHERE 1 = 1 {after}
+    ORDER BY ts.totalPrize DESC, ts.trainerId DESC
+    LIMIT %s
+""", "AND (ts.totalPrize, ts.trainerId) < (%s, %s)",
+    ('total_winnings', 'trainerId'))
+
+# The same figures computed from the base tables, to check trainer_stats against
+TRAINER_WINNINGS_LIVE = """
+    SELECT t.trainerId,
+           IFNULL(SUM(rr.prize), 0) as total_winnings,
+           COUNT(CASE WHEN rr.position = 1 THEN 1 END) as num_wins
+    FROM Trainer t
+    LEFT JOIN Horse h ON h.stableId = t.stableId
+    LEFT JOIN RaceResults rr ON h.horseId = rr.horseId
+    GROUP BY t.trainerId
+"""
+
+# Guest: prize money and wins per trainer summed from the results in
+# {results} (RaceResults or the race_results_history view) matching {match}.
+# Trainers without such a result are left out
+TRAINER_WINNING_SUMS = """
+    SELECT CONCAT(t.fname, ' ', t.lname) as trainer_name,
+           w.total_winnings,
+           w.num_wins,
+           s.stableName,
+           t.trainerId
+    FROM (SELECT h.stableId,
+                 IFNULL(SUM(ROUND(rr.prize, 2)), 0) as total_winnings,
+                 COUNT(CASE WHEN rr.position = 1 THEN 1 END) as num_wins
+          FROM {results} rr
+          JOIN Horse h ON h.horseId = rr.horseId
+          WHERE {match}
+          GROUP BY h.stableId) w
+    JOIN Trainer t ON t.stableId = w.stableId
+    LEFT JOIN Stable s ON t.stableId = s.stableId
+    WHERE 1 = 1 {{after}}
+    ORDER BY w.total_winnings DESC, t.trainerId DESC
+    LIMIT %s
+"""
+
+def trainer_winnings_matching(match, history=False):
+    """Paged trainer winnings summed from results matching match, archived races included if history"""
+    results = 'race_results_history' if history else 'RaceResults'
+    return PagedQuery(TRAINER_WINNING_SUMS.format(results=results, match=match),
+                      "AND (w.total_winnings, t.trainerId) < (%s, %s)",
+                      ('total_winnings', 'trainerId'))
+
+# For races between two dates, summed from the partitions the range covers; takes month_days()
+TRAINER_WINNINGS_RANGE = trainer_winnings_matching("rr.raceDate BETWEEN %s AND %s")
+
+# Live and archived races, for every race or between two dates (month_days());
+# every archived result is read, so these are slow
+TRAINER_WINNINGS_HISTORY = trainer_winnings_matching("1 = 1", history=True)
+TRAINER_WINNINGS_HISTORY_RANGE = trainer_winnings_matching("rr.raceDate BETWEEN %s AND %s", history=True)
+
+# Guest: races and distinct horses per track, from the track_stats rollup
+# (migrations/003_track_rollups.sql). Like trainer_stats it counts live races only
+TRACK_STATS = PagedQuery("""
+    SELECT tr.trackName,
+           tr.location,
+           tr.length,
+           IFNULL(ts.numRaces, 0) as num_races,
+           IFNULL(ts.numHorses, 0) as total_horses
+    FROM Track tr
+    LEFT JOIN track_stats ts ON ts.trackName = tr.trackName
+    WHERE 1 = 1 {after}
+    ORDER BY tr.trackName
+    LIMIT %s
+""", "AND tr.trackName > %s",
+    ('trackName',))
+
+# Guest: the same for races between two dates; takes (first day, last day,
+# first month, last month) where months are first-of-month dates, since
+# distinct horses are only bucketed by month
+TRACK_STATS_RANGE = PagedQuery("""
+    SELECT tr.trackName,
+           tr.location,
+           tr.length,
+           IFNULL((SELECT SUM(d.numRaces) FROM track_daily d
+                   WHERE d.trackName = tr.trackName AND d.raceDay BETWEEN %s AND %s), 0) as num_races,
+           (SELECT COUNT(DISTINCT m.horseId) FROM track_horse_monthly m
+            WHERE m.trackName = tr.trackName AND m.month BETWEEN %s AND %s) as total_horses
+    FROM Track tr
+    WHERE 1 = 1 {after}
+    ORDER BY tr.trackName
+    LIMIT %s
+""", "AND tr.trackName > %s",
+    ('trackName',))
+
+# Guest: races and distinct horses per track counted from the race_history
+# and race_results_history views, so archived races are included; {match}
+# filters the races. Every archived race is read, so these are slow
+TRACK_STAT_HISTORY_ROWS = """
+    SELECT tr.trackName,
+           tr.location,
+           tr.length,
+           IFNULL(c.num_races, 0) as num_races,
+           IFNULL(c.total_horses, 0) as total_horses
+    FROM Track tr
+    LEFT JOIN (SELECT r.trackName,
+                      COUNT(DISTINCT r.raceId) as num_races,
+                      COUNT(DISTINCT rr.horseId) as total_horses
+               FROM race_history r
+               LEFT JOIN race_results_history rr ON rr.raceId = r.raceId AND rr.raceDate = r.raceDate
+               WHERE {match}
+               GROUP BY r.trackName) c ON c.trackName = tr.trackName
+    WHERE 1 = 1 {{after}}
+    ORDER BY tr.trackName
+    LIMIT %s
+"""
+
+TRACK_STATS_HISTORY = PagedQuery(TRACK_STAT_HISTORY_ROWS.format(match="1 = 1"), "AND tr.trackName > %s",
+                                 ('trackName',))
+# Between two dates; takes month_days()
+TRACK_STATS_HISTORY_RANGE = PagedQuery(TRACK_STAT_HISTORY_ROWS.format(match="r.raceDate BETWEEN %s AND %s"),
+                                       "AND tr.trackName > %s", ('trackName',))
+
+def month_days(first, last):
+    """(first day, last day) of the months of the dates first through last"""
+    last = last.replace(day=calendar.monthrange(last.year, last.month)[1])
+    return (first.replace(day=1), last)
+
+def track_stats_range_params(first, last):
+    """TRACK_STATS_RANGE parameters covering the months of the dates first through last"""
+    first_day, last_day = month_days(first, last)
+    return (first_day, last_day, first_day, last.replace(day=1))
+
+def date_range_params(first, last):
+    """WINNING_TRAINERS_RANGE parameters covering the months of the dates first through last"""
+    return month_days(first, last) * 2
+
+# Admin: horse details shown on the Move Horse tab
+HORSE_INFO = """
+    SELECT h.horseName, h.age, h.gender, s.stableName
+    FROM Horse h
+    LEFT JOIN Stable s ON h.stableId = s.stableId
+    WHERE h.horseId = %s
+"""
+
+# name -> (query, sample parameters) for tools that run every report;
+# paged reports are checked on their first page
+REPORTS = {
+    'horses_by_owner': HORSES_BY_OWNER.page(('%a%',)),
+    'horses_by_owner_names': horses_by_owner_names(2).page(('Smith', 'Jones')),
+    'horses_by_name': HORSES_BY_NAME.page(('%a%',)),
+    'horses_by_names': horses_by_names(2).page(('Thunder', 'Lightning')),
+    'winning_trainers': WINNING_TRAINERS.page(),
+    'winning_trainers_range': WINNING_TRAINERS_RANGE.page(('2024-01-01', '2024-12-31') * 2),
+    'winning_trainers_history_range': WINNING_TRAINERS_HISTORY_RANGE.page(('2014-01-01', '2014-12-31') * 2),
+    'trainer_winnings': TRAINER_WINNINGS.page(),
+    'trainer_winnings_range': TRAINER_WINNINGS_RANGE.page(('2024-01-01', '2024-12-31')),
+    'track_stats': TRACK_STATS.page(),
+    'track_stats_range': TRACK_STATS_RANGE.page(('2024-01-01', '2024-12-31', '2024-01-01', '2024-12-01')),
+    'trainer_winnings_history_range': TRAINER_WINNINGS_HISTORY_RANGE.page(('2014-01-01', '2014-12-31')),
+    'track_stats_history_range': TRACK_STATS_HISTORY_RANGE.page(('2014-01-01', '2014-12-31')),
+    'horse_info': (HORSE_INFO, ('horse1',)),
+}
@@ -3,77 +3,36 @@ Database Setup Script for Horse Racing Database System
 Creates the Horses database and sets up all tables with sample data
 """
 
+import sys
 import mysql.connector
 from mysql.connector import Error
 import tkinter as tk
 from tkinter import messagebox
-import re
+from bulk_loader import BulkLoader
+from sql_script import iter_statements, drop_statement
+from migrate import apply_migrations, is_initialized
 
 def execute_sql_file(cursor, filename):
-    """Execute SQL statements from a file"""
-    with open(filename, 'r') as f:
-        content = f.read()
-    
-    # Special handling for procedures_triggers.sql
-    if 'procedures_triggers' in filename:
-        # For procedures and triggers, we need special handling
-        # Split by CREATE PROCEDURE or CREATE TRIGGER
-        import re
-        
-        # Remove comments
-        lines = []
-        for line in content.split('\n'):
-            line = re.sub(r'--.*', '', line).strip()
-            if line:
-                lines.append(line)
-        content = ' '.join(lines)
-        
-        # Split by CREATE statements
-        parts = re.split(r'(CREATE\s+(?:PROCEDURE|TRIGGER))', content, flags=re.IGNORECASE)
-        
-        statements = []
-        for i in range(1, len(parts), 2):
-            if i+1 < len(parts):
-                # Combine CREATE keyword with the procedure/trigger definition
-                stmt = parts[i] + parts[i+1]
-                # Find the END; to properly terminate
-                end_pos = stmt.find('END;')
-                if end_pos != -1:
-                    stmt = stmt[:end_pos+4]  # Include END;
-                    statements.append(stmt.strip())
-        
-        for statement in statements:
-            if statement:
-                try:
-                    cursor.execute(statement)
-                    print(f"Executed: {statement[:50]}...")
-                except Error as e:
-                    print(f"Error executing: {statement[:50]}... - {e}")
-                    raise
-    else:
-        # Regular SQL file handling
-        # Remove comments and split by semicolon
-        statements = []
-        for line in content.split('\n'):
-            # Remove comments
-            line = re.sub(r'--.*', '', line).strip()
-            if line:
-                statements.append(line)
-        
-        # Join and split by semicolon
-        full_sql = ' '.join(statements)
-        sql_statements = [stmt.strip() for stmt in full_sql.split(';') if stmt.strip()]
-        
-        for statement in sql_statements:
-            if statement:
-                try:
-                    cursor.execute(statement)
-                except Error as e:
-                    print(f"Error executing: {statement[:50]}... - {e}")
-                    raise
+    """Execute SQL statements from a file, streaming them one at a time"""
+    for statement in iter_statements(filename):
+        try:
+            # Stored programs are replaced rather than failing because they already exist
+            drop = drop_statement(statement)
+            if drop:
+                cursor.execute(drop)
+            cursor.execute(statement)
+            if drop:
+                print(f"Executed: {statement[:50]}...")
+        except Error as e:
+            print(f"Error executing: {statement[:50]}... - {e}")
+            raise
+
+def create_database_and_setup(reset=False):
+    """Create database and setup all tables with data
 
-def create_database_and_setup():
-    """Create database and setup all tables with data"""
+    If the tables already exist only pending migrations are applied, unless
+    reset is True, so rerunning setup never wipes a live database by accident.
+    """
     try:
         # Connect to MySQL server without specifying database
         print("Connecting to MySQL server...")
@@ -97,16 +56,26 @@ def create_database_and_setup():
             # Switch to Horses database
             cursor.execute("USE Horses")
             
+            if not reset and is_initialized(cursor):
+                print("Database already set up; applying pending schema migrations only...")
+                print("(run with --reset to drop and reload everything)")
+                applied = apply_migrations(connection)
+                print(f"Applied {len(applied)} migration(s); database is up to date.")
+                cursor.close()
+                connection.close()
+                return True
+            
             # Execute schema
             print("Setting up database schema...")
             execute_sql_file(cursor, 'database_schema.sql')
             connection.commit()
             print("Schema created successfully!")
             
-            # Execute sample data
+            # Load sample data in multi-row batches with checks relaxed
             print("Inserting sample data...")
-            execute_sql_file(cursor, 'sample_data.sql')
-            connection.commit()
+            with BulkLoader(connection) as loader:
+                loader.load_statements(iter_statements('sample_data.sql'))
+            print(loader.report.summary())
             print("Sample data inserted successfully!")
             
             # Execute procedures/triggers
@@ -115,6 +84,10 @@ def create_database_and_setup():
             connection.commit()
             print("Procedures and triggers created successfully!")
             
+            # Bring the fresh schema up to the latest version
+            print("Applying schema migrations...")
+            apply_migrations(connection)
+            
             # Verify tables were created
             cursor.execute("SHOW TABLES")
             tables = cursor.fetchall()
@@ -138,7 +111,7 @@ def main():
     root = tk.Tk()
     root.withdraw()  # Hide the main window
     
-    if create_database_and_setup():
+    if create_database_and_setup(reset='--reset' in sys.argv[1:]):
         messagebox.showinfo("Success", "Database setup completed successfully!\n\nYou can now run the main application.")
     else:
         messagebox.showerror("Error", "Database setup failed. Please check the console for details.")
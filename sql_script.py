@@ -0,0 +1,206 @@
+"""
+Streaming SQL script parser for Horse Racing Database System
+Splits schema, data and procedure files into statements without loading them whole
+
+Understands quoted strings and identifiers, --, # and /* */ comments
+(/*! ... */ version comments and /*+ ... */ hints are kept), DELIMITER
+directives, and BEGIN ... END compound statements in procedures, functions,
+triggers and events, so files written for the mysql client run unchanged.
+"""
+
+import re
+
+# Keywords that, right after CREATE [OR REPLACE] [DEFINER=...], start a stored program
+ROUTINE_KINDS = ('PROCEDURE', 'FUNCTION', 'TRIGGER', 'EVENT')
+
+# CREATE ... kinds that can never contain a compound statement
+PLAIN_KINDS = ('TABLE', 'VIEW', 'INDEX', 'UNIQUE', 'FULLTEXT', 'SPATIAL', 'DATABASE', 'SCHEMA',
+               'USER', 'ROLE', 'TEMPORARY', 'TABLESPACE', 'SERVER', 'ALGORITHM', 'SQL')
+
+# Words following END that close an IF/LOOP/WHILE/REPEAT rather than a BEGIN or CASE
+END_QUALIFIERS = ('IF', 'LOOP', 'WHILE', 'REPEAT')
+
+DELIMITER_LINE = re.compile(r"^\s*DELIMITER\s+(\S+)\s*$", re.IGNORECASE)
+
+QUOTE_END = {
+    "'": re.compile(r"(?:[^'\\]|\\.)*'", re.DOTALL),
+    '"': re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL),
+    '`': re.compile(r"[^`]*`"),
+}
+
+ROUTINE_HEADER = re.compile(
+    r"^\s*CREATE\s+(?:OR\s+REPLACE\s+)?(?:DEFINER\s*=\s*\S+\s+)?"
+    r"(PROCEDURE|FUNCTION|TRIGGER|EVENT)\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?",
+    re.IGNORECASE
+)
+
+def routine_name(statement):
+    """Return (kind, name) for CREATE PROCEDURE/FUNCTION/TRIGGER/EVENT statements, else None"""
+    match = ROUTINE_HEADER.match(statement)
+    if match is None:
+        return None
+    return match.group(1).upper(), match.group(2)
+
+def drop_statement(statement):
+    """Return a DROP ... IF EXISTS for a CREATE PROCEDURE/FUNCTION/TRIGGER/EVENT, so it can be re-run"""
+    routine = routine_name(statement)
+    if routine is None:
+        return None
+    kind, name = routine
+    return f"DROP {kind} IF EXISTS `{name}`"
+
+class StatementSplitter:
+    """Incremental splitter: feed it lines, collect complete statements as they close"""
+    def __init__(self, delimiter=';'):
+        self.set_delimiter(delimiter)
+        self._quote = None
+        self._quote_end = None
+        self._comment = None  # 'skip' for ordinary comments, 'keep' for /*! */ and /*+ */
+        self._reset()
+
+    def set_delimiter(self, delimiter):
+        self.delimiter = delimiter
+        tokens = [re.escape(delimiter), r"['\"`]", r"--(?=\s|$)", r"#", r"/\*[!+]?"]
+        self._scanner = re.compile("|".join(tokens))
+        self._word_scanner = re.compile("|".join(tokens + [r"[A-Za-z0-9_]+"]))
+
+    def _reset(self):
+        self._parts = []
+        self._header = []
+        self._header_done = False
+        self._compound = False
+        self._depth = 0
+        self._pending_end = False
+
+    def _is_blank(self):
+        return not any(part.strip() for part in self._parts)
+
+    def _take(self):
+        statement = "".join(self._parts).strip()
+        self._reset()
+        return statement
+
+    def feed(self, line):
+        """Consume one line of input, yielding any statements it completes"""
+        if self._quote is None and self._comment is None and self._is_blank():
+            match = DELIMITER_LINE.match(line)
+            if match:
+                self._parts = []
+                self.set_delimiter(match.group(1))
+                return
+
+        pos = 0
+        end = len(line)
+        parts = self._parts
+        while pos < end:
+            if self._quote is not None:
+                match = self._quote_end.match(line, pos)
+                if match is None:
+                    parts.append(line[pos:])
+                    return
+                parts.append(line[pos:match.end()])
+                pos = match.end()
+                self._quote = None
+                continue
+
+            if self._comment is not None:
+                close = line.find('*/', pos)
+                if close < 0:
+                    if self._comment == 'keep':
+                        parts.append(line[pos:])
+                    return
+                if self._comment == 'keep':
+                    parts.append(line[pos:close + 2])
+                pos = close + 2
+                self._comment = None
+                continue
+
+            # Words only matter while identifying a statement or inside a stored program body
+            scanner = self._word_scanner if (self._compound or not self._header_done) else self._scanner
+            match = scanner.search(line, pos)
+            if match is None:
+                parts.append(line[pos:])
+                return
+            parts.append(line[pos:match.start()])
+            token = match.group()
+            pos = match.end()
+
+            if token == self.delimiter:
+                if self.delimiter == ';':
+                    self._resolve_end(None)
+                    if self._depth > 0:
+                        parts.append(token)
+                        continue
+                statement = self._take()
+                parts = self._parts
+                if statement:
+                    yield statement
+            elif token in QUOTE_END:
+                self._quote = token
+                self._quote_end = QUOTE_END[token]
+                parts.append(token)
+            elif token.startswith('--') or token == '#':
+                parts.append('\n')
+                return
+            elif token.startswith('/*'):
+                if token == '/*':
+                    self._comment = 'skip'
+                    parts.append(' ')
+                else:
+                    self._comment = 'keep'
+                    parts.append(token)
+            else:
+                parts.append(token)
+                self._on_word(token.upper())
+
+    def finish(self):
+        """Flush a final statement that has no trailing delimiter"""
+        statement = self._take()
+        self._quote = None
+        self._comment = None
+        if statement:
+            yield statement
+
+    def _on_word(self, word):
+        if not self._header_done:
+            self._header.append(word)
+            if self._header[0] != 'CREATE' or word in PLAIN_KINDS or len(self._header) > 12:
+                self._header_done = True
+            elif word in ROUTINE_KINDS:
+                self._header_done = True
+                self._compound = True
+            return
+        if not self._compound:
+            return
+        if self._resolve_end(word):
+            return
+        if word in ('BEGIN', 'CASE'):
+            self._depth += 1
+        elif word == 'END':
+            self._pending_end = True
+
+    def _resolve_end(self, word):
+        """Settle whether a preceding END closed a block; True if word was consumed by it"""
+        if not self._pending_end:
+            return False
+        self._pending_end = False
+        if word in END_QUALIFIERS:
+            return True
+        self._depth -= 1
+        return word == 'CASE'
+
+def iter_statements(source, delimiter=';'):
+    """Lazily yield the statements of a SQL script
+
+    source may be a filename or an open text file; the file is read line by
+    line so memory use is bounded by the largest single statement.
+    """
+    if isinstance(source, str):
+        with open(source, 'r') as f:
+            yield from iter_statements(f, delimiter)
+        return
+
+    splitter = StatementSplitter(delimiter)
+    for line in source:
+        yield from splitter.feed(line)
+    yield from splitter.finish()
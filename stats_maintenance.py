@@ -0,0 +1,160 @@
+"""
+Summary table maintenance for Horse Racing Database System
+Checks the trigger-maintained summaries (trainer_stats and the track
+rollups) against live aggregates over the base tables and rebuilds them
+when they disagree
+
+Usage:
+    python stats_maintenance.py --check      report rows whose totals drifted
+    python stats_maintenance.py --rebuild    recompute every summary from scratch
+"""
+
+import argparse
+import sys
+from decimal import Decimal
+import mysql.connector
+from mysql.connector import Error
+import report_queries
+
+# Live aggregates over Race/RaceResults matching each track rollup, keyed like the rollup
+TRACK_STATS_LIVE = """
+    SELECT r.trackName, COUNT(DISTINCT r.raceId), COUNT(DISTINCT rr.horseId)
+    FROM Race r
+    LEFT JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName IS NOT NULL
+    GROUP BY r.trackName
+"""
+
+TRACK_DAILY_LIVE = """
+    SELECT r.trackName, rollup_day(r.raceDate), COUNT(DISTINCT r.raceId), COUNT(rr.horseId)
+    FROM Race r
+    LEFT JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName IS NOT NULL
+    GROUP BY r.trackName, rollup_day(r.raceDate)
+"""
+
+TRACK_HORSE_MONTHLY_LIVE = """
+    SELECT r.trackName, rollup_month(r.raceDate), rr.horseId, COUNT(*)
+    FROM Race r
+    JOIN RaceResults rr ON rr.raceId = r.raceId
+    WHERE r.trackName IS NOT NULL
+    GROUP BY r.trackName, rollup_month(r.raceDate), rr.horseId
+"""
+
+# rollup table -> (stored rows query, live query, number of key columns)
+TRACK_ROLLUPS = {
+    'track_stats': ("SELECT trackName, numRaces, numHorses FROM track_stats", TRACK_STATS_LIVE, 1),
+    'track_daily': ("SELECT trackName, raceDay, numRaces, numResults FROM track_daily", TRACK_DAILY_LIVE, 2),
+    'track_horse_monthly': ("SELECT trackName, month, horseId, numResults FROM track_horse_monthly",
+                            TRACK_HORSE_MONTHLY_LIVE, 3),
+}
+
+def rebuild_trainer_stats(connection):
+    """Recompute every row of trainer_stats in one transaction"""
+    cursor = connection.cursor()
+    try:
+        cursor.callproc('RebuildTrainerStats')
+        connection.commit()
+    finally:
+        cursor.close()
+
+def check_trainer_stats(connection):
+    """Return (trainerId, expected, stored) for every trainer whose summary is wrong
+
+    expected and stored are (total prize, wins) pairs; stored is None for a
+    missing row. Rows left over for deleted trainers are reported with
+    expected None.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(report_queries.TRAINER_WINNINGS_LIVE)
+        expected = {row[0]: (Decimal(row[1]).quantize(Decimal('0.01')), int(row[2]))
+                    for row in cursor.fetchall()}
+        cursor.execute("SELECT trainerId, totalPrize, numWins FROM trainer_stats")
+        stored = {row[0]: (Decimal(row[1]), int(row[2])) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    drift = []
+    for trainer_id in sorted(set(expected) | set(stored)):
+        if expected.get(trainer_id) != stored.get(trainer_id):
+            drift.append((trainer_id, expected.get(trainer_id), stored.get(trainer_id)))
+    return drift
+
+def rebuild_track_stats(connection):
+    """Recompute the three track rollups in one transaction"""
+    cursor = connection.cursor()
+    try:
+        cursor.callproc('RebuildTrackStats')
+        connection.commit()
+    finally:
+        cursor.close()
+
+def _keyed(rows, key_columns):
+    """{key: counts} with the string parts of the key folded like the column collation"""
+    keyed = {}
+    for row in rows:
+        key = tuple(value.lower() if isinstance(value, str) else value for value in row[:key_columns])
+        counts = tuple(int(value) for value in row[key_columns:])
+        # Buckets whose counts dropped to zero are as good as missing
+        if any(counts):
+            keyed[key] = counts
+    return keyed
+
+def check_track_stats(connection):
+    """Return {rollup table: [(key, expected, stored), ...]} for rows that disagree with the live aggregate"""
+    cursor = connection.cursor()
+    drift = {}
+    try:
+        for table, (stored_query, live_query, key_columns) in TRACK_ROLLUPS.items():
+            cursor.execute(live_query)
+            expected = _keyed(cursor.fetchall(), key_columns)
+            cursor.execute(stored_query)
+            stored = _keyed(cursor.fetchall(), key_columns)
+            drift[table] = [
+                (key, expected.get(key), stored.get(key))
+                for key in sorted(set(expected) | set(stored), key=str)
+                if expected.get(key) != stored.get(key)
+            ]
+    finally:
+        cursor.close()
+    return drift
+
+def main(argv=None):
+    """Check or rebuild the summary tables"""
+    parser = argparse.ArgumentParser(description="Check or rebuild the trainer and track summary tables")
+    parser.add_argument('--check', action='store_true', help="compare the summaries with the base tables")
+    parser.add_argument('--rebuild', action='store_true', help="recompute the summaries from scratch")
+    args = parser.parse_args(argv)
+    if not (args.check or args.rebuild):
+        parser.error("choose --check and/or --rebuild")
+
+    try:
+        connection = mysql.connector.connect(
+            host="127.0.0.1",
+            user="root",
+            password="Asd11011",
+            database="Horses"
+        )
+        status = 0
+        if args.check:
+            drift = {'trainer_stats': check_trainer_stats(connection)}
+            drift.update(check_track_stats(connection))
+            for table, rows in drift.items():
+                for key, expected, stored in rows[:20]:
+                    print(f"{table} {key}: expected {expected}, stored {stored}")
+                print(f"{table}: {len(rows)} row(s) out of sync")
+            if any(drift.values()) and not args.rebuild:
+                status = 1
+        if args.rebuild:
+            rebuild_trainer_stats(connection)
+            rebuild_track_stats(connection)
+            print("trainer_stats and track rollups rebuilt")
+        connection.close()
+        return status
+    except Error as e:
+        print(f"Error: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
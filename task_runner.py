@@ -0,0 +1,178 @@
+"""
+Background task runner for Horse Racing Database System
+Runs database calls on a thread pool so the Tk event loop never blocks;
+results come back to the main thread through root.after polling, where it
+is safe to touch widgets and show message boxes
+"""
+
+import logging
+import queue
+import tkinter as tk
+from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+from data_access.instrumentation import call_site, caller_site
+
+logger = logging.getLogger(__name__)
+
+# How often the main loop checks for finished tasks while any are running
+POLL_MS = 50
+
+class Task:
+    """Handle for submitted work; cancel() drops its result if it is no longer wanted"""
+    def __init__(self, key, on_success, on_error, spinner, site=None, busy=None):
+        self.key = key
+        self.on_success = on_success
+        self.on_error = on_error
+        self.spinner = spinner
+        self.site = site
+        self.busy = busy
+        self.cancelled = False
+
+    def cancel(self):
+        """Mark the task stale; a query already sent still runs, but its callbacks never fire"""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.release()
+
+    def release(self):
+        """Stop the spinner and re-enable the busy widget"""
+        if self.spinner is not None:
+            self.spinner.stop()
+            self.spinner = None
+        if self.busy is not None:
+            try:
+                self.busy.config(state=tk.NORMAL)
+            except tk.TclError:
+                pass  # its window was closed meanwhile
+            self.busy = None
+
+class TaskRunner:
+    """Thread pool for database work, delivering results on the Tk main thread"""
+    def __init__(self, root, max_workers=4, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-task")
+        self._done = queue.Queue()
+        self._latest = {}
+        self._running = set()
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, func, *args, on_success=None, on_error=None, key=None, spinner=None, site=None, busy=None):
+        """Run func(*args) in the background
+
+        on_success(result) or on_error(exception) is called on the main thread.
+        Submitting again with the same key cancels the earlier task, so only
+        the newest search updates the screen. spinner, if given, animates
+        until the task finishes. busy, if given, is a widget (e.g. the Save
+        button) disabled until then, so a second click can't repeat a write.
+        Statements func runs are timed under site, by default the method that
+        called submit (e.g. GuestGUI.search_horses).
+        """
+        if key is not None and key in self._latest:
+            self._latest[key].cancel()
+        task = Task(key, on_success, on_error, spinner, site or caller_site(), busy)
+        self._running.add(task)
+        if key is not None:
+            self._latest[key] = task
+        if spinner is not None:
+            spinner.start()
+        if busy is not None:
+            busy.config(state=tk.DISABLED)
+
+        self._pending += 1
+        self.executor.submit(self._run, task, func, args)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return task
+
+    def cancel(self, key):
+        """Cancel the newest task submitted with key, if it is still running"""
+        task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        """Cancel every running task, e.g. before the window showing their results closes"""
+        for task in list(self._running):
+            task.cancel()
+        self._latest.clear()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    def _run(self, task, func, args):
+        # Runs on a worker thread: never touch Tk from here
+        if task.cancelled:
+            self._done.put((task, None, None))
+            return
+        try:
+            with call_site(task.site):
+                result = func(*args)
+            self._done.put((task, result, None))
+        except Exception as e:
+            self._done.put((task, None, e))
+
+    def _poll(self):
+        while True:
+            try:
+                task, result, error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._finish(task, result, error)
+
+        if self._pending > 0:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _finish(self, task, result, error):
+        self._running.discard(task)
+        if self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        if task.cancelled:
+            return
+        task.release()
+        if error is not None:
+            logger.error("Background task failed: %s", error, exc_info=error)
+            if task.on_error is not None:
+                task.on_error(error)
+            else:
+                messagebox.showerror("Error", f"{error}")
+        elif task.on_success is not None:
+            task.on_success(result)
+
+class Spinner:
+    """A label that animates while any task using it is running"""
+    FRAMES = "|/-\\"
+
+    def __init__(self, parent, text="Working", **label_options):
+        self.label = tk.Label(parent, text="", **label_options)
+        self.text = text
+        self._active = 0
+        self._frame = 0
+        self._job = None
+
+    def pack(self, **kwargs):
+        self.label.pack(**kwargs)
+
+    def start(self):
+        self._active += 1
+        if self._active == 1:
+            self._animate()
+
+    def stop(self):
+        self._active = max(self._active - 1, 0)
+        if self._active == 0 and self._job is not None:
+            self.label.after_cancel(self._job)
+            self._job = None
+            self.label.config(text="")
+
+    def _animate(self):
+        self.label.config(text=f"{self.FRAMES[self._frame % len(self.FRAMES)]} {self.text}...")
+        self._frame += 1
+        self._job = self.label.after(120, self._animate)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar snapshot and its group-by reports (analytics_snapshot.py)
+Run with: python -m unittest test_analytics_snapshot
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+try:
+    import analytics_snapshot
+    from analytics_snapshot import (Snapshot, track_stats, trainer_winnings, win_rate_by_track_and_age,
+                                    winning_trainers)
+except ImportError as e:
+    raise unittest.SkipTest(f"analytics_snapshot needs numpy and mysql-connector-python: {e}")
+
+class FakeDatabase:
+    """The tables the snapshot reads, as lists of row tuples in query column order"""
+    def __init__(self):
+        self.stables = [('s1', 'Oak Stable'), ('s2', 'Elm Stable')]
+        self.tracks = [('Epsom', 'Surrey', 2400), ('Ascot', 'Berkshire', None)]
+        self.trainers = [('t1', 'Ann Lee', 's1'), ('t2', 'Bob Ray', 's1'), ('t3', 'Cy Fox', 's2'),
+                         ('t4', 'Di Moor', None)]
+        self.horses = [('h1', 'Thunder', 3, 'M', 's1'), ('h2', 'Comet', 4, 'F', 's2'),
+                       ('h3', 'Drift', None, 'F', 's2'), ('h4', 'Stray', 5, 'M', None)]
+        self.races = [('r1', 'Derby', 'Epsom', date(2024, 5, 1)), ('r2', 'Oaks', 'Epsom', date(2024, 6, 1)),
+                      ('r3', 'Gold Cup', 'Ascot', date(2024, 6, 1)), ('r4', 'Undated', None, None)]
+        self.results = [('r1', 'h1', 1, Decimal('1000.50')), ('r1', 'h2', 2, Decimal('200.00')),
+                        ('r1', 'h4', 3, None), ('r2', 'h2', 1, Decimal('800.25')),
+                        ('r2', 'h3', 2, Decimal('100.00')), ('r3', 'h3', 1, Decimal('300.00')),
+                        ('r3', 'h1', None, Decimal('0.00')), ('r4', 'h1', 1, Decimal('50.00'))]
+
+    def add_season(self):
+        """Races on the high-water day and after, with a new track and horse"""
+        self.tracks.append(('York', 'Yorkshire', 2000))
+        self.horses.append(('h5', 'Rookie', 2, 'M', 's1'))
+        self.races += [('r5', 'Sprint', 'Ascot', date(2024, 6, 1)), ('r6', 'Ebor', 'York', date(2024, 8, 20))]
+        self.results += [('r5', 'h5', 1, Decimal('400.00')), ('r5', 'h2', 2, Decimal('40.00')),
+                         ('r6', 'h2', 1, Decimal('900.00')), ('r6', 'h1', 2, Decimal('90.00'))]
+
+    def connection(self):
+        return FakeConnection(self)
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = []
+
+    def execute(self, query, params=()):
+        db = self.database
+        since = params[0] if params else None
+        races = [race for race in db.races if since is None or (race[3] is not None and race[3] >= since)]
+        self.rows = {
+            analytics_snapshot.STABLES_QUERY: db.stables,
+            analytics_snapshot.TRACKS_QUERY: db.tracks,
+            analytics_snapshot.TRAINERS_QUERY: db.trainers,
+            analytics_snapshot.HORSES_QUERY: db.horses,
+            analytics_snapshot.RACES_QUERY: races,
+            analytics_snapshot.RACES_SINCE_QUERY: races,
+            analytics_snapshot.RESULTS_QUERY: db.results,
+            analytics_snapshot.RESULTS_SINCE_QUERY: [result for result in db.results
+                                                     if result[0] in {race[0] for race in races}],
+        }[query]
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+# -- the same reports in plain Python ------------------------------------------
+
+def expected_trainer_winnings(db):
+    stable_of = {horse[0]: horse[4] for horse in db.horses}
+    prize, wins = defaultdict(Decimal), defaultdict(int)
+    for _, horse, position, amount in db.results:
+        prize[stable_of[horse]] += amount or 0
+        wins[stable_of[horse]] += position == 1
+    stable_names = dict(db.stables)
+    return {name: (prize[stable] if stable else 0, wins[stable] if stable else 0, stable_names.get(stable))
+            for _, name, stable in db.trainers}
+
+def expected_track_stats(db, first=None, last=None):
+    races = {race[0]: race[2] for race in db.races
+             if race[2] and (first is None or (race[3] and race[3] >= first))
+             and (last is None or (race[3] and race[3] <= last))}
+    stats = {}
+    for track, _, _ in db.tracks:
+        horses = {result[1] for result in db.results if races.get(result[0]) == track}
+        stats[track] = (sum(1 for name in races.values() if name == track), len(horses))
+    return stats
+
+def expected_winning_trainers(db):
+    stable_of = {horse[0]: horse[4] for horse in db.horses}
+    horse_names = {horse[0]: horse[1] for horse in db.horses}
+    races = {race[0]: race for race in db.races if race[2]}
+    rows = []
+    for race_id, horse, position, amount in db.results:
+        if position == 1 and race_id in races:
+            for _, trainer, stable in db.trainers:
+                if stable is not None and stable == stable_of[horse]:
+                    rows.append((trainer, horse_names[horse], races[race_id][1], races[race_id][3], amount))
+    return rows
+
+def expected_win_rates(db):
+    track_of = {race[0]: race[2] for race in db.races}
+    age_of = {horse[0]: horse[2] for horse in db.horses}
+    counts = defaultdict(lambda: [0, 0])
+    for race_id, horse, position, _ in db.results:
+        if track_of[race_id] and age_of[horse] is not None:
+            counts[track_of[race_id], age_of[horse]][0] += 1
+            counts[track_of[race_id], age_of[horse]][1] += position == 1
+    return {key: tuple(value) for key, value in counts.items()}
+
+class ReportsTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.snapshot = Snapshot()
+        self.assertEqual(self.snapshot.refresh(self.db.connection()), (4, 8))
+
+    def assertReportsMatch(self, snapshot):
+        db = self.db
+        rows = trainer_winnings(snapshot)
+        self.assertEqual({row['trainer_name']: (row['total_winnings'], row['num_wins'], row['stableName'])
+                          for row in rows}, expected_trainer_winnings(db))
+        totals = [row['total_winnings'] for row in rows]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+        for first, last in ((None, None), (date(2024, 6, 1), None), (None, date(2024, 5, 31)),
+                            (date(2024, 6, 1), date(2024, 6, 30))):
+            with self.subTest(first=first, last=last):
+                rows = track_stats(snapshot, first, last)
+                self.assertEqual([row['trackName'] for row in rows], sorted(track[0] for track in db.tracks))
+                self.assertEqual({row['trackName']: (row['num_races'], row['total_horses']) for row in rows},
+                                 expected_track_stats(db, first, last))
+
+        rows = winning_trainers(snapshot)
+        self.assertCountEqual([(row['trainer_name'], row['horse_name'], row['raceName'], row['raceDate'],
+                                row['prize']) for row in rows], expected_winning_trainers(db))
+        dates = [row['raceDate'] for row in rows]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+        rows = win_rate_by_track_and_age(snapshot)
+        self.assertEqual({(row['trackName'], row['age']): (row['starts'], row['wins']) for row in rows},
+                         expected_win_rates(db))
+        rates = [row['win_rate'] for row in rows]
+        self.assertEqual(rates, sorted(rates, reverse=True))
+
+    def test_full_build(self):
+        self.assertReportsMatch(self.snapshot)
+        self.assertEqual(analytics_snapshot.from_day(self.snapshot.high_water), date(2024, 6, 1))
+
+    def test_limits(self):
+        self.assertEqual(len(trainer_winnings(self.snapshot, limit=2)), 2)
+        self.assertEqual(len(winning_trainers(self.snapshot, limit=1)), 1)
+
+    def test_incremental_refresh_past_the_high_water_day(self):
+        self.db.add_season()
+        # r2 and r3 are read again from the high-water day but not added twice
+        self.assertEqual(self.snapshot.refresh(self.db.connection()), (2, 4))
+        self.assertEqual(len(self.snapshot), len(self.db.results))
+        self.assertEqual(analytics_snapshot.from_day(self.snapshot.high_water), date(2024, 8, 20))
+        self.assertReportsMatch(self.snapshot)
+        self.assertEqual(self.snapshot.refresh(self.db.connection()), (0, 0))
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'snapshot.npz')
+            self.snapshot.save(path)
+            loaded = Snapshot.load(path)
+            self.assertReportsMatch(loaded)
+            self.db.add_season()
+            self.assertEqual(loaded.refresh(self.db.connection()), (2, 4))
+            self.assertReportsMatch(loaded)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
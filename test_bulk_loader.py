@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for merging single-row INSERTs into batches (bulk_loader.py)
+Run with: python -m unittest test_bulk_loader
+"""
+
+import unittest
+
+try:
+    from bulk_loader import batch_inserts, count_tuples
+except ImportError as e:
+    raise unittest.SkipTest(f"bulk_loader needs mysql-connector-python: {e}")
+
+def horse(number, name=None):
+    return f"INSERT INTO Horse VALUES ('h{number}', '{name or f'Horse {number}'}', 3)"
+
+class CountTuplesTest(unittest.TestCase):
+    def test_top_level_groups(self):
+        self.assertEqual(count_tuples("(1, 'a'), (2, 'b'),(3, 'c')"), 3)
+        self.assertEqual(count_tuples("(1, CONCAT('a', LPAD(2, 3, '0')))"), 1)
+
+    def test_parentheses_and_quotes_inside_strings(self):
+        self.assertEqual(count_tuples("('a (b', \"c) (d\"), ('e\\') (', 'f')"), 2)
+        self.assertEqual(count_tuples("('O''Brien (IRE)'), ('x')"), 2)
+
+class BatchInsertsTest(unittest.TestCase):
+    def test_merges_a_run_of_inserts(self):
+        batches = list(batch_inserts([horse(1), horse(2), horse(3)]))
+        self.assertEqual(batches, [('Horse', "INSERT INTO Horse VALUES ('h1', 'Horse 1', 3), "
+                                             "('h2', 'Horse 2', 3), ('h3', 'Horse 3', 3)", 3)])
+
+    def test_strings_with_parentheses_and_quotes_survive(self):
+        statements = [horse(1, "Mr (Big"), horse(2, "Won't Stop)")]
+        statements[1] = statements[1].replace("Won't", "Won\\'t")
+        (table, sql, rows), = batch_inserts(statements)
+        self.assertEqual(rows, 2)
+        self.assertEqual(sql, "INSERT INTO Horse VALUES ('h1', 'Mr (Big', 3), ('h2', 'Won\\'t Stop)', 3)")
+
+    def test_other_statements_pass_through_and_split_runs(self):
+        statements = [horse(1), "UPDATE Horse SET age = 4", horse(2),
+                      "INSERT INTO Horse VALUES ('h3', 'Horse 3', 3) ON DUPLICATE KEY UPDATE age = 3",
+                      "INSERT INTO Horse SELECT * FROM old_info"]
+        self.assertEqual([(table, rows) for table, _, rows in batch_inserts(statements)],
+                         [('Horse', 1), (None, 0), ('Horse', 1), (None, 0), (None, 0)])
+        self.assertEqual([sql for _, sql, _ in batch_inserts(statements)][3], statements[3])
+
+    def test_column_list_changes_start_a_new_batch(self):
+        statements = ["INSERT INTO Owner (ownerId, lname) VALUES ('o1', 'Smith')",
+                      "INSERT INTO Owner (ownerId, lname) VALUES ('o2', 'Jones')",
+                      "INSERT INTO Owner (ownerId, fname) VALUES ('o3', 'Ann')",
+                      "INSERT INTO Trainer VALUES ('t1', 'Tom', 'Hill', 's1')"]
+        batches = list(batch_inserts(statements))
+        self.assertEqual([(table, rows) for table, _, rows in batches], [('Owner', 2), ('Owner', 1), ('Trainer', 1)])
+        self.assertEqual(batches[0][1], "INSERT INTO Owner (ownerId, lname) VALUES ('o1', 'Smith'), ('o2', 'Jones')")
+        self.assertTrue(batches[1][1].startswith("INSERT INTO Owner (ownerId, fname) VALUES"))
+
+    def test_batch_rows_counts_rows(self):
+        statements = [horse(1), horse(2), horse(3), horse(4), horse(5)]
+        self.assertEqual([rows for _, _, rows in batch_inserts(statements, batch_rows=2)], [2, 2, 1])
+
+    def test_batch_rows_counts_rows_of_multi_row_inserts(self):
+        statements = ["INSERT INTO Horse VALUES ('h1', 'a', 3), ('h2', 'b', 3), ('h3', 'c', 3)",
+                      "INSERT INTO Horse VALUES ('h4', 'd', 3), ('h5', 'e', 3)",
+                      "INSERT INTO Horse VALUES ('h6', 'f', 3), ('h7', 'g', 3), ('h8', 'h', 3), ('h9', 'i', 3)",
+                      horse(10)]
+        self.assertEqual([rows for _, _, rows in batch_inserts(statements, batch_rows=5)], [5, 5])
+        # A statement bigger than a batch is sent on its own
+        self.assertEqual([rows for _, _, rows in batch_inserts(statements, batch_rows=3)], [3, 2, 4, 1])
+
+    def test_max_bytes_cuts_batches(self):
+        statements = [horse(number) for number in range(1, 6)]
+        tuple_bytes = len("('h1', 'Horse 1', 3)") + 2
+        batches = list(batch_inserts(statements, max_bytes=2 * tuple_bytes))
+        self.assertEqual([rows for _, _, rows in batches], [2, 2, 1])
+        self.assertTrue(all(sql.count("'Horse ") == rows for _, sql, rows in batches))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for the result cache of the data access layer (data_access/caches.py)
+Run with: python -m unittest test_caches
+"""
+
+import unittest
+from unittest import mock
+
+try:
+    from data_access.caches import (PROCEDURE_TABLES, ResultCache, is_read_only, referenced_tables,
+                                    written_tables)
+except ImportError as e:
+    raise unittest.SkipTest(f"data_access needs mysql-connector-python: {e}")
+
+TRAINER_WINNINGS = "SELECT ts.totalPrize FROM trainer_stats ts JOIN Trainer t ON t.trainerId = ts.trainerId"
+RACES = "SELECT raceName FROM Race WHERE raceDate > %s"
+RESULTS = "SELECT position FROM RaceResults WHERE raceId = %s"
+HISTORY = ("SELECT rr.raceId FROM race_results_history rr "
+           "JOIN race_history r ON rr.raceId = r.raceId AND rr.raceDate = r.raceDate")
+OWNERS = "SELECT lname FROM Owner"
+TRACKS = "SELECT trackName FROM Track"
+
+def cached(cache, query, params=(), rows=None):
+    """Put rows for query into cache; returns the key"""
+    key = ResultCache.make_key(query, params)
+    cache.put(key, rows if rows is not None else [{'query': query}], cache.generation)
+    return key
+
+class TableMapsTest(unittest.TestCase):
+    def test_referenced_tables(self):
+        self.assertEqual(referenced_tables(TRAINER_WINNINGS), {'trainer_stats', 'trainer'})
+        self.assertEqual(referenced_tables("UPDATE `Horse` SET stableId = %s"), {'horse'})
+        self.assertEqual(referenced_tables("INSERT INTO RaceResults VALUES (%s)"), {'raceresults'})
+
+    def test_views_expand_to_live_and_archive_tables(self):
+        self.assertEqual(referenced_tables(HISTORY), {'race_results_history', 'race_history',
+                                                      'raceresults', 'race_results_archive',
+                                                      'race', 'race_archive'})
+
+    def test_written_tables_add_trigger_targets(self):
+        self.assertEqual(written_tables({'RaceResults'}),
+                         {'raceresults', 'trainer_stats', 'track_stats', 'track_daily', 'track_horse_monthly'})
+        self.assertIn('raceresults', written_tables({'Race'}))
+        self.assertEqual(written_tables({'Owner'}), {'owner'})
+
+    def test_is_read_only(self):
+        self.assertTrue(is_read_only("  (SELECT 1)"))
+        self.assertTrue(is_read_only("show tables"))
+        self.assertFalse(is_read_only("DELETE FROM Owner"))
+        self.assertFalse(is_read_only("CALL DeleteOwner(%s)"))
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_entries=8, ttl=60.0)
+
+    def assertCached(self, key):
+        self.assertTrue(self.cache.get(key)[0], f"{key[0]!r} should be cached")
+
+    def assertNotCached(self, key):
+        self.assertEqual(self.cache.get(key), (False, None), f"{key[0]!r} should not be cached")
+
+    def test_hit_returns_a_copy_per_parameters(self):
+        key = cached(self.cache, RACES, ('2024-01-01',), [{'raceName': 'Derby'}])
+        hit, rows = self.cache.get(key)
+        self.assertTrue(hit)
+        self.assertEqual(rows, [{'raceName': 'Derby'}])
+        rows.clear()
+        self.assertEqual(self.cache.get(key)[1], [{'raceName': 'Derby'}])
+        self.assertNotCached(ResultCache.make_key(RACES, ('2025-01-01',)))
+
+    def test_list_and_dict_params_make_equal_keys(self):
+        self.assertEqual(ResultCache.make_key(RACES, ['a']), ResultCache.make_key(RACES, ('a',)))
+        self.assertIsNone(ResultCache.make_key(RACES, ([1],)))
+
+    def test_write_invalidates_readers_of_that_table_only(self):
+        races = cached(self.cache, RACES, ('2024-01-01',))
+        owners = cached(self.cache, OWNERS)
+        self.cache.invalidate({'Race'})
+        self.assertNotCached(races)
+        self.assertCached(owners)
+
+    def test_write_invalidates_tables_its_triggers_change(self):
+        winnings = cached(self.cache, TRAINER_WINNINGS)
+        tracks = cached(self.cache, TRACKS)
+        # results_insert_stats keeps trainer_stats current, so its readers are stale now
+        self.cache.invalidate({'RaceResults'})
+        self.assertNotCached(winnings)
+        self.assertCached(tracks)
+
+    def test_race_write_invalidates_result_readers(self):
+        # race_sync_result_dates copies a re-dated race's raceDate onto its results
+        results = cached(self.cache, RESULTS, ('r1',))
+        self.cache.invalidate({'Race'})
+        self.assertNotCached(results)
+
+    def test_base_table_write_invalidates_view_readers(self):
+        for table in ('RaceResults', 'Race', 'race_archive', 'race_results_archive'):
+            with self.subTest(table=table):
+                history = cached(self.cache, HISTORY)
+                self.cache.invalidate({table})
+                self.assertNotCached(history)
+
+    def test_procedure_invalidates_the_tables_it_writes(self):
+        owners = cached(self.cache, OWNERS)
+        tracks = cached(self.cache, TRACKS)
+        self.cache.invalidate(PROCEDURE_TABLES['DeleteOwner'])
+        self.assertNotCached(owners)
+        self.assertCached(tracks)
+
+    def test_table_names_ignore_case(self):
+        owners = cached(self.cache, "SELECT lname FROM owner")
+        self.cache.invalidate({'OWNER'})
+        self.assertNotCached(owners)
+
+    def test_result_read_across_a_write_is_not_stored(self):
+        key = ResultCache.make_key(RACES, ('2024-01-01',))
+        generation = self.cache.generation
+        self.cache.invalidate({'Track'})
+        self.cache.put(key, [{'raceName': 'stale'}], generation)
+        self.assertNotCached(key)
+
+    def test_ttl_expiry(self):
+        with mock.patch('data_access.caches.time.monotonic', return_value=1000.0):
+            key = cached(self.cache, OWNERS)
+        with mock.patch('data_access.caches.time.monotonic', return_value=1059.0):
+            self.assertCached(key)
+        with mock.patch('data_access.caches.time.monotonic', return_value=1061.0):
+            self.assertNotCached(key)
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['bytes'], 0)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2, ttl=60.0)
+        first = cached(cache, OWNERS)
+        second = cached(cache, TRACKS)
+        cache.get(first)  # now the most recently used
+        third = cached(cache, RACES, ('2024-01-01',))
+        self.assertTrue(cache.get(first)[0])
+        self.assertEqual(cache.get(second), (False, None))
+        self.assertTrue(cache.get(third)[0])
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_evicted_entries_leave_no_table_index(self):
+        cache = ResultCache(max_entries=1, ttl=60.0)
+        cached(cache, OWNERS)
+        cached(cache, TRACKS)
+        cache.invalidate({'Owner'})
+        self.assertEqual(cache.get_stats()['invalidations'], 0)
+        self.assertEqual(cache._by_table.keys(), {'track'})
+
+    def test_clear(self):
+        key = cached(self.cache, OWNERS)
+        self.cache.clear()
+        self.assertNotCached(key)
+        self.assertEqual(self.cache.get_stats()['bytes'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for skipping applied DDL and online ALTERs in migrations (migrate.py)
+Run with: python -m unittest test_migrate
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from migrate import Migration, alter_checks, execute_once, satisfied, split_clauses
+except ImportError as e:
+    raise unittest.SkipTest(f"migrate needs mysql-connector-python: {e}")
+
+class FakeCursor:
+    """Answers the information_schema lookups of migrate.py from a fixed schema and records the rest"""
+    def __init__(self, tables=(), indexes=(), columns=(), primary=None):
+        self.tables = set(tables)
+        self.indexes = set(indexes)  # (table, index)
+        self.columns = set(columns)  # (table, column)
+        self.primary = primary or {}  # table -> key columns
+        self.executed = []
+        self.rows = []
+        self.with_rows = False
+
+    def execute(self, query, params=None):
+        if 'information_schema.STATISTICS' in query and "'PRIMARY'" in query:
+            self.rows = [(column,) for column in self.primary.get(params[0], ())]
+        elif 'information_schema.STATISTICS' in query:
+            self.rows = [(int(tuple(params) in self.indexes),)]
+        elif 'information_schema.COLUMNS' in query:
+            self.rows = [(int(tuple(params) in self.columns),)]
+        elif 'information_schema.TABLES' in query:
+            self.rows = [(int(params[0] in self.tables),)]
+        else:
+            self.executed.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+class SplitClausesTest(unittest.TestCase):
+    def test_splits_at_top_level_commas(self):
+        self.assertEqual(split_clauses("ADD INDEX idx_a (a, b), ADD COLUMN c INT,\n  DROP KEY idx_d"),
+                         ["ADD INDEX idx_a (a, b)", "ADD COLUMN c INT", "DROP KEY idx_d"])
+
+    def test_commas_in_quotes_stay_put(self):
+        self.assertEqual(split_clauses("ADD COLUMN kind ENUM('a,b', \"c,d\") DEFAULT 'a,b', ADD COLUMN `x,y` INT"),
+                         ["ADD COLUMN kind ENUM('a,b', \"c,d\") DEFAULT 'a,b'", "ADD COLUMN `x,y` INT"])
+
+    def test_parentheses_in_quotes_are_not_counted(self):
+        self.assertEqual(split_clauses("ADD COLUMN note VARCHAR(10) DEFAULT '(', ADD INDEX idx_note (note)"),
+                         ["ADD COLUMN note VARCHAR(10) DEFAULT '('", "ADD INDEX idx_note (note)"])
+
+class AlterChecksTest(unittest.TestCase):
+    def test_clause_kinds(self):
+        self.assertEqual(alter_checks("ALTER TABLE `Race` ADD UNIQUE KEY idx_a (a), DROP INDEX idx_b, "
+                                      "ADD COLUMN c INT, DROP COLUMN d, ADD PRIMARY KEY (`raceId`, raceDate)"),
+                         ('Race', [('index', 'idx_a', True), ('index', 'idx_b', False),
+                                   ('column', 'c', True), ('column', 'd', False),
+                                   ('primary', ('raceId', 'raceDate'), True)]))
+
+    def test_unknown_clauses_are_left_out(self):
+        self.assertEqual(alter_checks("ALTER TABLE Race MODIFY raceDate DATE NOT NULL, ALGORITHM=INPLACE"),
+                         ('Race', []))
+
+    def test_rebuilt_index_is_left_out(self):
+        self.assertEqual(alter_checks("ALTER TABLE Horse DROP INDEX idx_name, ADD INDEX idx_name (horseName, age)"),
+                         ('Horse', []))
+
+    def test_partition_options_are_ignored(self):
+        table, checks = alter_checks("ALTER TABLE Race ADD INDEX idx_a (a)\n"
+                                     "PARTITION BY RANGE COLUMNS(raceDate) (PARTITION p0 VALUES LESS THAN (MAXVALUE))")
+        self.assertEqual(checks, [('index', 'idx_a', True)])
+
+    def test_not_an_alter(self):
+        self.assertIsNone(alter_checks("CREATE INDEX idx_a ON Race (a)"))
+
+class SatisfiedTest(unittest.TestCase):
+    def test_add_index(self):
+        statement = "ALTER TABLE Race ADD INDEX idx_race_date (raceDate)"
+        self.assertFalse(satisfied(FakeCursor(), statement))
+        self.assertTrue(satisfied(FakeCursor(indexes={('Race', 'idx_race_date')}), statement))
+
+    def test_add_column(self):
+        statement = "ALTER TABLE RaceResults ADD COLUMN raceDate DATE"
+        self.assertFalse(satisfied(FakeCursor(), statement))
+        self.assertTrue(satisfied(FakeCursor(columns={('RaceResults', 'raceDate')}), statement))
+
+    def test_drop_column(self):
+        statement = "ALTER TABLE Horse DROP COLUMN legacy"
+        self.assertTrue(satisfied(FakeCursor(), statement))
+        self.assertFalse(satisfied(FakeCursor(columns={('Horse', 'legacy')}), statement))
+
+    def test_primary_key_must_match_in_order(self):
+        statement = "ALTER TABLE Race DROP PRIMARY KEY, ADD PRIMARY KEY (raceId, raceDate)"
+        self.assertTrue(satisfied(FakeCursor(primary={'Race': ('raceId', 'raceDate')}), statement))
+        self.assertFalse(satisfied(FakeCursor(primary={'Race': ('raceId',)}), statement))
+        self.assertFalse(satisfied(FakeCursor(primary={'Race': ('raceDate', 'raceId')}), statement))
+
+    def test_partial_effect_is_not_done(self):
+        # One index there and one missing: the statement did not run, the
+        # existing index came from somewhere else, so it must still run
+        statement = "ALTER TABLE Race ADD INDEX idx_a (a), ADD INDEX idx_b (b)"
+        self.assertFalse(satisfied(FakeCursor(indexes={('Race', 'idx_a')}), statement))
+        self.assertTrue(satisfied(FakeCursor(indexes={('Race', 'idx_a'), ('Race', 'idx_b')}), statement))
+
+    def test_nothing_to_check_always_runs(self):
+        self.assertFalse(satisfied(FakeCursor(), "ALTER TABLE Race MODIFY raceDate DATE NOT NULL"))
+        self.assertFalse(satisfied(FakeCursor(), "DROP TRIGGER IF EXISTS race_check_delete"))
+
+    def test_create_table_and_index(self):
+        cursor = FakeCursor(tables={'race_ids'}, indexes={('Race', 'idx_a')})
+        self.assertTrue(satisfied(cursor, "CREATE TABLE race_ids (raceId VARCHAR(15) PRIMARY KEY)"))
+        self.assertFalse(satisfied(cursor, "CREATE TABLE race_archive LIKE Race"))
+        self.assertFalse(satisfied(cursor, "CREATE TABLE IF NOT EXISTS race_ids (raceId VARCHAR(15))"))
+        self.assertTrue(satisfied(cursor, "CREATE UNIQUE INDEX idx_a ON Race (a)"))
+        self.assertFalse(satisfied(cursor, "CREATE INDEX idx_b ON Race (b)"))
+
+    def test_execute_once(self):
+        cursor = FakeCursor(indexes={('Race', 'idx_a')})
+        self.assertFalse(execute_once(cursor, "ALTER TABLE Race ADD INDEX idx_a (a)"))
+        self.assertTrue(execute_once(cursor, "ALTER TABLE Race ADD INDEX idx_b (b)"))
+        self.assertEqual(cursor.executed, ["ALTER TABLE Race ADD INDEX idx_b (b)"])
+
+class OnlineStatementsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def migration(self, text):
+        path = os.path.join(self.directory, '001_test.sql')
+        with open(path, 'w') as f:
+            f.write(text)
+        return Migration(1, 'test', path)
+
+    def test_alter_gets_lock_none(self):
+        migration = self.migration("ALTER TABLE Race ADD INDEX idx_a (a);\n"
+                                   "CREATE INDEX idx_b ON Race (b);\n")
+        statements = list(migration.statements())
+        self.assertEqual(statements[0], "ALTER TABLE Race ADD INDEX idx_a (a),\n    LOCK=NONE")
+        self.assertEqual(statements[1], "CREATE INDEX idx_b ON Race (b)")
+
+    def test_explicit_lock_is_kept(self):
+        for lock in ("LOCK=SHARED", "LOCK = EXCLUSIVE", "lock=none"):
+            with self.subTest(lock=lock):
+                migration = self.migration(f"ALTER TABLE Race ADD INDEX idx_a (a), {lock};\n")
+                self.assertEqual(list(migration.statements()), [f"ALTER TABLE Race ADD INDEX idx_a (a), {lock}"])
+
+    def test_offline_leaves_statements_alone(self):
+        migration = self.migration("-- migrate: offline\nALTER TABLE Race ADD INDEX idx_a (a);\n")
+        self.assertTrue(migration.is_offline())
+        self.assertEqual(list(migration.statements(online=False)), ["ALTER TABLE Race ADD INDEX idx_a (a)"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for the raceDate partition boundaries (partitions.py)
+Run with: python -m unittest test_partitions
+"""
+
+import argparse
+import unittest
+from datetime import date
+
+try:
+    import partitions
+    from partitions import (FUTURE_PARTITION, PartitionError, next_bound, parse_bound, parse_period,
+                            partition_clause, partition_name, plan)
+except ImportError as e:
+    raise unittest.SkipTest(f"partitions needs mysql-connector-python: {e}")
+
+class FakeCursor:
+    """Answers the information_schema.PARTITIONS query with fixed rows and records the rest"""
+    def __init__(self, layouts):
+        self.layouts = layouts
+        self.executed = []
+        self.rows = []
+
+    def execute(self, query, params=()):
+        if 'information_schema.PARTITIONS' in query:
+            self.rows = self.layouts[params[0]]
+        else:
+            self.executed.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, layouts):
+        self.cursor_ = FakeCursor(layouts)
+
+    def cursor(self):
+        return self.cursor_
+
+def layouts(rows):
+    return {table: rows for table in partitions.PARTITIONED_TABLES}
+
+class BoundaryTest(unittest.TestCase):
+    def test_partition_name(self):
+        self.assertEqual(partition_name(date(2024, 1, 1)), 'p2024')
+        self.assertEqual(partition_name(date(2024, 6, 1), monthly=True), 'p202406')
+        self.assertEqual(partition_name(date(2024, 12, 1), monthly=True), 'p202412')
+
+    def test_next_bound_yearly(self):
+        self.assertEqual(next_bound(date(2024, 1, 1)), date(2025, 1, 1))
+        self.assertEqual(next_bound(date(2024, 12, 1)), date(2025, 1, 1))
+
+    def test_next_bound_monthly(self):
+        self.assertEqual(next_bound(date(2024, 1, 1), monthly=True), date(2024, 2, 1))
+        self.assertEqual(next_bound(date(2024, 2, 1), monthly=True), date(2024, 3, 1))
+        self.assertEqual(next_bound(date(2024, 11, 1), monthly=True), date(2024, 12, 1))
+
+    def test_next_bound_monthly_rolls_over_the_year(self):
+        self.assertEqual(next_bound(date(2024, 12, 1), monthly=True), date(2025, 1, 1))
+
+    def test_plan_yearly(self):
+        self.assertEqual(plan(date(2022, 1, 1), date(2025, 1, 1)),
+                         [('p2022', date(2023, 1, 1)), ('p2023', date(2024, 1, 1)), ('p2024', date(2025, 1, 1))])
+
+    def test_plan_monthly_across_new_year(self):
+        self.assertEqual(plan(date(2024, 11, 1), date(2025, 3, 1), monthly=True),
+                         [('p202411', date(2024, 12, 1)), ('p202412', date(2025, 1, 1)),
+                          ('p202501', date(2025, 2, 1)), ('p202502', date(2025, 3, 1))])
+
+    def test_plan_covers_a_partial_last_period(self):
+        # An end inside a month still gets that whole month
+        self.assertEqual(plan(date(2024, 1, 1), date(2024, 2, 15), monthly=True),
+                         [('p202401', date(2024, 2, 1)), ('p202402', date(2024, 3, 1))])
+
+    def test_plan_is_empty_when_already_covered(self):
+        self.assertEqual(plan(date(2025, 1, 1), date(2025, 1, 1)), [])
+        self.assertEqual(plan(date(2025, 1, 1), date(2024, 1, 1)), [])
+
+    def test_plan_bounds_are_contiguous(self):
+        planned = plan(date(2023, 7, 1), date(2025, 7, 1), monthly=True)
+        self.assertEqual(len(planned), 24)
+        starts = [date(2023, 7, 1)] + [bound for _, bound in planned[:-1]]
+        for start, (name, bound) in zip(starts, planned):
+            self.assertEqual(bound, next_bound(start, monthly=True))
+            self.assertEqual(name, partition_name(start, monthly=True))
+
+class ClauseTest(unittest.TestCase):
+    def test_partition_clause(self):
+        self.assertEqual(partition_clause(2023, date(2025, 1, 1)),
+                         "PARTITION BY RANGE COLUMNS(raceDate) (\n"
+                         "    PARTITION p_before VALUES LESS THAN ('2023-01-01'),\n"
+                         "    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),\n"
+                         "    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),\n"
+                         "    PARTITION p_future VALUES LESS THAN (MAXVALUE)\n"
+                         ")")
+
+    def test_partition_clause_with_no_years(self):
+        clause = partition_clause(2025, date(2025, 1, 1))
+        self.assertIn("p_before VALUES LESS THAN ('2025-01-01')", clause)
+        self.assertTrue(clause.endswith("PARTITION p_future VALUES LESS THAN (MAXVALUE)\n)"))
+        self.assertEqual(clause.count("VALUES LESS THAN"), 2)
+
+    def test_parse_bound(self):
+        self.assertEqual(parse_bound("'2025-01-01'"), date(2025, 1, 1))
+        self.assertEqual(parse_bound("2025-01-01"), date(2025, 1, 1))
+        self.assertIsNone(parse_bound("MAXVALUE"))
+        self.assertIsNone(parse_bound(" maxvalue "))
+
+    def test_parse_period(self):
+        self.assertEqual(parse_period("2027"), (date(2027, 1, 1), False))
+        self.assertEqual(parse_period("2027-06"), (date(2027, 6, 1), True))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            parse_period("June 2027")
+
+class AddPartitionsTest(unittest.TestCase):
+    ROWS = [('p_before', "'2023-01-01'", 0), ('p2023', "'2024-01-01'", 10),
+            ('p2024', "'2025-01-01'", 10), (FUTURE_PARTITION, 'MAXVALUE', 0)]
+
+    def test_splits_p_future_from_the_last_bound(self):
+        connection = FakeConnection(layouts(self.ROWS))
+        added = partitions.add_partitions(connection, date(2025, 3, 1), monthly=True)
+        self.assertEqual(added, ['p202501', 'p202502'])
+        executed = connection.cursor_.executed
+        self.assertEqual(len(executed), len(partitions.PARTITIONED_TABLES))
+        for table, statement in zip(partitions.PARTITIONED_TABLES, executed):
+            self.assertTrue(statement.startswith(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO"))
+            self.assertIn("PARTITION p202502 VALUES LESS THAN ('2025-03-01')", statement)
+            self.assertTrue(statement.rstrip(")\n").endswith("PARTITION p_future VALUES LESS THAN (MAXVALUE"))
+
+    def test_nothing_to_add(self):
+        connection = FakeConnection(layouts(self.ROWS))
+        self.assertEqual(partitions.add_partitions(connection, date(2024, 6, 1)), [])
+        self.assertEqual(connection.cursor_.executed, [])
+
+    def test_last_partition_must_be_maxvalue(self):
+        connection = FakeConnection(layouts(self.ROWS[:-1]))
+        with self.assertRaises(PartitionError):
+            partitions.add_partitions(connection, date(2026, 1, 1))
+
+    def test_tables_must_share_partitions(self):
+        rows = layouts(self.ROWS)
+        rows['RaceResults'] = self.ROWS[:1] + self.ROWS[2:]
+        with self.assertRaises(PartitionError):
+            partitions.add_partitions(FakeConnection(rows), date(2026, 1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
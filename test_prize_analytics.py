@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-group prize statistics (prize_analytics.py)
+Run with: python -m unittest test_prize_analytics
+"""
+
+import unittest
+from decimal import Decimal
+
+try:
+    import numpy as np
+    from prize_analytics import summarize, to_rows
+except ImportError as e:
+    raise unittest.SkipTest(f"prize_analytics needs numpy and mysql-connector-python: {e}")
+
+def keys_of(values):
+    keys = np.empty(len(values), dtype=object)
+    keys[:] = values
+    return keys
+
+class SummarizeTest(unittest.TestCase):
+    def test_matches_numpy_per_group(self):
+        rng = np.random.default_rng(7)
+        names = ['t1', 't2', 't3', 't4']
+        keys = keys_of([names[i] for i in rng.integers(0, len(names), 500)])
+        cents = rng.integers(0, 1_000_000, 500)
+        keys[0], cents[0] = 'solo', 1234  # a group of one
+        percentiles = (0, 10, 25, 50, 90, 99.5, 100)
+        summary = summarize(keys, cents, percentiles)
+        self.assertEqual(list(summary['key']), sorted(set(keys)))
+        for i, key in enumerate(summary['key']):
+            amounts = cents[keys == key]
+            with self.subTest(key=key):
+                self.assertEqual(summary['count'][i], len(amounts))
+                self.assertEqual(summary['total'][i], amounts.sum())
+                self.assertAlmostEqual(summary['mean'][i], amounts.mean())
+                for p in percentiles:
+                    self.assertAlmostEqual(summary[f"p{p:g}"][i], np.percentile(amounts, p))
+
+    def test_unsorted_input_with_ties(self):
+        keys = keys_of(['b', 'a', 'b', 'a', 'b', 'a'])
+        cents = np.array([500, 100, 100, 100, 300, 700], dtype=np.int64)
+        summary = summarize(keys, cents, (50, 75))
+        self.assertEqual(list(summary['key']), ['a', 'b'])
+        self.assertEqual(list(summary['total']), [900, 900])
+        self.assertEqual(list(summary['p50']), [100.0, 300.0])
+        self.assertEqual(list(summary['p75']), [400.0, 400.0])
+
+    def test_totals_stay_exact(self):
+        cents = np.array([2**53, 1, 1], dtype=np.int64)
+        self.assertEqual(summarize(keys_of(['a', 'a', 'a']), cents)['total'][0], 2**53 + 2)
+
+    def test_empty(self):
+        summary = summarize(keys_of([]), np.empty(0, dtype=np.int64), (50,))
+        self.assertEqual(sorted(summary), ['count', 'key', 'mean', 'p50', 'total'])
+        self.assertTrue(all(len(values) == 0 for values in summary.values()))
+
+class ToRowsTest(unittest.TestCase):
+    def test_ordering_and_decimal_amounts(self):
+        summary = summarize(keys_of(['a', 'b', 'b', 'c']), np.array([150, 1000, 6, 700], dtype=np.int64), (50,))
+        rows = to_rows(summary, limit=2)
+        self.assertEqual([row['key'] for row in rows], ['b', 'c'])
+        self.assertEqual(rows[0], {'key': 'b', 'label': 'b', 'count': 2, 'total': Decimal('10.06'),
+                                   'mean': Decimal('5.03'), 'p50': Decimal('5.03')})
+        self.assertEqual([row['key'] for row in to_rows(summary, 'count', descending=False)], ['a', 'c', 'b'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests for reading and validating race cards (race_import.py)
+Run with: python -m unittest test_race_import
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+
+try:
+    import race_import
+    from race_import import ImportReport, RaceCard, read_race_cards, validate_card
+except ImportError as e:
+    raise unittest.SkipTest(f"race_import needs mysql-connector-python: {e}")
+
+HEADER = "raceId,raceName,trackName,raceDate,raceTime,horseId,position,prize\n"
+
+class FixtureTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.report = ImportReport()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            f.write(text)
+        return path
+
+    def read(self, name, text):
+        return read_race_cards(self.write(name, text), self.report)
+
+    def counts(self):
+        return (self.report.races_rejected, self.report.results_rejected, len(self.report.errors))
+
+class ReadCsvTest(FixtureTest):
+    def test_rows_are_grouped_by_race(self):
+        cards = self.read('cards.csv', HEADER
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h1,1,100\n"
+                          + "r2,Oaks,Ascot,2024-05-01,15:00,h1,first,50\n"
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h2,2,20\n")
+        self.assertEqual([card.race['raceId'] for card in cards], ['r1', 'r2'])
+        self.assertEqual([result[1] for result in cards[0].results], ['h1', 'h2'])
+        self.assertEqual(cards[0].source, 'cards.csv:2')
+        self.assertEqual(cards[0].results[1][0], 'cards.csv:4')
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+    def test_missing_columns_reject_the_file(self):
+        self.assertEqual(self.read('cards.csv', "raceId,horseId\nr1,h1\n"), [])
+        self.assertEqual(len(self.report.errors), 1)
+        self.assertIn("missing columns raceName", self.report.errors[0])
+
+    def test_row_without_race_id(self):
+        cards = self.read('cards.csv', HEADER
+                          + ",Derby,Ascot,2024-05-01,14:00,h1,1,100\n"
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h2,1,100\n")
+        self.assertEqual(len(cards), 1)
+        self.assertEqual(self.counts(), (0, 1, 1))
+        self.assertEqual(self.report.errors[0], "cards.csv:2: missing raceId")
+
+    def test_rows_disagreeing_on_race_details_reject_the_race(self):
+        cards = self.read('cards.csv', HEADER
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h1,1,100\n"
+                          + "r1,Derby,Epsom,2024-05-02,14:00,h2,2,50\n"
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h3,3,10\n"
+                          + "r2,Oaks,Ascot,2024-05-01,15:00,h1,1,100\n")
+        self.assertEqual([card.race['raceId'] for card in cards], ['r2'])
+        # The disagreeing row, then the race with the two rows that agreed
+        self.assertEqual(self.counts(), (1, 3, 2))
+        row_error, race_error = self.report.errors
+        self.assertTrue(row_error.startswith("cards.csv:3: race r1: "))
+        self.assertIn("trackName 'Epsom' differs from 'Ascot' at cards.csv:2", row_error)
+        self.assertIn("raceDate '2024-05-02' differs from '2024-05-01'", row_error)
+        self.assertTrue(race_error.startswith("cards.csv:2: race r1 rejected"))
+
+    def test_surrounding_blanks_are_not_a_disagreement(self):
+        cards = self.read('cards.csv', HEADER
+                          + "r1,Derby,Ascot,2024-05-01,14:00,h1,1,100\n"
+                          + "r1, Derby ,Ascot ,2024-05-01,14:00,h2,2,50\n")
+        self.assertEqual(len(cards[0].results), 2)
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+class ReadJsonTest(FixtureTest):
+    def test_list_and_races_object(self):
+        race = {'raceId': 'r1', 'raceName': 'Derby', 'trackName': 'Ascot', 'raceDate': '2024-05-01',
+                'raceTime': '14:00', 'results': [{'horseId': 'h1', 'position': 1, 'prize': 100}]}
+        for data in ([race], {'races': [race]}):
+            with self.subTest(data=type(data).__name__):
+                cards = self.read('cards.json', json.dumps(data))
+                self.assertEqual(len(cards), 1)
+                self.assertEqual(cards[0].source, 'cards.json[0]')
+                self.assertEqual(cards[0].results, [('cards.json[0].results[0]', 'h1', 1, 100)])
+
+    def test_entries_that_are_not_objects(self):
+        cards = self.read('cards.json', json.dumps([
+            "not a race",
+            {'raceId': 'r1', 'results': [{'horseId': 'h1'}, ["h2"]]},
+        ]))
+        self.assertEqual(len(cards), 1)
+        self.assertEqual(len(cards[0].results), 1)
+        self.assertEqual(self.counts(), (1, 1, 2))
+        self.assertEqual(self.report.errors, ["cards.json[0]: race entry is not an object",
+                                              "cards.json[1].results[1]: result entry is not an object"])
+
+class ValidateCardTest(unittest.TestCase):
+    RACE = {'raceId': 'r1', 'raceName': 'Derby', 'trackName': 'Ascot', 'raceDate': '2024-05-01',
+            'raceTime': '14:00'}
+
+    def setUp(self):
+        self.report = ImportReport()
+
+    def card(self, results, **race):
+        card = RaceCard('cards.csv:2', dict(self.RACE, **race))
+        card.results = [(f"cards.csv:{line}",) + result for line, result in enumerate(results, 2)]
+        return card
+
+    def test_normalises_results(self):
+        card = self.card([(' h1 ', 'first', '1500.505'), ('h2', '2', '')], raceName=' Derby ')
+        self.assertTrue(validate_card(card, self.report))
+        self.assertEqual(card.race['raceName'], 'Derby')
+        self.assertEqual(card.results, [('cards.csv:2', 'h1', 1, Decimal('1500.51')),
+                                        ('cards.csv:3', 'h2', 2, Decimal('0.00'))])
+        self.assertEqual(self.report.errors, [])
+
+    def test_missing_race_column_rejects_the_race(self):
+        card = self.card([('h1', 1, 100), ('h2', 2, 50)], trackName='  ')
+        self.assertFalse(validate_card(card, self.report))
+        self.assertEqual(self.report.errors, ["cards.csv:2: race is missing trackName"])
+        self.assertEqual((self.report.races_rejected, self.report.results_rejected), (1, 2))
+
+    def test_bad_date_or_time_rejects_the_race(self):
+        for race in ({'raceDate': '2024-13-01'}, {'raceTime': '25:00'}, {'raceDate': '01/05/2024'}):
+            with self.subTest(**race):
+                report = ImportReport()
+                self.assertFalse(validate_card(self.card([('h1', 1, 100)], **race), report))
+                self.assertEqual((report.races_rejected, report.results_rejected), (1, 1))
+                self.assertIn("bad date/time", report.errors[0])
+
+    def test_bad_results_are_dropped_one_by_one(self):
+        card = self.card([('h1', 1, 100), ('', 2, 10), ('h1', 3, 10), ('h2', 'last', 10),
+                          ('h3', 300, 10), ('h4', 4, '-5'), ('h5', 5, 'lots'), ('h6', 6, 10)])
+        self.assertTrue(validate_card(card, self.report))
+        self.assertEqual([result[1] for result in card.results], ['h1', 'h6'])
+        self.assertEqual((self.report.races_rejected, self.report.results_rejected), (0, 6))
+        self.assertEqual([error.split(': ', 1)[0] for error in self.report.errors],
+                         [f"cards.csv:{line}" for line in range(3, 9)])
+        self.assertIn("missing horseId", self.report.errors[0])
+        self.assertIn("horse h1 listed twice in race r1", self.report.errors[1])
+
+    def test_race_without_valid_results_is_rejected(self):
+        card = self.card([('h1', 'last', 100)])
+        self.assertFalse(validate_card(card, self.report))
+        self.assertEqual(self.report.errors[-1], "cards.csv:2: race r1 has no valid results")
+        self.assertEqual((self.report.races_rejected, self.report.results_rejected), (1, 1))
+
+class CheckReferencesTest(unittest.TestCase):
+    class Lookup:
+        def __init__(self, known):
+            self.known = known
+
+        def existing(self, keys):
+            return set(keys) & self.known
+
+    class Repos:
+        pass
+
+    def test_unknown_references(self):
+        repos = self.Repos()
+        repos.horses = self.Lookup({'h1', 'h2'})
+        repos.tracks = self.Lookup({'Ascot'})
+        repos.races = self.Lookup({'old'})
+        cards = []
+        for race_id, track, horses in (('r1', 'Ascot', ['h1', 'hX']), ('old', 'Ascot', ['h1']),
+                                       ('r2', 'Nowhere', ['h2']), ('r3', 'Ascot', ['hY'])):
+            card = RaceCard(f"{race_id}.csv", {'raceId': race_id, 'trackName': track})
+            card.results = [(f"{race_id}:{horse}", horse, 1, Decimal(0)) for horse in horses]
+            cards.append(card)
+        report = ImportReport()
+        valid = race_import.check_references(repos, cards, report)
+        self.assertEqual([card.race['raceId'] for card in valid], ['r1'])
+        self.assertEqual([result[1] for result in valid[0].results], ['h1'])
+        self.assertEqual(report.errors, ["r1:hX: horse 'hX' not found",
+                                         "old.csv: race old already exists",
+                                         "r2.csv: track 'Nowhere' not found",
+                                         "r3:hY: horse 'hY' not found",
+                                         "r3.csv: race r3 has no valid results"])
+        self.assertEqual((report.races_rejected, report.results_rejected), (3, 4))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming SQL script parser (sql_script.py)
+Run with: python -m unittest test_sql_script
+"""
+
+import glob
+import io
+import os
+import re
+import unittest
+from sql_script import StatementSplitter, drop_statement, iter_statements, routine_name
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# CREATE PROCEDURE/FUNCTION/TRIGGER at the start of a line, as the repo's scripts write them
+ROUTINE_LINE = re.compile(r"^\s*CREATE\s+(?:DEFINER\s*=\s*\S+\s+)?(?:PROCEDURE|FUNCTION|TRIGGER)\b",
+                          re.IGNORECASE | re.MULTILINE)
+
+def split(text, delimiter=';'):
+    return list(iter_statements(io.StringIO(text), delimiter))
+
+class SplitterTest(unittest.TestCase):
+    def test_plain_statements(self):
+        self.assertEqual(split("SELECT 1;\nSELECT 2;\n"), ["SELECT 1", "SELECT 2"])
+
+    def test_statement_spanning_lines(self):
+        self.assertEqual(split("SELECT a,\n       b\nFROM t;"), ["SELECT a,\n       b\nFROM t"])
+
+    def test_last_statement_without_delimiter(self):
+        self.assertEqual(split("SELECT 1;\nSELECT 2"), ["SELECT 1", "SELECT 2"])
+
+    def test_empty_statements_are_dropped(self):
+        self.assertEqual(split(";;\n  ;\nSELECT 1;;"), ["SELECT 1"])
+
+    def test_delimiter_inside_quotes(self):
+        self.assertEqual(split("INSERT INTO t VALUES ('a;b', \"c;d\");"),
+                         ["INSERT INTO t VALUES ('a;b', \"c;d\")"])
+        self.assertEqual(split("SELECT `odd;name` FROM t;"), ["SELECT `odd;name` FROM t"])
+
+    def test_escaped_and_doubled_quotes(self):
+        self.assertEqual(split("SELECT 'it\\'s; fine';"), ["SELECT 'it\\'s; fine'"])
+        self.assertEqual(split("SELECT 'it''s; fine';"), ["SELECT 'it''s; fine'"])
+
+    def test_quote_spanning_lines(self):
+        self.assertEqual(split("INSERT INTO t VALUES ('one;\ntwo');\nSELECT 1;"),
+                         ["INSERT INTO t VALUES ('one;\ntwo')", "SELECT 1"])
+
+    def test_comment_markers_inside_quotes(self):
+        self.assertEqual(split("SELECT '-- no', '# no', '/* no */';"), ["SELECT '-- no', '# no', '/* no */'"])
+
+    def test_line_comments_are_removed(self):
+        self.assertEqual(split("-- header; not a statement\nSELECT 1; -- trailing;\n# hash; comment\nSELECT 2;"),
+                         ["SELECT 1", "SELECT 2"])
+
+    def test_double_dash_needs_whitespace(self):
+        # MySQL only treats "-- " as a comment, so 1--1 is arithmetic
+        self.assertEqual(split("SELECT 1--1;"), ["SELECT 1--1"])
+
+    def test_block_comments(self):
+        self.assertEqual(split("SELECT /* a; b */ 1;"), ["SELECT   1"])
+        self.assertEqual(split("/* spans;\nlines; */\nSELECT 1;"), ["SELECT 1"])
+
+    def test_version_comments_and_hints_are_kept(self):
+        self.assertEqual(split("/*!40101 SET NAMES utf8 */;"), ["/*!40101 SET NAMES utf8 */"])
+        self.assertEqual(split("SELECT /*+ NO_INDEX(t) */ a FROM t;"), ["SELECT /*+ NO_INDEX(t) */ a FROM t"])
+
+    def test_delimiter_directive(self):
+        script = ("DELIMITER $$\n"
+                  "CREATE PROCEDURE p()\nBEGIN\n    SELECT 1;\n    SELECT 2;\nEND$$\n"
+                  "DELIMITER ;\n"
+                  "SELECT 3;\n")
+        self.assertEqual(split(script), ["CREATE PROCEDURE p()\nBEGIN\n    SELECT 1;\n    SELECT 2;\nEND",
+                                         "SELECT 3"])
+
+    def test_compound_statement_without_delimiter_directive(self):
+        script = ("CREATE TRIGGER t BEFORE INSERT ON x FOR EACH ROW\n"
+                  "BEGIN\n"
+                  "    IF NEW.a IS NULL THEN\n"
+                  "        SET NEW.a = 1;\n"
+                  "    END IF;\n"
+                  "END;\n"
+                  "SELECT 1;\n")
+        statements = split(script)
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[0].startswith("CREATE TRIGGER t"))
+        self.assertTrue(statements[0].endswith("END"))
+        self.assertEqual(statements[1], "SELECT 1")
+
+    def test_nested_blocks_loops_and_case(self):
+        script = ("CREATE PROCEDURE p()\n"
+                  "BEGIN\n"
+                  "    DECLARE n INT DEFAULT 0;\n"
+                  "    outer_block: BEGIN\n"
+                  "        WHILE n < 3 DO\n"
+                  "            SET n = n + 1;\n"
+                  "        END WHILE;\n"
+                  "        REPEAT SET n = n - 1; UNTIL n = 0 END REPEAT;\n"
+                  "    END outer_block;\n"
+                  "    CASE n WHEN 0 THEN SELECT 'zero'; ELSE SELECT 'other'; END CASE;\n"
+                  "    SELECT CASE WHEN n = 0 THEN 'end;' ELSE 'x' END;\n"
+                  "END;\n"
+                  "SELECT 2;\n")
+        statements = split(script)
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[0].endswith("END"))
+        self.assertEqual(statements[1], "SELECT 2")
+
+    def test_create_table_is_not_compound(self):
+        # BEGIN/END as plain words outside stored programs must not open a block
+        self.assertEqual(split("CREATE TABLE t (`begin` INT, `end` INT);\nSELECT 1;"),
+                         ["CREATE TABLE t (`begin` INT, `end` INT)", "SELECT 1"])
+
+    def test_feed_line_by_line(self):
+        splitter = StatementSplitter()
+        out = []
+        for line in ("SELECT 'a\n", "b'; SELECT", " 2;\n"):
+            out.extend(splitter.feed(line))
+        out.extend(splitter.finish())
+        self.assertEqual(out, ["SELECT 'a\nb'", "SELECT 2"])
+
+class RoutineNameTest(unittest.TestCase):
+    def test_routine_name(self):
+        self.assertEqual(routine_name("CREATE PROCEDURE DeleteOwner(IN id VARCHAR(15))"), ('PROCEDURE', 'DeleteOwner'))
+        self.assertEqual(routine_name("create definer=`root`@`%` trigger `t1` BEFORE INSERT"), ('TRIGGER', 't1'))
+        self.assertEqual(routine_name("CREATE FUNCTION IF NOT EXISTS f() RETURNS INT"), ('FUNCTION', 'f'))
+        self.assertIsNone(routine_name("CREATE TABLE t (a INT)"))
+
+    def test_drop_statement(self):
+        self.assertEqual(drop_statement("CREATE TRIGGER results_insert_stats AFTER INSERT ON RaceResults"),
+                         "DROP TRIGGER IF EXISTS `results_insert_stats`")
+        self.assertIsNone(drop_statement("SELECT 1"))
+
+class RepoScriptsTest(unittest.TestCase):
+    """Every .sql file shipped with the repo splits into whole statements"""
+    def scripts(self):
+        paths = glob.glob(os.path.join(ROOT, '*.sql')) + glob.glob(os.path.join(ROOT, 'migrations', '*.sql'))
+        self.assertTrue(paths)
+        return sorted(paths)
+
+    def test_every_routine_is_one_statement(self):
+        for path in self.scripts():
+            with self.subTest(script=os.path.relpath(path, ROOT)):
+                with open(path, 'r') as f:
+                    text = f.read()
+                statements = list(iter_statements(path))
+                routines = [statement for statement in statements if routine_name(statement)]
+                self.assertEqual(len(routines), len(ROUTINE_LINE.findall(text)))
+                for statement in routines:
+                    # A body with BEGIN runs to its closing END; a bare RETURN body needs none
+                    if re.search(r"(?i)\bBEGIN\b", statement):
+                        self.assertRegex(statement, r"(?is)\bEND\s*\w*$")
+
+    def test_no_directive_or_comment_leaks_into_statements(self):
+        for path in self.scripts():
+            with self.subTest(script=os.path.relpath(path, ROOT)):
+                for statement in iter_statements(path):
+                    self.assertTrue(statement)
+                    self.assertNotRegex(statement, r"(?im)^\s*DELIMITER\b")
+                    self.assertNotRegex(statement, r"(?m)^\s*--\s")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,6 +17,9 @@ def test_imports():
         print("[OK] tkinter imported successfully")
         
         # Test custom modules syntax (without MySQL connection)
+        import data_access
+        print("[OK] data_access package syntax valid")
+        
         import database
         print("[OK] database.py syntax valid")
         
@@ -29,6 +32,57 @@ def test_imports():
         import guest_gui
         print("[OK] guest_gui.py syntax valid")
         
+        import race_import
+        print("[OK] race_import.py syntax valid")
+        
+        import bulk_loader
+        print("[OK] bulk_loader.py syntax valid")
+        
+        import datagen
+        print("[OK] datagen.py syntax valid")
+        
+        import sql_script
+        print("[OK] sql_script.py syntax valid")
+        
+        import report_queries
+        print("[OK] report_queries.py syntax valid")
+        
+        import paged_treeview
+        print("[OK] paged_treeview.py syntax valid")
+        
+        import task_runner
+        print("[OK] task_runner.py syntax valid")
+        
+        import stats_maintenance
+        print("[OK] stats_maintenance.py syntax valid")
+        
+        import name_search
+        print("[OK] name_search.py syntax valid")
+        
+        import benchmark
+        print("[OK] benchmark.py syntax valid")
+        
+        import bench_suite
+        print("[OK] bench_suite.py syntax valid")
+        
+        import prize_analytics
+        print("[OK] prize_analytics.py syntax valid")
+        
+        import analytics_snapshot
+        print("[OK] analytics_snapshot.py syntax valid")
+        
+        import api_server
+        print("[OK] api_server.py syntax valid")
+        
+        import migrate
+        print("[OK] migrate.py syntax valid")
+        
+        import partitions
+        print("[OK] partitions.py syntax valid")
+        
+        import archiver
+        print("[OK] archiver.py syntax valid")
+        
         return True
         
     except ImportError as e:
@@ -49,10 +103,39 @@ def test_file_structure():
         'database_schema.sql',
         'sample_data.sql', 
         'procedures_triggers.sql',
+        'data_access/__init__.py',
+        'data_access/errors.py',
+        'data_access/pool.py',
+        'data_access/caches.py',
+        'data_access/manager.py',
+        'data_access/validation.py',
+        'data_access/repositories.py',
+        'data_access/instrumentation.py',
         'database.py',
         'main.py',
         'admin_gui.py',
         'guest_gui.py',
+        'race_import.py',
+        'bulk_loader.py',
+        'datagen.py',
+        'sql_script.py',
+        'report_queries.py',
+        'paged_treeview.py',
+        'task_runner.py',
+        'stats_maintenance.py',
+        'name_search.py',
+        'benchmark.py',
+        'bench_suite.py',
+        'prize_analytics.py',
+        'analytics_snapshot.py',
+        'api_server.py',
+        'migrate.py',
+        'partitions.py',
+        'migrations/007_partition_by_race_date.py',
+        'archiver.py',
+        'migrations/008_history_archive.py',
+        'migrations/009_reserve_archived_race_ids.py',
+        'explain_check.py',
         'requirements.txt',
         'README.md'
     ]